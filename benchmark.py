@@ -0,0 +1,317 @@
+"""Reproducible benchmarks on synthetic video.
+
+    python benchmark.py
+    python benchmark.py --duration 30 --size 1920x1080 --selection-sizes 1000 10000 100000
+
+A clip is generated with ffmpeg (testsrc2 + temporal noise, with a Gaussian
+blur switched on for a quarter of every two seconds so the scores have
+something to find). Extraction, scoring, selection and copying are timed and
+one JSON line per run is appended to the results file, so runs from different
+versions can be compared. RealityCapture orchestration is timed with
+fake_realitycapture.py standing in for RealityCapture.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import BEST_IMAGES_DIR, DEFAULT_FPS, BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES, SCORING_WORKERS
+from image_analyzer import (
+    extract_frames, extract_frames_segmented, extract_frames_streaming, get_video_info,
+    calculate_blurriness, score_frames, analyze_best_images, analyze_best_images_global,
+    remove_near_duplicates, measure_frames, ImageData, ScoreSettings, METRICS
+)
+from utils.file_operations import sync_best_images, total_file_size
+from pipeline import align_projects
+from tool_runner import ToolRunner
+from utils.score_cache import ScoreCache
+from progress import ProgressBus
+from frame_table import FrameTable
+from preview import preview_video
+from log_config import configure_logging
+
+RESULTS_FILE = "benchmark_results.jsonl"
+
+def make_synthetic_video(path: str, duration: float, size: str, rate: int = 30,
+                         noise: int = 12, blur_sigma: float = 6.0) -> str:
+    """Encode a testsrc2 clip with noise and periodic blur to path"""
+    video_filter = (
+        f"noise=alls={noise}:allf=t,"
+        f"gblur=sigma={blur_sigma}:enable='lt(mod(t\\,2)\\,0.5)'"
+    )
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={duration}",
+        "-vf", video_filter,
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not generate synthetic video: {result.stderr.strip()}")
+    return path
+
+def fresh_dir(root: str, name: str) -> str:
+    path = os.path.join(root, name)
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+def timed(results: list, name: str, fn, repeat: int = 1, unit: str = "items", setup=None) -> None:
+    """Run fn (returning the number of items processed) repeat times and keep the fastest run"""
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        items = fn()
+        seconds = time.perf_counter() - started
+        if best is None or seconds < best[1]:
+            best = (items, seconds)
+    items, seconds = best
+    result = {
+        'name': name,
+        'items': items,
+        'unit': unit,
+        'seconds': seconds,
+        'per_second': items / seconds if seconds > 0 else None
+    }
+    results.append(result)
+    print(f"{name:<40} {items:>10} {unit:<6} {seconds:>9.3f}s {result['per_second'] or 0:>12.1f} {unit}/s", flush=True)
+
+def bench_extraction(results, video_path, work_dir, fps, new_width, segments, repeat):
+    video_info = get_video_info(video_path)
+    output_dir = os.path.join(work_dir, "extract")
+
+    timed(results, "extract_frames", lambda: len(extract_frames(video_path, output_dir, fps, new_width)),
+          repeat, "frames", setup=lambda: fresh_dir(work_dir, "extract"))
+    for count in segments:
+        timed(results, f"extract_frames_segmented[{count}]",
+              lambda: len(extract_frames_segmented(video_path, output_dir, fps, new_width,
+                                                   segments=count, video_info=video_info)),
+              repeat, "frames", setup=lambda: fresh_dir(work_dir, "extract"))
+    for write_all in (True, False):
+        def streaming():
+            # Count decoded frames; with write_all=False only the selected ones are returned
+            stage = ProgressBus().stage('extract')
+            extract_frames_streaming(video_path, output_dir, fps, new_width, progress_queue=stage, write_all=write_all)
+            return stage.done
+
+        timed(results, f"extract_frames_streaming[{'write_all' if write_all else 'best_only'}]",
+              streaming, repeat, "frames", setup=lambda: fresh_dir(work_dir, "extract"))
+    for method in ("keyframes", "seek"):
+        timed(results, f"preview_video[{method}]",
+              lambda: preview_video(video_path, method=method, video_info=video_info)['samples'], repeat, "frames")
+
+    # Leave a plain extraction behind for the scoring and copy benchmarks
+    fresh_dir(work_dir, "extract")
+    return output_dir, extract_frames(video_path, output_dir, fps, new_width)
+
+def bench_scoring(results, source_dir, frames, workers, repeat):
+    paths = [os.path.join(source_dir, frame) for frame in frames]
+
+    timed(results, "calculate_blurriness[serial]",
+          lambda: len([calculate_blurriness(path) for path in paths]), repeat, "frames")
+    timed(results, "score_frames[workers=1]", lambda: len(score_frames(paths, workers=1)), repeat, "frames")
+    if workers > 1:
+        timed(results, f"score_frames[workers={workers}]",
+              lambda: len(score_frames(paths, workers=workers)), repeat, "frames")
+    timed(results, f"score_frames[workers={workers},hashes]",
+          lambda: len(score_frames(paths, workers=workers, with_hashes=True)[0]), repeat, "frames")
+
+    for settings in (ScoreSettings(dtype='CV_32F'), ScoreSettings(dtype='CV_16S'),
+                     ScoreSettings(width=640, dtype='CV_32F'), ScoreSettings(tiles=(4, 4))):
+        label = ",".join(f"{key}={value}" for key, value in settings.params().items() if key != 'ksize')
+        timed(results, f"score_frames[{label}]",
+              lambda: len(score_frames(paths, workers=workers, settings=settings)), repeat, "frames")
+
+    timed(results, f"measure_frames[{','.join(METRICS)}]",
+          lambda: len(measure_frames(paths, tuple(METRICS), workers=workers)['laplacian']), repeat, "frames")
+
+    cache = ScoreCache(os.path.join(source_dir, "benchmark_cache.sqlite"))
+    try:
+        score_frames(paths, workers=workers, cache=cache)
+        timed(results, "score_frames[warm cache]",
+              lambda: len(score_frames(paths, workers=workers, cache=cache)), repeat, "frames")
+    finally:
+        cache.close()
+        os.remove(cache.db_path)
+
+def synthetic_frames(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    scores = rng.gamma(2.0, 50.0, count)
+    hashes = rng.integers(0, 2 ** 63, count, dtype=np.int64)
+    return [
+        ImageData(f"frame_{i + 1:06d}.jpg", float(score), int(dhash))
+        for i, (score, dhash) in enumerate(zip(scores, hashes))
+    ]
+
+def bench_selection(results, sizes, repeat):
+    for size in sizes:
+        frames = synthetic_frames(size)
+        selected = analyze_best_images(frames, BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES)
+
+        def batch():
+            analyze_best_images(frames, BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES)
+            return len(frames)
+
+        def global_nms():
+            analyze_best_images_global(frames, window=BATCH_SIZE)
+            return len(frames)
+
+        def dedup():
+            remove_near_duplicates(frames, selected)
+            return len(selected)
+
+        timed(results, f"analyze_best_images[{size}]", batch, repeat, "frames")
+        timed(results, f"analyze_best_images_global[{size}]", global_nms, repeat, "frames")
+        timed(results, f"remove_near_duplicates[{size}]", dedup, repeat, "frames")
+
+        table = FrameTable.from_image_data(frames, fps=DEFAULT_FPS)
+        rows = table.select_batches(BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES)
+
+        def table_batch():
+            table.select_batches(BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES)
+            return len(table)
+
+        def table_global():
+            table.select_global(window=BATCH_SIZE)
+            return len(table)
+
+        def table_dedup():
+            table.remove_near_duplicates(rows)
+            return len(rows)
+
+        def table_statistics():
+            table.statistics()
+            return len(table)
+
+        timed(results, f"FrameTable.select_batches[{size}]", table_batch, repeat, "frames")
+        timed(results, f"FrameTable.select_global[{size}]", table_global, repeat, "frames")
+        timed(results, f"FrameTable.remove_near_duplicates[{size}]", table_dedup, repeat, "frames")
+        timed(results, f"FrameTable.statistics[{size}]", table_statistics, repeat, "frames")
+
+def bench_copy(results, source_dir, frames, work_dir, modes, repeat):
+    megabytes = total_file_size(source_dir, frames) / (1024 * 1024)
+    for mode in modes:
+        dest_dir = os.path.join(work_dir, f"copy_{mode}")
+        try:
+            timed(results, f"sync_best_images[{mode}] files",
+                  lambda: len(sync_best_images(source_dir, dest_dir, frames, mode)['added']),
+                  repeat, "files", setup=lambda: fresh_dir(work_dir, f"copy_{mode}"))
+        except OSError as e:
+            print(f"sync_best_images[{mode}] skipped: {e}")
+            continue
+        seconds = results[-1]['seconds']
+        results.append({
+            'name': f"sync_best_images[{mode}] bytes",
+            'items': megabytes,
+            'unit': "MB",
+            'seconds': seconds,
+            'per_second': megabytes / seconds if seconds > 0 else None
+        })
+        print(f"{results[-1]['name']:<40} {megabytes:>10.1f} {'MB':<6} {seconds:>9.3f}s {results[-1]['per_second'] or 0:>12.1f} MB/s")
+
+def bench_alignment(results, source_dir, frames, work_dir, projects, concurrency, repeat):
+    """align_projects over projects copies of the frames, with the fake RealityCapture doing no work"""
+    os.environ['FAKE_RC_DELAY'] = "0"
+    fake_rc = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_realitycapture.py")
+    folders = [os.path.join(work_dir, "align", f"project_{i}") for i in range(projects)]
+
+    def setup():
+        fresh_dir(work_dir, "align")
+        for folder in folders:
+            sync_best_images(source_dir, os.path.join(folder, BEST_IMAGES_DIR), frames, 'auto')
+
+    for count in concurrency:
+        def align():
+            aligned = align_projects(folders, fake_rc, runner=ToolRunner(count), timeout=None)
+            return sum(result['success'] for result in aligned)
+
+        timed(results, f"align_projects[{count} at once]", align, repeat, "projects", setup=setup)
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark extraction, scoring, selection and copying on synthetic video")
+    parser.add_argument("--duration", type=float, default=10.0, help="Length of the synthetic clip in seconds")
+    parser.add_argument("--size", default="1280x720", help="Resolution of the synthetic clip")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="Frames per second to extract")
+    parser.add_argument("--width", type=int, default=None, help="Resize extracted frames to this width")
+    parser.add_argument("--segments", type=int, nargs="*", default=[2, 4], help="Segment counts for segmented extraction")
+    parser.add_argument("--workers", type=int, default=SCORING_WORKERS, help="Threads for parallel scoring")
+    parser.add_argument("--selection-sizes", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--copy-modes", nargs="*", default=["copy", "hardlink", "auto"])
+    parser.add_argument("--align-projects", type=int, default=4, help="Projects aligned by the fake RealityCapture")
+    parser.add_argument("--align-concurrency", type=int, nargs="*", default=[1, 2], help="RealityCapture processes at once")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest is kept")
+    parser.add_argument("--video", help="Benchmark this video instead of a synthetic clip")
+    parser.add_argument("--work-dir", help="Scratch folder (defaults to a temporary folder that is removed afterwards)")
+    parser.add_argument("--output", default=RESULTS_FILE, help="JSON lines file the results are appended to")
+    args = parser.parse_args(argv)
+    # Keep logging out of the timings
+    configure_logging(logging.WARNING)
+
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        print("FFmpeg is not installed or not in the system PATH.", file=sys.stderr)
+        return 2
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="videotosplat-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        video_path = args.video or make_synthetic_video(
+            os.path.join(work_dir, "synthetic.mp4"), args.duration, args.size
+        )
+        source_dir, frames = bench_extraction(
+            results, video_path, work_dir, args.fps, args.width, args.segments, args.repeat
+        )
+        bench_scoring(results, source_dir, frames, args.workers, args.repeat)
+        bench_selection(results, args.selection_sizes, args.repeat)
+        bench_copy(results, source_dir, frames, work_dir, args.copy_modes, args.repeat)
+        bench_alignment(results, source_dir, frames, work_dir, args.align_projects, args.align_concurrency, args.repeat)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    record = {
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'revision': git_revision(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'settings': {
+            'video': args.video,
+            'duration': args.duration,
+            'size': args.size,
+            'fps': args.fps,
+            'width': args.width,
+            'workers': args.workers,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
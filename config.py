@@ -8,8 +8,119 @@ AUTOMATIC_OUTPUT_DIR = r"C:\Users\Admin\Documents\Splats\Training data\Automatic
 # Executable paths (can be overridden by environment variables)
 RC_EXECUTABLE = os.getenv('RC_EXECUTABLE', r"C:\Program Files\Capturing Reality\RealityCapture\RealityCapture.exe")
 DARKTABLE_EXECUTABLE = os.getenv('DARKTABLE_EXECUTABLE', r"C:\Program Files\darktable\bin\darktable.exe")
+DARKTABLE_CLI_EXECUTABLE = os.getenv('DARKTABLE_CLI_EXECUTABLE', r"C:\Program Files\darktable\bin\darktable-cli.exe")
+# Versions of the tools found on previous starts, keyed by executable path, size and mtime
+TOOL_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".videotosplat_tools.json")
+# External tool runs (see tool_runner.py): how many run at once across all
+# projects, how long an alignment may take and how many output lines are kept.
+# Point RC_EXECUTABLE at fake_realitycapture.py to test without RealityCapture
+MAX_CONCURRENT_TOOLS = 1
+RC_TIMEOUT = 6 * 60 * 60  # Seconds; None waits forever
+TOOL_OUTPUT_LINES = 200
 
 # Analysis settings
 DEFAULT_FPS = 5
 BATCH_SIZE = 10
 THRESHOLD = 1.5
+SCORING_WORKERS = os.cpu_count() or 1  # Threads used to score frames in parallel
+SCORE_CACHE_FILE = "score_cache.sqlite"  # Created inside each project folder
+RUN_REPORT_FILE = "run_report.json"  # Per-stage timings and resource usage, also in the project folder
+MANIFEST_FILE = "project_manifest.json"  # Stage inputs and results used to resume a project
+
+# Sharpness scoring: frames wider than SCORE_ANALYSIS_WIDTH are downscaled before
+# the Laplacian (None scores at full resolution). SCORE_DTYPE is "CV_64F", "CV_32F"
+# or "CV_16S". SCORE_TILES = (columns, rows) scores each tile separately and uses
+# the SCORE_TILE_PERCENTILE of the tile scores. Compare a change against full
+# resolution with `python -m videotosplat calibrate`.
+SCORE_ANALYSIS_WIDTH = None
+SCORE_DTYPE = "CV_64F"
+SCORE_TILES = None
+SCORE_TILE_PERCENTILE = 75
+
+# Quality metrics computed for every frame from the same decode (registered in
+# image_analyzer.METRICS: laplacian, tenengrad, fft_hf, clipping, luminance) and
+# the weights combining them for selection. Each metric is taken relative to its
+# batch mean; laplacian alone reproduces the sharpness-only selection.
+QUALITY_METRICS = ('laplacian',)
+METRIC_WEIGHTS = {'laplacian': 1.0}
+
+# Streaming extraction: score frames straight from an ffmpeg rawvideo pipe
+# instead of writing every JPEG and reading it back
+STREAMING_EXTRACTION = False
+STREAMING_WRITE_ALL = True  # False writes only the frames kept by the batch selection
+JPEG_QUALITY = 95
+
+# Segment-parallel extraction: number of concurrent ffmpeg processes, each
+# covering one time range of the video (1 runs a single ffmpeg process)
+EXTRACTION_SEGMENTS = 1
+
+# Selection defaults
+MIN_IMAGES = 2
+MAX_IMAGES = 7
+
+# Batch job queue: how many videos run at once and how many of them may be
+# decoding with ffmpeg or scoring frames at the same time
+MAX_CONCURRENT_JOBS = 4
+MAX_CONCURRENT_DECODERS = 2
+MAX_CONCURRENT_SCORERS = 2
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# Frame selection: "batch" picks the best frames inside fixed BATCH_SIZE chunks,
+# "global" runs non-maximum suppression over the whole sequence, "coverage" keeps
+# the fewest sharp frames whose feature overlap still links the whole clip (see
+# coverage_selection.py)
+SELECTION_MODE = "batch"
+GLOBAL_MIN_GAP = 3  # Frames on either side a pick must beat
+GLOBAL_MAX_GAP = BATCH_SIZE  # Longest run of frames allowed without a pick (None disables)
+COVERAGE_FEATURES = "orb"  # "orb" or "akaze" keypoints, cached in SCORE_CACHE_FILE
+COVERAGE_FEATURE_WIDTH = 640  # Frames are downscaled to this width for feature detection
+COVERAGE_MAX_FEATURES = 500
+COVERAGE_MIN_OVERLAP = 0.3  # Share of features consecutive picks must match
+COVERAGE_MIN_SHARPNESS = 0.8  # Candidates score at least this times their batch mean
+COVERAGE_NEIGHBOURS = 30  # Most following candidates each candidate is matched with
+
+# Near-duplicate removal after selection: frames whose 64-bit dHash is within
+# this Hamming distance of one of the last DEDUP_WINDOW kept frames are dropped
+# (None disables). Comparing only recent picks keeps views the camera returns
+# to later; in batch mode no batch is cut below MIN_IMAGES
+DEDUP_MAX_DISTANCE = 5
+DEDUP_WINDOW = 30  # Kept frames compared against (None compares the whole clip)
+
+# Frame sampling: "fixed" extracts at the FPS setting, "adaptive" picks frames
+# once accumulated camera motion crosses ADAPTIVE_MOTION_THRESHOLD
+SAMPLING_MODE = "fixed"
+ADAPTIVE_MOTION_THRESHOLD = 0.08  # Fraction of the frame width
+ADAPTIVE_ANALYSIS_FPS = 15  # Candidate frames per second examined for motion
+ADAPTIVE_MAX_INTERVAL = 2.0  # Seconds; a frame is always kept at least this often
+
+# Preview: score a sample of frames at PREVIEW_WIDTH without extracting the clip.
+# "keyframes" decodes only keyframes (thinned to about PREVIEW_SAMPLES), "seek"
+# decodes PREVIEW_SAMPLES evenly spaced frames, "auto" uses keyframes and seeks
+# instead for clips with fewer than half PREVIEW_SAMPLES keyframes or with so many
+# (e.g. all-intra) that seeking decodes less
+PREVIEW_METHOD = "auto"
+PREVIEW_SAMPLES = 60
+PREVIEW_WIDTH = 640
+
+# Grading (see grading.py): the best images are written to GRADED_IMAGES_DIR.
+# "darktable" applies the GRADING_STYLE XMP sidecar with darktable-cli, "opencv"
+# normalises white balance (gray world) and exposure, "auto" uses darktable when
+# darktable-cli and a style are available
+GRADED_IMAGES_DIR = "Graded Images"
+GRADING_METHOD = "auto"
+GRADING_STYLE = os.getenv('VIDEOTOSPLAT_GRADING_STYLE')  # Path to an .xmp file
+GRADING_WORKERS = 2  # darktable-cli processes (or OpenCV threads) at once
+GRADING_TIMEOUT = 300  # Seconds per image for darktable-cli
+GRADING_TARGET_LUMINANCE = 0.45  # Mean luminance (0-1) exposure is normalised to
+GRADING_MAX_GAIN = 2.0  # Largest white balance gain per channel
+
+# How selected frames are placed in BEST_IMAGES_DIR: "auto" tries a hardlink,
+# then a copy-on-write reflink, then a copy; "hardlink", "reflink" or "copy" force one
+MATERIALIZE_MODE = "auto"
+
+# Logging (see log_config.py): level name, optional log file written by a
+# background thread, and how often per-frame debug messages are emitted
+LOG_LEVEL = os.getenv('VIDEOTOSPLAT_LOG_LEVEL', "INFO")
+LOG_FILE = os.getenv('VIDEOTOSPLAT_LOG_FILE')  # e.g. "videotosplat.log"; None logs to stderr only
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+LOG_SAMPLE_EVERY = 100  # 1 in N per-frame debug messages
@@ -0,0 +1,217 @@
+"""Coverage-aware frame selection for alignment.
+
+Sharpness alone can drop the only frame that bridges two parts of the scene,
+or keep several frames that show the same view. Here every sharp enough
+candidate gets ORB (or AKAZE) keypoints on a downscaled copy, candidates are
+matched with the candidates that follow them until the overlap falls below
+the target, and the selection is the path through this overlap graph with
+the fewest frames (the sharpest among equally short paths) from the start of
+the clip to its end. Consecutive picks then share at least min_overlap of
+their features wherever the clip allows it.
+
+Keypoints and descriptors are stored in the project's ScoreCache, so
+reselecting with other settings only redoes the matching.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import (
+    COVERAGE_FEATURES, COVERAGE_FEATURE_WIDTH, COVERAGE_MAX_FEATURES, COVERAGE_MIN_OVERLAP,
+    COVERAGE_MIN_SHARPNESS, COVERAGE_NEIGHBOURS, SCORING_WORKERS
+)
+from frame_table import FrameTable
+
+logger = logging.getLogger(__name__)
+
+FEATURE_TYPES = ('orb', 'akaze')
+# Lowe's ratio test between the best and second best match
+_RATIO = 0.8
+# Below this many matches the epipolar check is skipped and the pair counts as not overlapping
+_MIN_MATCHES = 8
+
+Features = Tuple[np.ndarray, np.ndarray]  # (points float32 (n, 2), descriptors uint8 (n, bytes))
+
+def feature_params(kind: str = COVERAGE_FEATURES, width: int = COVERAGE_FEATURE_WIDTH,
+                   max_features: int = COVERAGE_MAX_FEATURES) -> dict:
+    """ScoreCache params of the cached features; a change recomputes them"""
+    if kind not in FEATURE_TYPES:
+        raise ValueError(f"Unknown feature type: {kind}")
+    return {'kind': kind, 'width': width, 'max_features': max_features, 'version': 1}
+
+def _detector(params: dict):
+    if params['kind'] == 'akaze':
+        return cv2.AKAZE_create()
+    return cv2.ORB_create(nfeatures=params['max_features'])
+
+def detect_features(gray: np.ndarray, params: dict) -> Features:
+    """Keypoint positions (in downscaled pixels) and binary descriptors of the strongest features"""
+    img = gray
+    if params['width'] and gray.shape[1] > params['width']:
+        height = max(1, int(round(gray.shape[0] * params['width'] / gray.shape[1])))
+        img = cv2.resize(gray, (params['width'], height), interpolation=cv2.INTER_AREA)
+    keypoints, descriptors = _detector(params).detectAndCompute(img, None)
+    if descriptors is None or not keypoints:
+        return np.empty((0, 2), np.float32), np.empty((0, 32), np.uint8)
+    order = np.argsort([-kp.response for kp in keypoints], kind='stable')[:params['max_features']]
+    points = np.array([keypoints[i].pt for i in order], dtype=np.float32).reshape(-1, 2)
+    return points, descriptors[order]
+
+def _pack(features: Features) -> bytes:
+    points, descriptors = features
+    header = np.array([len(points), descriptors.shape[1] if descriptors.ndim == 2 else 0], dtype=np.int32)
+    return header.tobytes() + points.tobytes() + descriptors.tobytes()
+
+def _unpack(blob: bytes) -> Features:
+    count, width = np.frombuffer(blob, dtype=np.int32, count=2)
+    points = np.frombuffer(blob, dtype=np.float32, count=count * 2, offset=8).reshape(count, 2)
+    descriptors = np.frombuffer(blob, dtype=np.uint8, offset=8 + count * 8).reshape(count, width)
+    return points, descriptors
+
+def load_features(paths: List[str], params: dict, workers: int = SCORING_WORKERS, cache=None,
+                  progress_queue=None) -> List[Optional[Features]]:
+    """Features of every path (None for unreadable images), from cache where still valid"""
+    features: List[Optional[Features]] = [None] * len(paths)
+    missing = list(range(len(paths)))
+    if cache is not None:
+        hits = cache.get_many(paths, 'features', params)
+        for i, path in enumerate(paths):
+            if path in hits:
+                features[i] = _unpack(hits[path])
+        missing = [i for i in missing if features[i] is None]
+        logger.info(f"Feature cache: {len(paths) - len(missing)} hits, {len(missing)} to compute")
+
+    def detect(i):
+        gray = cv2.imread(paths[i], cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            logger.warning(f"Failed to read image: {paths[i]}")
+            return None
+        return detect_features(gray, params)
+
+    completed = len(paths) - len(missing)
+    with ThreadPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+        for i, result in zip(missing, executor.map(detect, missing)):
+            features[i] = result
+            completed += 1
+            if progress_queue is not None:
+                progress_queue.put(completed)
+
+    if cache is not None and missing:
+        cache.put_many(((paths[i], _pack(features[i])) for i in missing if features[i] is not None),
+                       'features', params)
+    return features
+
+def overlap_ratio(a: Features, b: Features) -> float:
+    """Share of the smaller feature set with a geometrically consistent match in the other frame"""
+    (points_a, descriptors_a), (points_b, descriptors_b) = a, b
+    smaller = min(len(points_a), len(points_b))
+    if smaller < _MIN_MATCHES:
+        return 0.0
+    pairs = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(descriptors_a, descriptors_b, k=2)
+    good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < _RATIO * pair[1].distance]
+    if len(good) < _MIN_MATCHES:
+        return 0.0
+    source = points_a[[match.queryIdx for match in good]]
+    target = points_b[[match.trainIdx for match in good]]
+    _, inliers = cv2.findFundamentalMat(source, target, cv2.FM_RANSAC, 3.0, 0.99)
+    if inliers is None:
+        return 0.0
+    return float(inliers.sum()) / smaller
+
+def overlap_graph(features: List[Optional[Features]], min_overlap: float = COVERAGE_MIN_OVERLAP,
+                  neighbours: int = COVERAGE_NEIGHBOURS, workers: int = SCORING_WORKERS) -> Dict[int, Dict[int, float]]:
+    """{i: {j: overlap}} for the candidates j > i that overlap i by at least min_overlap.
+
+    Each candidate is matched with up to neighbours following candidates and
+    the scan stops at the first one below min_overlap, since overlap mostly
+    falls with distance along a camera path. Keeps the graph sparse.
+    """
+    def edges(i):
+        found = {}
+        if features[i] is None:
+            return found
+        for j in range(i + 1, min(len(features), i + 1 + neighbours)):
+            if features[j] is None:
+                continue
+            overlap = overlap_ratio(features[i], features[j])
+            if overlap < min_overlap:
+                break
+            found[j] = overlap
+        return found
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+        return dict(enumerate(executor.map(edges, range(len(features)))))
+
+def shortest_cover(graph: Dict[int, Dict[int, float]], sharpness: np.ndarray) -> Tuple[List[int], int]:
+    """Fewest candidates linking the first candidate's view to the last one's, sharpest on ties.
+
+    Nodes overlapping the first candidate (or it) can start the path and
+    nodes overlapping the last candidate (or it) can end it. Where no chain
+    of overlapping candidates exists the path steps to the next candidate in
+    time instead; those breaks are minimised first. Returns (nodes, breaks).
+    """
+    count = len(sharpness)
+    if count == 0:
+        return [], 0
+    last = count - 1
+    # Cost of the best path ending at each node: (breaks, frames, -sharpness)
+    best = [None] * count
+    previous = [-1] * count
+    for j in [0] + list(graph.get(0, {})):
+        best[j] = (0, 1, -sharpness[j])
+    for i in range(count):
+        if best[i] is None:
+            continue
+        breaks, frames, negative_sharpness = best[i]
+        steps = {j: 0 for j in graph.get(i, {})}
+        if i + 1 < count and i + 1 not in steps:
+            steps[i + 1] = 1
+        for j, step_breaks in steps.items():
+            cost = (breaks + step_breaks, frames + 1, negative_sharpness - sharpness[j])
+            if best[j] is None or cost < best[j]:
+                best[j] = cost
+                previous[j] = i
+    ends = [last] + [i for i in range(count) if last in graph.get(i, {})]
+    end = min(ends, key=lambda i: best[i])
+    breaks = best[end][0]
+    path = []
+    while end != -1:
+        path.append(end)
+        end = previous[end]
+    return path[::-1], breaks
+
+def select_coverage(frames: FrameTable, source_dir: str, batch_size: int = 10, weights: Dict[str, float] = None,
+                    min_sharpness: float = COVERAGE_MIN_SHARPNESS, min_overlap: float = COVERAGE_MIN_OVERLAP,
+                    neighbours: int = COVERAGE_NEIGHBOURS, params: dict = None, workers: int = SCORING_WORKERS,
+                    cache=None, progress_queue=None) -> np.ndarray:
+    """Rows of the smallest sharp subset of frames that keeps the overlap graph connected.
+
+    Candidates are the frames scoring at least min_sharpness times their
+    batch mean (weights combine the quality metrics as for the other modes).
+    Rows come back in sequence order.
+    """
+    if not len(frames):
+        return np.empty(0, dtype=np.int64)
+    params = params or feature_params()
+    relative = frames.weighted_scores(weights or {'laplacian': 1.0}, batch_size)
+    candidates = np.flatnonzero(~np.isnan(relative) & (relative >= min_sharpness))
+    logger.info(f"Coverage selection: {len(candidates)} of {len(frames)} frames are sharp enough candidates")
+
+    paths = [os.path.join(source_dir, path) for path in frames.paths_at(candidates)]
+    features = load_features(paths, params, workers, cache, progress_queue)
+    readable = [k for k, value in enumerate(features) if value is not None]
+    candidates = candidates[readable]
+    graph = overlap_graph([features[k] for k in readable], min_overlap, neighbours, workers)
+    logger.info(f"Overlap graph: {len(candidates)} nodes, {sum(map(len, graph.values()))} edges")
+
+    path, breaks = shortest_cover(graph, relative[candidates])
+    if breaks:
+        logger.warning(
+            f"No chain of frames with {min_overlap:.0%} overlap across {breaks} gap(s); "
+            "alignment may split into several components there"
+        )
+    return candidates[path]
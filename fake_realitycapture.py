@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Stand-in for the RealityCapture command line, for testing and benchmarking without it.
+
+Understands the commands build_rc_command passes (-newScene, -addFolder,
+-align, -save, -exportSparsePointCloud, -exportRegistration) and skips
+unknown ones. Alignment takes FAKE_RC_DELAY seconds per image (default 0.01)
+and prints "Aligning images i/N" lines. The outputs have the real file names
+and formats, filled with placeholder data, and crmeta.db is left in the
+images folder like RealityCapture does. FAKE_RC_EXIT_CODE makes it fail.
+
+    RC_EXECUTABLE=fake_realitycapture.py python -m videotosplat align "path/to/project"
+"""
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Commands followed by a value; the others are flags
+VALUE_COMMANDS = {
+    '-addFolder', '-addImage', '-load', '-save', '-exportSparsePointCloud', '-exportRegistration',
+    '-set', '-writeProgress', '-printProgress', '-delegateTo'
+}
+
+def parse_commands(argv):
+    commands, i = [], 0
+    while i < len(argv):
+        name = argv[i]
+        if name in VALUE_COMMANDS and i + 1 < len(argv):
+            commands.append((name, argv[i + 1]))
+            i += 2
+        else:
+            commands.append((name, None))
+            i += 1
+    return commands
+
+def write_point_cloud(path, images):
+    points = [(math.cos(i * 0.1) * 5, math.sin(i * 0.1) * 5, (i % 7) * 0.5) for i in range(len(images) * 50)]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"ply\nformat ascii 1.0\nelement vertex {len(points)}\n")
+        f.write("property float x\nproperty float y\nproperty float z\nend_header\n")
+        for x, y, z in points:
+            f.write(f"{x:.4f} {y:.4f} {z:.4f}\n")
+
+def write_registration(path, images):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("#name,x,y,alt,heading,pitch,roll,f,px,py,k1,k2,k3,k4,t1,t2\n")
+        for i, name in enumerate(images):
+            angle = 360.0 * i / max(1, len(images))
+            f.write(f"{name},{math.cos(math.radians(angle)) * 10:.4f},{math.sin(math.radians(angle)) * 10:.4f},"
+                    f"1.5,{angle:.2f},0,0,35,0,0,0,0,0,0,0,0\n")
+
+def main(argv=None) -> int:
+    commands = parse_commands(sys.argv[1:] if argv is None else argv)
+    delay = float(os.getenv('FAKE_RC_DELAY', '0.01'))
+    images, folders = [], []
+    for name, value in commands:
+        if name == '-newScene':
+            images, folders = [], []
+            print("New scene created", flush=True)
+        elif name == '-addFolder':
+            if not os.path.isdir(value):
+                print(f"Error: folder not found: {value}", file=sys.stderr, flush=True)
+                return 1
+            added = sorted(f for f in os.listdir(value) if f.lower().endswith(IMAGE_EXTENSIONS))
+            images += added
+            folders.append(value)
+            print(f"Added {len(added)} images from {value}", flush=True)
+        elif name == '-align':
+            for i in range(1, len(images) + 1):
+                time.sleep(delay)
+                print(f"Aligning images {i}/{len(images)}", flush=True)
+            for folder in folders:
+                sqlite3.connect(os.path.join(folder, "crmeta.db")).close()
+        elif name == '-save':
+            with open(value, 'w', encoding='utf-8') as f:
+                json.dump({'fake': True, 'images': images}, f)
+            print(f"Project saved to {value}", flush=True)
+        elif name == '-exportSparsePointCloud':
+            write_point_cloud(value, images)
+            print(f"Sparse point cloud exported to {value}", flush=True)
+        elif name == '-exportRegistration':
+            write_registration(value, images)
+            print(f"Registration exported to {value}", flush=True)
+        elif name != '-quit':
+            print(f"Ignoring unsupported command {name}", file=sys.stderr, flush=True)
+    return int(os.getenv('FAKE_RC_EXIT_CODE', '0'))
+
+if __name__ == "__main__":
+    sys.exit(main())
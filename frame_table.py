@@ -0,0 +1,262 @@
+"""Columnar store for the frames of one extraction.
+
+Frames live in parallel NumPy columns instead of one ImageData object each,
+so selection, statistics and table rendering run vectorised and memory stays
+at a few dozen bytes per frame plus the interned path strings.
+"""
+import re
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from config import DEDUP_MAX_DISTANCE, DEDUP_WINDOW
+from image_analyzer import (
+    ImageData, HashIndex, METRICS, droppable_per_batch, frame_timestamp, select_best_frames_global
+)
+
+# Badge bits; BADGES maps the names shown in the UI to their bit
+BADGE_BEST = 1
+BADGES = {'Best': BADGE_BEST}
+
+_FRAME_NUMBER = re.compile(r'(\d+)\.[^.]+$')
+
+def _column(values, length: int) -> np.ndarray:
+    if values is None:
+        return np.full(length, np.nan)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+def _batched(values: np.ndarray, batch_size: int) -> np.ndarray:
+    """values padded with NaN and reshaped to (batches, batch_size)"""
+    batches = -(-len(values) // batch_size)
+    padded = np.full(batches * batch_size, np.nan)
+    padded[:len(values)] = values
+    return padded.reshape(batches, batch_size)
+
+def _batch_means(values: np.ndarray, batch_size: int) -> np.ndarray:
+    """Mean of the non-NaN values of each batch, repeated for every row (NaN for empty batches)"""
+    grid = _batched(values, batch_size)
+    valid = ~np.isnan(grid)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, grid, 0.0).sum(axis=1)
+    means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return np.repeat(means, batch_size)[:len(values)]
+
+class FrameTable:
+    """Frames of one extraction as NumPy columns plus one list of interned paths.
+
+    Rows are in sequence order. index is the frame number parsed from the file
+    name, timestamp its presentation time (NaN without an fps), score the
+    Laplacian sharpness (NaN when missing), metrics one column per other
+    quality metric, dhash/has_hash the 64-bit hashes and badges a bitmask of
+    BADGES.
+    """
+
+    def __init__(self, paths: List[str], scores=None, dhashes=None, metrics: Dict[str, list] = None, fps=None):
+        length = len(paths)
+        self.paths = [sys.intern(path) for path in paths]
+        self.fps = fps
+        self.index = np.array([self._frame_number(path, row) for row, path in enumerate(self.paths)], dtype=np.int64)
+        if fps:
+            self.timestamp = frame_timestamp(self.index, fps).astype(np.float64)
+        else:
+            self.timestamp = np.full(length, np.nan)
+        self.score = _column(scores, length)
+        self.metrics = {
+            name: _column(values, length)
+            for name, values in (metrics or {}).items() if name != 'laplacian'
+        }
+        self.dhash = np.zeros(length, dtype=np.uint64)
+        self.has_hash = np.zeros(length, dtype=bool)
+        for row, value in enumerate(dhashes or ()):
+            if value is not None:
+                self.dhash[row] = value
+                self.has_hash[row] = True
+        self.badges = np.zeros(length, dtype=np.uint8)
+        self._positions = None
+
+    @staticmethod
+    def _frame_number(path: str, row: int) -> int:
+        match = _FRAME_NUMBER.search(path)
+        return int(match.group(1)) if match else row + 1
+
+    @classmethod
+    def from_image_data(cls, frames: List[ImageData], fps=None) -> 'FrameTable':
+        names = list(dict.fromkeys(name for frame in frames for name in frame.metrics if name != 'laplacian'))
+        table = cls(
+            [frame.relative_path for frame in frames],
+            [frame.blurriness_score for frame in frames],
+            [frame.dhash for frame in frames],
+            {name: [frame.metrics.get(name) for frame in frames] for name in names},
+            fps=fps
+        )
+        for name, bit in BADGES.items():
+            table.badges[[name in frame.badges for frame in frames]] |= bit
+        return table
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Columns as plain arrays for an .npz sidecar of the project manifest; see from_arrays"""
+        arrays = {
+            'paths': np.array(self.paths, dtype=str),
+            'fps': np.array(np.nan if self.fps is None else self.fps, dtype=np.float64),
+            'score': self.score,
+            'dhash': self.dhash,
+            'has_hash': self.has_hash,
+            'badges': self.badges
+        }
+        arrays.update({f'metric_{name}': values for name, values in self.metrics.items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'FrameTable':
+        fps = float(arrays['fps'])
+        table = cls(arrays['paths'].tolist(), fps=None if np.isnan(fps) else fps)
+        table.score = arrays['score'].astype(np.float64)
+        table.dhash = arrays['dhash'].astype(np.uint64)
+        table.has_hash = arrays['has_hash'].astype(bool)
+        table.badges = arrays['badges'].astype(np.uint8)
+        table.metrics = {
+            name[len('metric_'):]: values.astype(np.float64)
+            for name, values in arrays.items() if name.startswith('metric_')
+        }
+        return table
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, row: int) -> ImageData:
+        """ImageData copy of one row, for code that works on single frames"""
+        score = self.score[row]
+        image_data = ImageData(
+            self.paths[row],
+            None if np.isnan(score) else float(score),
+            int(self.dhash[row]) if self.has_hash[row] else None,
+            {name: float(values[row]) for name, values in self.metrics.items() if not np.isnan(values[row])}
+        )
+        image_data.badges = self.badge_names(row)
+        return image_data
+
+    def metric(self, name: str) -> np.ndarray:
+        if name == 'laplacian':
+            return self.score
+        return self.metrics.get(name, np.full(len(self), np.nan))
+
+    def positions(self, paths: List[str]) -> np.ndarray:
+        """Rows of the given paths (unknown paths are skipped)"""
+        if self._positions is None:
+            self._positions = {path: row for row, path in enumerate(self.paths)}
+        return np.array([self._positions[path] for path in paths if path in self._positions], dtype=np.int64)
+
+    def paths_at(self, rows) -> List[str]:
+        return [self.paths[row] for row in rows]
+
+    def has_badge(self, badge: int) -> np.ndarray:
+        return (self.badges & badge) != 0
+
+    def paths_with_badge(self, badge: int) -> List[str]:
+        return self.paths_at(np.flatnonzero(self.has_badge(badge)))
+
+    def set_badge(self, badge: int, rows) -> None:
+        self.badges[rows] |= badge
+
+    def clear_badge(self, badge: int) -> None:
+        self.badges &= ~np.uint8(badge)
+
+    def badge_names(self, row: int) -> List[str]:
+        return [name for name, bit in BADGES.items() if self.badges[row] & bit]
+
+    def weighted_scores(self, weights: Dict[str, float], batch_size: int = None) -> np.ndarray:
+        """Vectorised image_analyzer.weighted_scores, relative to each batch (or the whole table).
+
+        Rows missing a weighted metric get NaN.
+        """
+        weights = {name: weight for name, weight in weights.items() if weight}
+        if not weights:
+            raise ValueError("At least one metric needs a non-zero weight")
+        total = np.zeros(len(self))
+        missing = np.zeros(len(self), dtype=bool)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, weight in weights.items():
+                values = self.metric(name)
+                missing |= np.isnan(values)
+                means = _batch_means(values, batch_size or max(1, len(self)))
+                relative = np.where(means > 0, values / means, 1.0)
+                if not METRICS[name].higher_is_better:
+                    relative = np.maximum(0.0, 2.0 - relative)
+                total += weight * np.nan_to_num(relative)
+        total /= sum(weights.values())
+        total[missing] = np.nan
+        return total
+
+    def select_batches(self, batch_size: int = 10, threshold: float = 1.5, min_images: int = 2,
+                       max_images: int = 7, weights: Dict[str, float] = None) -> np.ndarray:
+        """Rows picked by the batch rule of select_best_images, for all batches at once.
+
+        Rows come back in the order analyze_best_images returns paths: batch by
+        batch, best score first.
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        scores = self.weighted_scores(weights, batch_size) if weights else self.score
+        grid = _batched(scores, batch_size)
+        valid = ~np.isnan(grid)
+        counts = np.maximum(valid.sum(axis=1), 1)
+        mean = np.where(valid, grid, 0.0).sum(axis=1) / counts
+        std_dev = np.sqrt((np.where(valid, grid - mean[:, None], 0.0) ** 2).sum(axis=1) / counts)
+        cut = np.where(std_dev > threshold * mean, mean + std_dev, mean)
+        candidates = valid & (grid > cut[:, None])
+
+        # Stable descending order within each batch, missing scores last
+        order = np.argsort(np.where(valid, -grid, np.inf), axis=1, kind='stable')
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.broadcast_to(np.arange(batch_size), order.shape), axis=1)
+
+        n_candidates = candidates.sum(axis=1)[:, None]
+        keep = np.where(
+            n_candidates < min_images, valid & (rank < min_images),
+            np.where(n_candidates > max_images, candidates & (rank < max_images), candidates)
+        )
+        rows = np.arange(len(grid))[:, None] * batch_size + order
+        return rows[np.take_along_axis(keep, order, axis=1)]
+
+    def select_global(self, min_gap: int = 3, max_gap: int = None, window: int = 10,
+                      max_images: int = None, weights: Dict[str, float] = None) -> np.ndarray:
+        scores = self.weighted_scores(weights) if weights else self.score
+        return select_best_frames_global(scores, min_gap=min_gap, max_gap=max_gap, window=window, max_images=max_images)
+
+    def remove_near_duplicates(self, rows, max_distance: int = DEDUP_MAX_DISTANCE, window: int = DEDUP_WINDOW,
+                               batch_size: int = None, min_images: int = 0) -> np.ndarray:
+        """Rows left after dropping frames within max_distance of one of the last window kept frames' dHash.
+
+        Same rule as image_analyzer.remove_near_duplicates; batches are
+        batch_size consecutive rows.
+        """
+        rows = np.sort(np.asarray(rows, dtype=np.int64))
+        batches = rows // batch_size if batch_size else np.zeros(len(rows), dtype=np.int64)
+        droppable = droppable_per_batch(batches.tolist(), min_images if batch_size else 0)
+        index = HashIndex(max_distance, capacity=window)
+        kept = []
+        for row, batch in zip(rows.tolist(), batches.tolist()):
+            if self.has_hash[row]:
+                value = int(self.dhash[row])
+                if droppable[batch] and index.find_within(value):
+                    droppable[batch] -= 1
+                    continue
+                index.add(value)
+            kept.append(row)
+        return np.array(kept, dtype=np.int64)
+
+    def statistics(self) -> dict:
+        """Same summary as image_analyzer.calculate_statistics"""
+        scores = self.score[~np.isnan(self.score)]
+        return {
+            "total_frames": len(self),
+            "best_images": int(self.has_badge(BADGE_BEST).sum()),
+            "avg_blurriness": float(scores.mean()) if len(scores) else 0.0,
+            "min_blurriness": float(scores.min()) if len(scores) else 0.0,
+            "max_blurriness": float(scores.max()) if len(scores) else 0.0,
+            "metric_means": {
+                name: float(np.nanmean(values))
+                for name, values in self.metrics.items() if not np.all(np.isnan(values))
+            }
+        }
@@ -0,0 +1,213 @@
+"""Headless grading of the best images.
+
+With darktable-cli, a chosen XMP sidecar (exported from a darktable edit) is
+applied to every image. The images are split into one shard per worker, and
+each shard runs its own darktable-cli processes one after another with its
+own --configdir, since darktable locks the library in its config folder.
+Without darktable, an OpenCV fallback normalises white balance (gray world)
+and exposure, so the stage also runs where darktable is not installed.
+
+Outputs are cached by (source hash, style hash) in a small JSON file in the
+output folder, so rerunning only grades new or changed images.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from config import (
+    DARKTABLE_CLI_EXECUTABLE, GRADING_METHOD, GRADING_STYLE, GRADING_WORKERS, GRADING_TIMEOUT,
+    GRADING_TARGET_LUMINANCE, GRADING_MAX_GAIN, JPEG_QUALITY
+)
+from utils.file_operations import IMAGE_EXTENSIONS
+from tool_runner import ToolRunner
+
+logger = logging.getLogger(__name__)
+
+GRADING_METHODS = ('auto', 'darktable', 'opencv')
+_CACHE_FILE = ".grading_cache.json"
+_CONFIG_DIRS = ".darktable"
+_OPENCV_VERSION = 1
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def darktable_cli() -> Optional[str]:
+    """Path of darktable-cli, from config or PATH"""
+    if os.path.exists(DARKTABLE_CLI_EXECUTABLE):
+        return DARKTABLE_CLI_EXECUTABLE
+    return shutil.which("darktable-cli")
+
+def resolve_method(method: str = GRADING_METHOD, style: str = GRADING_STYLE) -> str:
+    """'darktable' or 'opencv' for method; 'auto' picks darktable when it and a style are available"""
+    if method not in GRADING_METHODS:
+        raise ValueError(f"Unknown grading method: {method}")
+    if method == 'auto':
+        return 'darktable' if style and darktable_cli() else 'opencv'
+    if method == 'darktable':
+        if darktable_cli() is None:
+            raise FileNotFoundError(f"darktable-cli not found at {DARKTABLE_CLI_EXECUTABLE} or in PATH")
+        if not style:
+            raise ValueError("Grading with darktable needs an XMP style")
+    return method
+
+def style_hash(method: str, style: str = None) -> str:
+    """Identifies the grade applied; a different style or fallback setting regrades every image"""
+    if method == 'darktable':
+        if not os.path.exists(style):
+            raise FileNotFoundError(f"Grading style not found: {style}")
+        return f"darktable:{file_hash(style)}"
+    params = {'target': GRADING_TARGET_LUMINANCE, 'max_gain': GRADING_MAX_GAIN, 'version': _OPENCV_VERSION}
+    return "opencv:" + hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def normalize_image(img: np.ndarray, target: float = GRADING_TARGET_LUMINANCE,
+                    max_gain: float = GRADING_MAX_GAIN) -> np.ndarray:
+    """Gray-world white balance and a gamma that brings the mean luminance to target, for BGR uint8 images"""
+    means = np.maximum(cv2.mean(img)[:3], 1.0)
+    gray = float(np.mean(means))
+    gains = np.clip(gray / means, 1.0 / max_gain, max_gain)
+    # After white balance every channel averages about gray, so gray is also the mean luminance
+    luminance = min(max(gray / 255.0, 1e-3), 0.999)
+    gamma = min(max(math.log(target) / math.log(luminance), 0.5), 2.0)
+    levels = np.arange(256, dtype=np.float64)[:, None] / 255.0
+    lut = np.clip(levels * gains, 0.0, 1.0) ** gamma * 255.0 + 0.5
+    return cv2.LUT(img, lut.astype(np.uint8).reshape(256, 1, 3))
+
+def _grade_opencv(source: str, output: str) -> None:
+    img = cv2.imread(source, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Failed to read image: {source}")
+    if not cv2.imwrite(output, normalize_image(img), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]):
+        raise OSError(f"Failed to write graded image: {output}")
+
+def darktable_command(source: str, style: str, output: str, config_dir: str, executable: str = None) -> List[str]:
+    return [
+        executable or darktable_cli(), source, style, output,
+        "--apply-custom-presets", "false",
+        "--core", "--configdir", config_dir
+    ]
+
+def _load_cache(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, _CACHE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(output_dir: str, cache: dict) -> None:
+    path = os.path.join(output_dir, _CACHE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def grade_images(source_dir: str, output_dir: str, names: List[str] = None, method: str = GRADING_METHOD,
+                 style: str = GRADING_STYLE, workers: int = GRADING_WORKERS, progress_queue=None,
+                 cancel_event: threading.Event = None) -> dict:
+    """Grade the images names (default: all) of source_dir into output_dir.
+
+    Images whose graded output is cached for the same source and style are
+    skipped, and graded images whose source is no longer in names are
+    removed. Progress counts graded and skipped images. Setting cancel_event
+    stops after the images in progress.
+    """
+    method = resolve_method(method, style)
+    key = style_hash(method, style)
+    if names is None:
+        names = sorted(f for f in os.listdir(source_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    os.makedirs(output_dir, exist_ok=True)
+    cache = _load_cache(output_dir)
+
+    wanted = set(names)
+    removed = sorted(
+        f for f in os.listdir(output_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS) and f not in wanted
+    )
+    for name in removed:
+        os.remove(os.path.join(output_dir, name))
+        cache.pop(name, None)
+
+    todo, skipped = [], 0
+    for name in names:
+        entry = {'source': file_hash(os.path.join(source_dir, name)), 'style': key}
+        if cache.get(name) == entry and os.path.exists(os.path.join(output_dir, name)):
+            skipped += 1
+        else:
+            todo.append((name, entry))
+    logger.info(f"Grading {len(todo)} images with {method} ({skipped} unchanged)")
+
+    lock = threading.Lock()
+    completed = skipped
+    graded, failed = [], []
+    if progress_queue is not None:
+        progress_queue.put(completed)
+    runner = ToolRunner(max(1, workers))
+    cancel_event = cancel_event or threading.Event()
+
+    def grade_shard(index, shard):
+        nonlocal completed
+        config_dir = os.path.join(output_dir, _CONFIG_DIRS, f"worker_{index}")
+        for name, entry in shard:
+            if cancel_event.is_set():
+                return
+            source, output = os.path.join(source_dir, name), os.path.join(output_dir, name)
+            # darktable-cli never overwrites, it would write name_01.jpg instead
+            if os.path.exists(output):
+                os.remove(output)
+            try:
+                if method == 'darktable':
+                    os.makedirs(config_dir, exist_ok=True)
+                    result = runner.run(
+                        darktable_command(source, style, output, config_dir), name="darktable-cli",
+                        timeout=GRADING_TIMEOUT, cancel_event=cancel_event
+                    )
+                    ok = result['success'] and os.path.exists(output)
+                else:
+                    _grade_opencv(source, output)
+                    ok = True
+            except (OSError, ValueError) as e:
+                logger.error(f"Grading {name} failed: {e}")
+                ok = False
+            with lock:
+                if ok:
+                    cache[name] = entry
+                    graded.append(name)
+                else:
+                    cache.pop(name, None)
+                    failed.append(name)
+                completed += 1
+                if progress_queue is not None:
+                    progress_queue.put(completed)
+
+    shards = [todo[index::max(1, workers)] for index in range(max(1, workers))]
+    shards = [shard for shard in shards if shard]
+    try:
+        if shards:
+            with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                list(executor.map(grade_shard, range(len(shards)), shards))
+    finally:
+        _save_cache(output_dir, cache)
+
+    if failed:
+        logger.warning(f"Grading failed for {len(failed)} images: {failed[:5]}")
+    return {
+        'method': method,
+        'style': style if method == 'darktable' else None,
+        'output_dir': output_dir,
+        'graded': sorted(graded),
+        'skipped': skipped,
+        'removed': removed,
+        'failed': sorted(failed),
+        'cancelled': cancel_event.is_set()
+    }
@@ -2,38 +2,537 @@ import os
 import cv2
 import numpy as np
 import subprocess
-from typing import List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
 import re
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+from config import DEDUP_MAX_DISTANCE, DEDUP_WINDOW
+from log_config import SampledLogger
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
+# Per-frame and per-ffmpeg-line debug output
+frame_logger = SampledLogger(logger)
 
 class ImageData:
-    def __init__(self, relative_path: str, blurriness_score: float = None):
+    def __init__(self, relative_path: str, blurriness_score: float = None, dhash: int = None,
+                 metrics: Dict[str, float] = None):
         self.relative_path = relative_path
         self.blurriness_score = blurriness_score
+        self.dhash = dhash
+        # Quality metric name -> value; blurriness_score is the 'laplacian' metric
+        self.metrics = metrics or {}
         self.badges = []
 
-def calculate_blurriness(image_path: str) -> float:
+    def metric(self, name: str) -> float:
+        if name == 'laplacian':
+            return self.blurriness_score
+        return self.metrics.get(name)
+
+# Identifies the score in the on-disk cache; change the params whenever
+# score_image changes so stale scores are not reused
+SCORE_METRIC = 'laplacian_var'
+DHASH_METRIC = 'dhash'
+DHASH_PARAMS = {'size': 8}
+
+SCORE_DTYPES = {'CV_64F': cv2.CV_64F, 'CV_32F': cv2.CV_32F, 'CV_16S': cv2.CV_16S}
+
+class ScoreSettings:
+    """How score_image measures sharpness.
+
+    width: downscale frames wider than this before the Laplacian (None keeps
+        full resolution). Scores are relative, so selection is unaffected by
+        the change in magnitude.
+    dtype: Laplacian output depth. CV_32F halves the memory of CV_64F; CV_16S
+        keeps the exact integer Laplacian of 8-bit input and the variance is
+        accumulated in double precision.
+    tiles: (columns, rows). Each tile is scored separately and the frame score
+        is the given percentile of the tile scores, so a sharp subject is not
+        averaged away by a featureless sky.
+    """
+
+    def __init__(self, width: int = None, dtype: str = 'CV_64F', tiles: Tuple[int, int] = None,
+                 percentile: float = 75):
+        if dtype not in SCORE_DTYPES:
+            raise ValueError(f"Unknown scoring dtype: {dtype}")
+        self.width = width
+        self.dtype = dtype
+        self.tiles = tuple(tiles) if tiles else None
+        self.percentile = percentile
+
+    def params(self) -> dict:
+        """Score cache params; the full-resolution CV_64F defaults keep the original key"""
+        params = {'ddepth': self.dtype, 'ksize': 1}
+        if self.width:
+            params['width'] = self.width
+        if self.tiles:
+            params['tiles'] = list(self.tiles)
+            params['percentile'] = self.percentile
+        return params
+
+    def __repr__(self):
+        return f"ScoreSettings(width={self.width}, dtype={self.dtype}, tiles={self.tiles}, percentile={self.percentile})"
+
+DEFAULT_SCORE_SETTINGS = ScoreSettings()
+
+def _analysis_image(img: np.ndarray, width: int = None) -> np.ndarray:
+    if width and img.shape[1] > width:
+        height = max(1, int(round(img.shape[0] * width / img.shape[1])))
+        return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+    return img
+
+def _laplacian_variance(laplacian: np.ndarray) -> float:
+    if laplacian.dtype == np.float64:
+        return laplacian.var()
+    # meanStdDev accumulates in double without a float64 copy of the image
+    _, std_dev = cv2.meanStdDev(laplacian)
+    return float(std_dev[0, 0]) ** 2
+
+def tile_scores(img: np.ndarray, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS) -> np.ndarray:
+    """Laplacian variance of every tile of a grayscale image, shaped (rows, columns)"""
+    laplacian = cv2.Laplacian(_analysis_image(img, settings.width), SCORE_DTYPES[settings.dtype])
+    columns, rows = settings.tiles or (1, 1)
+    ys = np.linspace(0, laplacian.shape[0], rows + 1).astype(int)
+    xs = np.linspace(0, laplacian.shape[1], columns + 1).astype(int)
+    return np.array([
+        [_laplacian_variance(laplacian[ys[r]:ys[r + 1], xs[c]:xs[c + 1]]) for c in range(columns)]
+        for r in range(rows)
+    ])
+
+def score_image(img: np.ndarray, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS) -> float:
+    """Laplacian variance of a grayscale image buffer (higher is sharper)"""
+    if settings.tiles:
+        return float(np.percentile(tile_scores(img, settings), settings.percentile))
+    laplacian = cv2.Laplacian(_analysis_image(img, settings.width), SCORE_DTYPES[settings.dtype])
+    return _laplacian_variance(laplacian)
+
+class Metric:
+    """A quality metric plugin.
+
+    compute(batch, settings) gets a (frames, height, width) uint8 stack of
+    grayscale analysis images (already downscaled to settings.width) and
+    returns one value per frame. higher_is_better gives the direction used
+    by weighted selection. Bump version whenever compute changes so cached
+    values are recomputed.
+    """
+
+    def __init__(self, name: str, compute: Callable, higher_is_better: bool = True, version: int = 1):
+        self.name = name
+        self.compute = compute
+        self.higher_is_better = higher_is_better
+        self.version = version
+
+METRICS: Dict[str, Metric] = {}
+
+def register_metric(name: str, higher_is_better: bool = True, version: int = 1):
+    """Decorator registering compute(batch, settings) as the metric called name"""
+    def register(compute):
+        METRICS[name] = Metric(name, compute, higher_is_better, version)
+        return compute
+    return register
+
+@register_metric('laplacian')
+def _laplacian_metric(batch: np.ndarray, settings: ScoreSettings) -> np.ndarray:
+    return np.array([score_image(img, settings) for img in batch])
+
+@register_metric('tenengrad')
+def _tenengrad_metric(batch: np.ndarray, settings: ScoreSettings) -> np.ndarray:
+    """Mean squared Sobel gradient magnitude"""
+    values = []
+    for img in batch:
+        gx = cv2.Sobel(img, cv2.CV_32F, 1, 0, ksize=3)
+        gy = cv2.Sobel(img, cv2.CV_32F, 0, 1, ksize=3)
+        values.append(float((gx * gx + gy * gy).mean()))
+    return np.array(values)
+
+FFT_SIZE = 256
+
+@register_metric('fft_hf')
+def _fft_high_frequency_metric(batch: np.ndarray, settings: ScoreSettings) -> np.ndarray:
+    """Share of spectral energy above a quarter of the Nyquist frequency"""
+    height = max(8, int(round(batch.shape[1] * FFT_SIZE / batch.shape[2])))
+    small = np.stack([
+        cv2.resize(img, (FFT_SIZE, height), interpolation=cv2.INTER_AREA) for img in batch
+    ]).astype(np.float32)
+    small -= small.mean(axis=(1, 2), keepdims=True)
+    power = np.abs(np.fft.rfft2(small)) ** 2
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.rfftfreq(FFT_SIZE)[None, :]
+    high = np.sqrt(fx ** 2 + fy ** 2) > 0.125
+    total = power.sum(axis=(1, 2))
+    return np.where(total > 0, (power * high).sum(axis=(1, 2)) / np.maximum(total, 1e-12), 0.0)
+
+@register_metric('clipping', higher_is_better=False)
+def _clipping_metric(batch: np.ndarray, settings: ScoreSettings) -> np.ndarray:
+    """Fraction of pixels crushed to black or blown to white"""
+    return ((batch <= 2) | (batch >= 253)).mean(axis=(1, 2))
+
+@register_metric('luminance')
+def _luminance_metric(batch: np.ndarray, settings: ScoreSettings) -> np.ndarray:
+    """Mean brightness in [0, 1]; a positive weight prefers brighter frames"""
+    return batch.mean(axis=(1, 2)) / 255.0
+
+def compute_metrics(images: List[np.ndarray], names=('laplacian',),
+                    settings: ScoreSettings = DEFAULT_SCORE_SETTINGS) -> np.ndarray:
+    """Compute the named metrics for grayscale images, as a (len(images), len(names)) array.
+
+    Each image is downscaled once and images of the same size are stacked so
+    every metric runs over the whole batch.
+    """
+    values = np.empty((len(images), len(names)))
+    analysis = [_analysis_image(img, settings.width) for img in images]
+    shapes = {}
+    for i, img in enumerate(analysis):
+        shapes.setdefault(img.shape, []).append(i)
+    for indices in shapes.values():
+        batch = np.stack([analysis[i] for i in indices])
+        for column, name in enumerate(names):
+            values[indices, column] = METRICS[name].compute(batch, settings)
+    return values
+
+def with_laplacian(names) -> Tuple[str, ...]:
+    """Metric names with 'laplacian' first, since it backs blurriness_score"""
+    return ('laplacian',) + tuple(name for name in dict.fromkeys(names) if name != 'laplacian')
+
+def measure_frame(relative_path: str, gray: np.ndarray, metrics=('laplacian',),
+                  settings: ScoreSettings = DEFAULT_SCORE_SETTINGS) -> ImageData:
+    """ImageData for one decoded grayscale frame with its metrics and dHash"""
+    names = with_laplacian(metrics)
+    values = dict(zip(names, compute_metrics([gray], names, settings)[0].tolist()))
+    return ImageData(relative_path, values['laplacian'], compute_dhash(gray), values)
+
+def compute_dhash(img: np.ndarray, hash_size: int = 8) -> int:
+    """64-bit difference hash of a grayscale image buffer"""
+    small = cv2.resize(img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def calculate_blurriness(image_path: str, cache=None, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS) -> float:
+    if cache is not None:
+        cached = cache.get(image_path, SCORE_METRIC, settings.params())
+        if cached is not None:
+            return cached
+
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
     if img is None:
         logger.warning(f"Failed to read image: {image_path}")
         return None
     
-    score = cv2.Laplacian(img, cv2.CV_64F).var()
-    logger.debug(f"Calculated blurriness score for {image_path}: {score}")
+    score = score_image(img, settings)
+    frame_logger.debug("Calculated blurriness score for %s: %s", image_path, score)
+    if cache is not None:
+        cache.put(image_path, score, SCORE_METRIC, settings.params())
     return score
 
-def process_batch(image_data: List[ImageData], batch_size: int = 10) -> List[Tuple[str, float]]:
-    batch_scores = []
-    for img in image_data[:batch_size]:
+# SQLite integers are signed 64-bit
+def _to_signed64(value: int) -> int:
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _to_unsigned64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+def _metric_cache_key(name: str, settings: ScoreSettings) -> Tuple[str, dict]:
+    # Laplacian values keep the key they were cached under before metrics were pluggable
+    if name == 'laplacian':
+        return SCORE_METRIC, settings.params()
+    return name, dict(settings.params(), version=METRICS[name].version)
+
+def _measure_chunk(paths: List[str], names: Tuple[str, ...], settings: ScoreSettings, with_hashes: bool):
+    images = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            logger.warning(f"Failed to read image: {path}")
+        images.append(img)
+    readable = [i for i, img in enumerate(images) if img is not None]
+    values = compute_metrics([images[i] for i in readable], names, settings)
+
+    results = [(None, None)] * len(paths)
+    for row, i in enumerate(readable):
+        results[i] = (values[row], compute_dhash(images[i]) if with_hashes else None)
+    return results
+
+def measure_frames(paths: List[str], metrics=('laplacian',), workers: int = None, progress_queue=None,
+                   cache=None, with_hashes: bool = False, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS,
+                   chunk_size: int = 16):
+    """Compute quality metrics for many images, one decode per image.
+
+    Returns {metric name: [value per path]} (None for unreadable images), and
+    (values, hashes) with with_hashes. Images are read in chunks of chunk_size
+    on a thread pool (decoding and OpenCV release the GIL) and every chunk is
+    measured as one batch by compute_metrics. With a ScoreCache only images
+    missing any requested value are read.
+    """
+    names = tuple(metrics)
+    for name in names:
+        if name not in METRICS:
+            raise ValueError(f"Unknown quality metric: {name}")
+    workers = workers or os.cpu_count() or 1
+    values = {name: [None] * len(paths) for name in names}
+    hashes = [None] * len(paths)
+
+    missing = list(range(len(paths)))
+    if cache is not None:
+        hits = {name: cache.get_many(paths, *_metric_cache_key(name, settings)) for name in names}
+        hash_hits = cache.get_many(paths, DHASH_METRIC, DHASH_PARAMS) if with_hashes else {}
+        missing = [
+            i for i, path in enumerate(paths)
+            if any(path not in hits[name] for name in names) or (with_hashes and path not in hash_hits)
+        ]
+        for i, path in enumerate(paths):
+            for name in names:
+                values[name][i] = hits[name].get(path)
+            if path in hash_hits:
+                hashes[i] = _to_unsigned64(int(hash_hits[path]))
+        logger.info(f"Score cache: {len(paths) - len(missing)} hits, {len(missing)} to compute")
+
+    completed = len(paths) - len(missing)
+    if progress_queue is not None and completed:
+        progress_queue.put(completed)
+
+    chunks = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+    measure = lambda chunk: _measure_chunk([paths[i] for i in chunk], names, settings, with_hashes)
+
+    def store(chunk, results):
+        nonlocal completed
+        for i, (row, dhash) in zip(chunk, results):
+            if row is not None:
+                for name, value in zip(names, row):
+                    values[name][i] = float(value)
+            hashes[i] = dhash
+        completed += len(chunk)
+        if progress_queue is not None:
+            progress_queue.put(completed)
+
+    if workers <= 1:
+        for chunk in chunks:
+            store(chunk, measure(chunk))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(measure, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                store(futures[future], future.result())
+
+    if cache is not None and missing:
+        for name in names:
+            cache.put_many(
+                ((paths[i], values[name][i]) for i in missing if values[name][i] is not None),
+                *_metric_cache_key(name, settings)
+            )
+        if with_hashes:
+            cache.put_many(
+                ((paths[i], _to_signed64(hashes[i])) for i in missing if hashes[i] is not None),
+                DHASH_METRIC, DHASH_PARAMS
+            )
+    if with_hashes:
+        return values, hashes
+    return values
+
+def score_frames(paths: List[str], workers: int = None, progress_queue=None, cache=None,
+                 with_hashes: bool = False, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS):
+    """Laplacian scores of many images in the order of paths; (scores, hashes) with with_hashes"""
+    result = measure_frames(paths, ('laplacian',), workers, progress_queue, cache, with_hashes, settings)
+    if with_hashes:
+        values, hashes = result
+        return values['laplacian'], hashes
+    return result['laplacian']
+
+def spearman_correlation(a, b) -> float:
+    """Rank correlation of two score sequences (1.0 means identical ordering)"""
+    rank_a = np.argsort(np.argsort(a)).astype(np.float64)
+    rank_b = np.argsort(np.argsort(b)).astype(np.float64)
+    if len(rank_a) < 2 or rank_a.std() == 0 or rank_b.std() == 0:
+        return 1.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+def calibrate_scoring(paths: List[str], settings: ScoreSettings, reference: ScoreSettings = DEFAULT_SCORE_SETTINGS,
+                      sample: int = 200, top_fraction: float = 0.25) -> dict:
+    """Check how well settings reproduce the ranking of the reference scoring.
+
+    Up to sample images (spread evenly over paths) are decoded once and scored
+    with both settings. Reports the Spearman rank correlation, the share of the
+    reference top_fraction that is also in the candidate top_fraction, and the
+    scoring time per image of each (decoding excluded). With tiled settings
+    'tiles' reports the per-tile sharpness as (rows, columns) grids: the mean
+    over the images and the share of images in which each tile is the sharpest.
+    """
+    if sample and len(paths) > sample:
+        paths = [paths[int(i)] for i in np.linspace(0, len(paths) - 1, sample)]
+    images = [img for img in (cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in paths) if img is not None]
+    if not images:
+        raise ValueError("No readable images to calibrate on")
+
+    def timed_scores(score_settings):
+        started = time.perf_counter()
+        scores = np.array([score_image(img, score_settings) for img in images])
+        return scores, (time.perf_counter() - started) / len(images)
+
+    reference_scores, reference_time = timed_scores(reference)
+    scores, seconds = timed_scores(settings)
+    top = max(1, int(round(len(images) * top_fraction)))
+    reference_top = set(np.argsort(reference_scores)[-top:])
+    candidate_top = set(np.argsort(scores)[-top:])
+    summary = {
+        'images': len(images),
+        'settings': settings.params(),
+        'reference': reference.params(),
+        'spearman': spearman_correlation(reference_scores, scores),
+        'top_overlap': len(reference_top & candidate_top) / top,
+        'seconds_per_image': seconds,
+        'reference_seconds_per_image': reference_time,
+        'speedup': reference_time / seconds if seconds > 0 else None
+    }
+    if settings.tiles:
+        grids = np.stack([tile_scores(img, settings) for img in images])
+        sharpest = np.bincount(grids.reshape(len(images), -1).argmax(axis=1), minlength=grids[0].size)
+        summary['tiles'] = {
+            'grid': list(settings.tiles),
+            'mean': grids.mean(axis=0).tolist(),
+            'sharpest_share': (sharpest / len(images)).reshape(grids.shape[1:]).tolist()
+        }
+    return summary
+
+class HashIndex:
+    """Multi-index hashing over 64-bit hashes for Hamming radius queries.
+
+    The hash is split into max_distance + 1 bands; by the pigeonhole principle
+    any hash within max_distance of a stored one matches it exactly in at
+    least one band, so only those bucket members need a full comparison.
+    With capacity set, adding beyond it evicts the oldest stored hash, so
+    queries only see the most recent capacity hashes.
+    """
+
+    def __init__(self, max_distance: int, bits: int = 64, capacity: int = None):
+        self.max_distance = max_distance
+        self.capacity = capacity
+        bands = max_distance + 1
+        edges = np.linspace(0, bits, bands + 1).astype(int)
+        self._bands = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+        self._buckets = [{} for _ in self._bands]
+        self._hashes = {}  # Insertion index -> hash, oldest first
+        self._next = 0
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, value: int) -> int:
+        """Store value and return its insertion index"""
+        if self.capacity is not None:
+            while self._hashes and len(self._hashes) >= self.capacity:
+                self.remove(next(iter(self._hashes)))
+        index = self._next
+        self._next += 1
+        self._hashes[index] = value
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((value >> shift) & mask, []).append(index)
+        return index
+
+    def remove(self, index: int) -> None:
+        value = self._hashes.pop(index)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            key = (value >> shift) & mask
+            members = buckets[key]
+            members.remove(index)
+            if not members:
+                del buckets[key]
+
+    def find_within(self, value: int) -> List[int]:
+        """Insertion indices of stored hashes within max_distance of value"""
+        candidates = set()
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            candidates.update(buckets.get((value >> shift) & mask, ()))
+        return sorted(i for i in candidates if hamming_distance(self._hashes[i], value) <= self.max_distance)
+
+def droppable_per_batch(batches: Sequence[int], min_images: int) -> Dict[int, int]:
+    """Near duplicates each batch may lose while keeping min_images (or all it has, if fewer).
+
+    batches holds the batch number of every selected frame.
+    """
+    counts = {}
+    for batch in batches:
+        counts[batch] = counts.get(batch, 0) + 1
+    return {batch: count - min(min_images, count) for batch, count in counts.items()}
+
+def remove_near_duplicates(image_data: List[ImageData], selected_paths: List[str],
+                           max_distance: int = DEDUP_MAX_DISTANCE, window: int = DEDUP_WINDOW,
+                           batch_size: int = None, min_images: int = 0) -> List[str]:
+    """Drop selected frames whose dHash is within max_distance of a recently kept frame.
+
+    Frames are visited in sequence order, so the earliest of a group of near
+    duplicates is kept. Only the last window kept frames are compared against
+    (None compares against all), so a view the camera returns to later is
+    kept. With batch_size, no batch of image_data is cut below min_images
+    selected frames. Frames without a hash are always kept.
+    """
+    hashes = {img.relative_path: img.dhash for img in image_data}
+    order = {img.relative_path: i for i, img in enumerate(image_data)}
+    selected_paths = sorted(selected_paths, key=lambda p: order.get(p, -1))
+    batch_of = (lambda path: order.get(path, -1) // batch_size) if batch_size else (lambda path: 0)
+    droppable = droppable_per_batch([batch_of(path) for path in selected_paths], min_images if batch_size else 0)
+    index = HashIndex(max_distance, capacity=window)
+    kept = []
+    for path in selected_paths:
+        value = hashes.get(path)
+        if value is not None:
+            batch = batch_of(path)
+            if droppable[batch] and index.find_within(value):
+                droppable[batch] -= 1
+                continue
+            index.add(value)
+        kept.append(path)
+    logger.info(f"Near-duplicate removal kept {len(kept)} of {len(selected_paths)} frames")
+    return kept
+
+def weighted_scores(image_data: List[ImageData], weights: Dict[str, float]) -> List[float]:
+    """Combine quality metrics into one score per frame.
+
+    Each weighted metric is divided by its mean over image_data (metrics where
+    lower is better use 2 - value / mean, floored at 0) and the results are
+    averaged with weights, giving scores around 1. Frames missing a weighted
+    metric get None. With only 'laplacian' weighted the scores are
+    proportional to blurriness_score, so selection is unchanged.
+    """
+    weights = {name: weight for name, weight in weights.items() if weight}
+    if not weights:
+        raise ValueError("At least one metric needs a non-zero weight")
+    total = np.zeros(len(image_data))
+    missing = np.zeros(len(image_data), dtype=bool)
+    for name, weight in weights.items():
+        values = np.array([np.nan if img.metric(name) is None else img.metric(name) for img in image_data], dtype=np.float64)
+        missing |= np.isnan(values)
+        mean = np.nanmean(values) if not np.all(np.isnan(values)) else 0.0
+        relative = values / mean if mean > 0 else np.ones(len(values))
+        if not METRICS[name].higher_is_better:
+            relative = np.maximum(0.0, 2.0 - relative)
+        total += weight * np.nan_to_num(relative)
+    total /= sum(weights.values())
+    return [None if missing[i] else float(total[i]) for i in range(len(image_data))]
+
+def process_batch(image_data: List[ImageData], batch_size: int = 10, cache=None,
+                  settings: ScoreSettings = DEFAULT_SCORE_SETTINGS, weights: Dict[str, float] = None) -> List[Tuple[str, float]]:
+    batch = image_data[:batch_size]
+    for img in batch:
         if img.blurriness_score is None:
-            img.blurriness_score = calculate_blurriness(img.relative_path)
+            img.blurriness_score = calculate_blurriness(img.relative_path, cache, settings)
         if img.blurriness_score is None:
             logger.warning(f"Failed to calculate blurriness score for {img.relative_path}")
-        batch_scores.append((img.relative_path, img.blurriness_score))
-    logger.debug(f"Processed batch scores: {batch_scores}")
+    if weights:
+        scores = weighted_scores(batch, weights)
+    else:
+        scores = [img.blurriness_score for img in batch]
+    batch_scores = [(img.relative_path, score) for img, score in zip(batch, scores)]
+    logger.debug("Processed batch scores: %s", batch_scores)
     return batch_scores
 
 def select_best_images(batch_scores: List[Tuple[str, float]], threshold: float, min_images: int, max_images: int) -> List[str]:
@@ -48,11 +547,11 @@ def select_best_images(batch_scores: List[Tuple[str, float]], threshold: float,
     mean_score = np.mean(scores)
     std_dev = np.std(scores)
 
-    logger.debug(f"Batch stats: mean={mean_score}, std_dev={std_dev}, threshold={threshold}")
+    logger.debug("Batch stats: mean=%s, std_dev=%s, threshold=%s", mean_score, std_dev, threshold)
 
     # Sort scores in descending order (higher score is better)
     sorted_scores = sorted(valid_scores, key=lambda x: x[1], reverse=True)
-    logger.debug(f"Sorted scores: {sorted_scores}")
+    logger.debug("Sorted scores: %s", sorted_scores)
 
     selected_paths = []
     if std_dev > threshold * mean_score:
@@ -68,40 +567,131 @@ def select_best_images(batch_scores: List[Tuple[str, float]], threshold: float,
     elif len(selected_paths) > max_images:
         selected_paths = selected_paths[:max_images]
 
-    logger.debug(f"Selected paths: {selected_paths}")
+    logger.debug("Selected paths: %s", selected_paths)
     return selected_paths
 
-def analyze_best_images(image_data: List[ImageData], batch_size: int = 10, threshold: float = 1.5, min_images: int = 2, max_images: int = 7) -> List[str]:
+def analyze_best_images(image_data: List[ImageData], batch_size: int = 10, threshold: float = 1.5, min_images: int = 2, max_images: int = 7, cache=None,
+                        settings: ScoreSettings = DEFAULT_SCORE_SETTINGS, weights: Dict[str, float] = None) -> List[str]:
     best_image_paths = []
     for i in range(0, len(image_data), batch_size):
         batch = image_data[i:i+batch_size]
-        batch_scores = process_batch(batch, batch_size)
+        batch_scores = process_batch(batch, batch_size, cache, settings, weights)
         selected_paths = select_best_images(batch_scores, threshold, min_images, max_images)
         best_image_paths.extend(selected_paths)
     logger.info(f"Total best image paths: {len(best_image_paths)}")
     return best_image_paths
 
-def extract_frames(video_path, output_dir, fps, new_width=None, progress_queue=None):
-    """Extract frames from video with progress updates"""
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Create FFmpeg command
-    ffmpeg_cmd = [
-        'ffmpeg', '-i', video_path,
-        '-vf', f'fps={fps}'
-    ]
-    
-    if new_width:
-        ffmpeg_cmd[-1] = f'fps={fps},scale={new_width}:-1'
-    
-    ffmpeg_cmd.extend([
-        os.path.join(output_dir, 'frame_%06d.jpg'),
-        '-hide_banner',
-        '-stats',
-        '-loglevel', 'info'
-    ])
+def _running_max(values: np.ndarray, width: int) -> np.ndarray:
+    """out[j] = max(values[j:j+width]) in O(n) (van Herk / Gil-Werman)"""
+    n_out = len(values) - width + 1
+    blocks = int(math.ceil(len(values) / width))
+    padded = np.full(blocks * width, -np.inf)
+    padded[:len(values)] = values
+    padded = padded.reshape(blocks, width)
+    prefix = np.maximum.accumulate(padded, axis=1).ravel()
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n_out], prefix[width - 1:width - 1 + n_out])
+
+def select_best_frames_global(scores, min_gap: int = 3, max_gap: int = None, window: int = 10,
+                              max_images: int = None) -> np.ndarray:
+    """Pick frame indices over the whole sequence in one vectorised pass.
+
+    A frame is kept when it is the sharpest within min_gap frames on either side
+    (ties go to the earliest frame, so kept frames are always more than min_gap
+    apart) and at least as sharp as the mean of the surrounding window frames.
+    If max_gap is set, any run of more than max_gap frames without a pick gets
+    its sharpest frame added so coverage never drops. max_images keeps the
+    highest scoring picks. Returns sorted indices into scores.
+    """
+    if isinstance(scores, np.ndarray):
+        scores = scores.astype(np.float64)
+    else:
+        scores = np.asarray([np.nan if score is None else score for score in scores], dtype=np.float64)
+    n = len(scores)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    valid = np.isfinite(scores)
+    values = np.where(valid, scores, -np.inf)
+
+    radius = max(0, int(min_gap))
+    padded = np.concatenate([np.full(radius, -np.inf), values, np.full(radius, -np.inf)])
+    keep = valid & (values >= _running_max(padded, 2 * radius + 1))
+    if radius:
+        keep &= values > _running_max(padded, radius)[:n]
+
+    # Rolling mean over the valid scores in a centred window
+    half = max(1, int(window)) // 2
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, scores, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    lo = np.clip(np.arange(n) - half, 0, n)
+    hi = np.clip(np.arange(n) + half + 1, 0, n)
+    local_mean = (sums[hi] - sums[lo]) / np.maximum(counts[hi] - counts[lo], 1)
+    keep &= values >= local_mean
 
-    logger.debug(f"FFmpeg command: {' '.join(ffmpeg_cmd)}")
+    selected = np.flatnonzero(keep)
+
+    if max_gap:
+        # Fill coverage holes; each fill splits a gap so this terminates quickly
+        picks = [-1] + selected.tolist() + [n]
+        i = 0
+        while i < len(picks) - 1:
+            a, b = picks[i], picks[i + 1]
+            if b - a > max_gap:
+                lo_idx, hi_idx = a + 1 + radius, b - radius
+                if lo_idx >= hi_idx:
+                    lo_idx, hi_idx = a + 1, b
+                candidate = lo_idx + int(np.argmax(values[lo_idx:hi_idx]))
+                if valid[candidate]:
+                    picks.insert(i + 1, candidate)
+                    continue
+            i += 1
+        selected = np.asarray(picks[1:-1], dtype=np.int64)
+
+    if max_images is not None and len(selected) > max_images:
+        best = np.argsort(-values[selected], kind='stable')[:max_images]
+        selected = np.sort(selected[best])
+
+    return selected
+
+def analyze_best_images_global(image_data: List[ImageData], min_gap: int = 3, max_gap: int = None,
+                               window: int = 10, max_images: int = None, weights: Dict[str, float] = None) -> List[str]:
+    """Global counterpart of analyze_best_images working on the whole scored sequence"""
+    if weights:
+        scores = weighted_scores(image_data, weights)
+    else:
+        scores = [img.blurriness_score for img in image_data]
+    indices = select_best_frames_global(
+        scores,
+        min_gap=min_gap, max_gap=max_gap, window=window, max_images=max_images
+    )
+    best_image_paths = [image_data[i].relative_path for i in indices]
+    logger.info(f"Total best image paths: {len(best_image_paths)}")
+    return best_image_paths
+
+def calculate_statistics(image_data: List[ImageData]) -> dict:
+    """Summary of the scores and 'Best' badges of a set of frames"""
+    blurriness_scores = [frame.blurriness_score for frame in image_data if frame.blurriness_score is not None]
+    best_images = [frame for frame in image_data if 'Best' in frame.badges]
+
+    # Mean of every other quality metric the frames carry
+    metric_means = {}
+    for name in dict.fromkeys(name for frame in image_data for name in frame.metrics):
+        values = [frame.metrics[name] for frame in image_data if frame.metrics.get(name) is not None]
+        if name != 'laplacian' and values:
+            metric_means[name] = float(np.mean(values))
+
+    return {
+        "total_frames": len(image_data),
+        "best_images": len(best_images),
+        "avg_blurriness": float(np.mean(blurriness_scores)) if blurriness_scores else 0.0,
+        "min_blurriness": float(min(blurriness_scores)) if blurriness_scores else 0.0,
+        "max_blurriness": float(max(blurriness_scores)) if blurriness_scores else 0.0,
+        "metric_means": metric_means
+    }
+
+def _run_ffmpeg(ffmpeg_cmd: List[str], on_frame=None) -> None:
+    """Run ffmpeg, calling on_frame(frames_processed) for every stats line"""
+    logger.debug("FFmpeg command: %s", ffmpeg_cmd)
 
     # Start FFmpeg process
     process = subprocess.Popen(
@@ -112,75 +702,580 @@ def extract_frames(video_path, output_dir, fps, new_width=None, progress_queue=N
         bufsize=1
     )
 
-    frames_processed = 0
-    
+    # Keep the tail of the output for the error message; stderr is consumed by the loop
+    output_tail = deque(maxlen=20)
+
     # Read FFmpeg output in real-time from stderr
     while True:
         line = process.stderr.readline()
         if not line and process.poll() is not None:
             break
+        output_tail.append(line)
             
         if 'frame=' in line:
             try:
                 frame_match = re.search(r'frame=\s*(\d+)', line)
-                if frame_match and progress_queue is not None:
-                    frames_processed = int(frame_match.group(1))
-                    progress_queue.put(frames_processed)
-                    logger.debug(f"Put frame {frames_processed} in queue")
+                if frame_match and on_frame is not None:
+                    on_frame(int(frame_match.group(1)))
             except Exception as e:
                 logger.error(f"Error parsing FFmpeg output: {e}")
         
         # Also log the raw FFmpeg output for debugging
-        logger.debug(f"FFmpeg output: {line.strip()}")
+        frame_logger.debug("FFmpeg output: %s", line.rstrip())
 
     process.wait()
 
     if process.returncode != 0:
-        error_output = process.stderr.read()
-        raise RuntimeError(f"FFmpeg failed with error: {error_output}")
+        raise RuntimeError(f"FFmpeg failed with error: {''.join(output_tail)}")
 
-    # Get list of extracted frames
-    extracted_frames = sorted([
+def _list_extracted_frames(output_dir: str) -> List[str]:
+    return sorted([
         f for f in os.listdir(output_dir)
         if f.startswith('frame_') and f.endswith('.jpg')
     ])
 
+def extract_frames(video_path, output_dir, fps, new_width=None, progress_queue=None):
+    """Extract frames from video with progress updates"""
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Create FFmpeg command
+    ffmpeg_cmd = [
+        'ffmpeg', '-i', video_path,
+        '-vf', f'fps={fps}'
+    ]
+    
+    if new_width:
+        ffmpeg_cmd[-1] = f'fps={fps},scale={new_width}:-1'
+    
+    ffmpeg_cmd.extend([
+        os.path.join(output_dir, 'frame_%06d.jpg'),
+        '-hide_banner',
+        '-stats',
+        '-loglevel', 'info'
+    ])
+
+    _run_ffmpeg(ffmpeg_cmd, progress_queue.put if progress_queue is not None else None)
+
+    # Get list of extracted frames
+    extracted_frames = _list_extracted_frames(output_dir)
+
     # Put one final update to ensure we show 100% completion
     if progress_queue is not None:
         progress_queue.put(len(extracted_frames))
 
     return extracted_frames
 
-def get_video_info(video_path: str) -> dict:
+def frame_timestamp(frame_number: int, fps) -> float:
+    """Presentation time in seconds of frame_%06d number frame_number at the given fps"""
+    return (frame_number - 1) / fps
+
+def extract_frames_segmented(video_path, output_dir, fps, new_width=None, progress_queue=None,
+                             segments=None, video_info=None):
+    """Extract frames with several ffmpeg processes, each covering one time range.
+
+    The timeline is cut on output-frame boundaries so segment i starts exactly at
+    frame_timestamp(first_frame, fps). Input seeking (-ss before -i) jumps to the
+    preceding keyframe and decodes up to that point, and -start_number makes each
+    segment write straight into the global frame_%06d numbering, so no merge or
+    rename step is needed. Progress from all segments is summed into progress_queue.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if video_info is None:
+        video_info = get_video_info(video_path)
+
+    expected_frames = max(1, int(math.ceil(video_info['duration'] * fps)))
+    segments = max(1, min(segments or os.cpu_count() or 1, expected_frames))
+    frames_per_segment = int(math.ceil(expected_frames / segments))
+    decoder_threads = max(1, (os.cpu_count() or 1) // segments)
+
+    video_filter = f'fps={fps}'
+    if new_width:
+        video_filter += f',scale={new_width}:-1'
+
+    segment_commands = []
+    for i in range(segments):
+        first_frame = i * frames_per_segment + 1
+        start_time = frame_timestamp(first_frame, fps)
+        if start_time >= video_info['duration']:
+            break
+        ffmpeg_cmd = [
+            'ffmpeg', '-hide_banner', '-nostdin', '-stats', '-loglevel', 'info',
+            '-threads', str(decoder_threads),
+            '-ss', f'{start_time:.6f}',
+            '-i', video_path,
+            '-vf', video_filter,
+            '-start_number', str(first_frame)
+        ]
+        if i < segments - 1:
+            ffmpeg_cmd += ['-frames:v', str(frames_per_segment)]
+        ffmpeg_cmd.append(os.path.join(output_dir, 'frame_%06d.jpg'))
+        segment_commands.append(ffmpeg_cmd)
+
+    logger.info(f"Extracting {expected_frames} frames in {len(segment_commands)} segments")
+
+    segment_progress = [0] * len(segment_commands)
+    progress_lock = threading.Lock()
+
+    def report(segment_index, frames_processed):
+        with progress_lock:
+            segment_progress[segment_index] = frames_processed
+            total = sum(segment_progress)
+        if progress_queue is not None:
+            progress_queue.put(total)
+
+    with ThreadPoolExecutor(max_workers=len(segment_commands)) as executor:
+        futures = [
+            executor.submit(_run_ffmpeg, cmd, lambda n, i=i: report(i, n))
+            for i, cmd in enumerate(segment_commands)
+        ]
+        for future in futures:
+            future.result()
+
+    extracted_frames = _list_extracted_frames(output_dir)
+    if progress_queue is not None:
+        progress_queue.put(len(extracted_frames))
+    return extracted_frames
+
+def _output_size(video_info: dict, new_width: int = None) -> Tuple[int, int]:
+    """Frame size ffmpeg will emit for the given target width"""
+    width, height = (int(v) for v in video_info['resolution'].split('x'))
+    if new_width:
+        # Keep the aspect ratio but pin the height explicitly so the raw
+        # frame size is known before the first byte arrives
+        height = max(2, int(round(height * new_width / width / 2)) * 2)
+        width = new_width
+    return width, height
+
+def stream_frames(video_path: str, fps, new_width: int = None, video_info: dict = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame_number, bgr_frame) decoded from an ffmpeg rawvideo pipe.
+
+    Frame numbers start at 1 to match the frame_%06d.jpg naming of extract_frames.
+    With fps=None every decoded frame is yielded.
+    """
+    if video_info is None:
+        video_info = get_video_info(video_path)
+    width, height = _output_size(video_info, new_width)
+
+    filters = []
+    if fps:
+        filters.append(f'fps={fps}')
+    if new_width:
+        filters.append(f'scale={width}:{height}')
+
+    ffmpeg_cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', video_path]
+    if filters:
+        ffmpeg_cmd += ['-vf', ','.join(filters)]
+    ffmpeg_cmd += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+    for frame_number, frame in enumerate(_pipe_frames(ffmpeg_cmd, (height, width, 3)), start=1):
+        yield frame_number, frame
+
+def _pipe_frames(ffmpeg_cmd: List[str], shape: Tuple[int, ...], stderr_lines: List[str] = None) -> Iterator[np.ndarray]:
+    """Yield frames of the given shape read from the rawvideo stdout of ffmpeg_cmd.
+
+    stderr is collected into stderr_lines (when given) while ffmpeg runs.
+    """
+    logger.debug("FFmpeg command: %s", ffmpeg_cmd)
+    frame_bytes = int(np.prod(shape))
+    process = subprocess.Popen(
+        ffmpeg_cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=frame_bytes
+    )
+
+    # Drain stderr on the side so a chatty ffmpeg can never block the pipe
+    stderr_lines = [] if stderr_lines is None else stderr_lines
+    stderr_thread = threading.Thread(
+        target=lambda: stderr_lines.extend(line.decode(errors='replace') for line in process.stderr),
+        daemon=True
+    )
+    stderr_thread.start()
+
+    try:
+        while True:
+            buffer = process.stdout.read(frame_bytes)
+            if len(buffer) < frame_bytes:
+                break
+            yield np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+
+        process.wait()
+        stderr_thread.join()
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed with error: {''.join(stderr_lines[-20:])}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+_PTS_TIME = re.compile(r'pts_time:\s*(-?[\d.]+)')
+
+@lru_cache(maxsize=None)
+def _passthrough_sync() -> Tuple[str, ...]:
+    """ffmpeg options passing frames through with their own timestamps.
+
+    -vsync is deprecated since ffmpeg 5.1 in favour of -fps_mode; older
+    builds only know -vsync.
+    """
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-h', 'long'], capture_output=True, text=True)
+        if '-fps_mode' not in result.stdout:
+            return ('-vsync', 'passthrough')
+    except OSError:
+        pass
+    return ('-fps_mode', 'passthrough')
+
+def decode_keyframes(video_path: str, new_width: int = None, video_info: dict = None, max_frames: int = None,
+                     timestamps: List[float] = None) -> Iterator[np.ndarray]:
+    """Yield the gray frame of every keyframe, skipping the decode of all other frames.
+
+    With max_frames, keyframes closer than duration / max_frames to the last
+    one passed on are dropped by a select filter, so about max_frames evenly
+    spread frames come out however short the GOP. Frames are yielded as
+    ffmpeg emits them, so none have to be held in memory. Their timestamps
+    come from the showinfo filter, which logs one line per frame in output
+    order; they are appended to timestamps (when given) once ffmpeg finished.
+    """
+    if video_info is None:
+        video_info = get_video_info(video_path)
+    width, height = _output_size(video_info, new_width)
+    filters = []
+    if max_frames:
+        interval = video_info['duration'] / max_frames
+        filters.append(f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{interval:.3f})'")
+    if new_width:
+        filters.append(f'scale={width}:{height}')
+    ffmpeg_cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'info', '-nostats',
+        '-skip_frame', 'nokey', '-i', video_path,
+        '-vf', ','.join(filters + ['showinfo']),
+        *_passthrough_sync(),
+        '-f', 'rawvideo', '-pix_fmt', 'gray', '-'
+    ]
+    stderr_lines = []
+    count = 0
+    for frame in _pipe_frames(ffmpeg_cmd, (height, width), stderr_lines):
+        count += 1
+        yield frame
+    if timestamps is not None:
+        found = [float(match.group(1)) for match in map(_PTS_TIME.search, stderr_lines) if match]
+        if len(found) != count:
+            # Fall back to spreading the keyframes evenly over the clip
+            found = np.linspace(0, video_info['duration'], count, endpoint=False).tolist()
+        timestamps.extend(found)
+
+def estimate_keyframes(video_path: str, video_info: dict = None, packets: int = 500) -> Optional[int]:
+    """Keyframe count of the clip estimated from the flags of its first packets, without decoding.
+
+    Returns None when ffprobe cannot read the packets.
+    """
+    if video_info is None:
+        video_info = get_video_info(video_path)
     try:
         result = subprocess.run([
             'ffprobe',
             '-v', 'error',
             '-select_streams', 'v:0',
-            '-count_packets',
-            '-show_entries', 'stream=width,height,r_frame_rate,nb_read_packets',
+            '-read_intervals', f'%+#{packets}',
+            '-show_entries', 'packet=flags',
             '-of', 'csv=p=0',
             video_path
         ], capture_output=True, text=True, check=True)
-        
-        # Split the output and handle potential missing values
-        values = result.stdout.strip().split(',')
-        if len(values) < 4:
-            raise RuntimeError(f"Unexpected ffprobe output format: {result.stdout}")
-            
-        width, height, frame_rate, total_frames = values[:4]  # Take first 4 values
-        frame_rate = eval(frame_rate)  # This safely evaluates the fraction
-        
-        return {
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.warning(f"Could not read the packet flags of {video_path}: {e}")
+        return None
+    flags = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    if not flags:
+        return None
+    keyframes = sum(flag.startswith('K') for flag in flags)
+    return max(1, int(round(keyframes / len(flags) * video_info['total_frames'])))
+
+def seek_frame(video_path: str, timestamp: float, new_width: int = None, video_info: dict = None) -> Optional[np.ndarray]:
+    """Gray frame at timestamp, decoded by seeking instead of reading the clip up to it.
+
+    Returns None when nothing is decoded there, e.g. past the last frame of a
+    clip whose container duration is slightly off.
+    """
+    if video_info is None:
+        video_info = get_video_info(video_path)
+    width, height = _output_size(video_info, new_width)
+    ffmpeg_cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-ss', f'{timestamp:.3f}', '-i', video_path, '-frames:v', '1']
+    if new_width:
+        ffmpeg_cmd += ['-vf', f'scale={width}:{height}']
+    ffmpeg_cmd += ['-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+    frames = list(_pipe_frames(ffmpeg_cmd, (height, width)))
+    return frames[0] if frames else None
+
+# Frames waiting for the JPEG writer; decoding blocks once this many are queued,
+# which bounds the memory held to this many raw frames
+_WRITE_QUEUE_FRAMES = 32
+
+@contextmanager
+def _jpeg_writer(jpeg_quality: int, max_pending: int = _WRITE_QUEUE_FRAMES):
+    """Encode frames to JPEG on a background thread; yields put(path, frame).
+
+    Raises RuntimeError on exit when a frame could not be written.
+    """
+    write_queue = queue.Queue(maxsize=max_pending)
+    write_errors = []
+
+    def writer():
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            path, frame = item
+            if not cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]):
+                write_errors.append(path)
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+    try:
+        yield lambda path, frame: write_queue.put((path, frame))
+    finally:
+        write_queue.put(None)
+        writer_thread.join()
+
+    if write_errors:
+        raise RuntimeError(f"Failed to write {len(write_errors)} frames, first: {write_errors[0]}")
+
+def extract_frames_streaming(video_path, output_dir, fps, new_width=None, progress_queue=None,
+                             write_all=True, batch_size=10, threshold=1.5, min_images=2, max_images=7,
+                             jpeg_quality=95, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS,
+                             metrics=('laplacian',), weights: Dict[str, float] = None) -> List[ImageData]:
+    """Decode, score and save frames in a single pass without re-reading JPEGs.
+
+    Frames are scored straight from the rawvideo buffer. With write_all every
+    frame is encoded to output_dir, otherwise only the frames kept by the batch
+    selection (same rules as analyze_best_images) are written and get the
+    'Best' badge. Every measured frame is returned either way, so statistics
+    and the frame table cover the whole clip. Encoding runs on a background
+    writer thread so it overlaps with decoding and scoring.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    frames = []
+    written = 0
+    pending = []
+
+    def write_frame(image_data, frame):
+        nonlocal written
+        put(os.path.join(output_dir, image_data.relative_path), frame)
+        written += 1
+
+    def flush_batch():
+        batch = [data for data, _ in pending]
+        scores = weighted_scores(batch, weights) if weights else [data.blurriness_score for data in batch]
+        batch_scores = [(data.relative_path, score) for data, score in zip(batch, scores)]
+        selected = set(select_best_images(batch_scores, threshold, min_images, max_images))
+        for data, frame in pending:
+            if data.relative_path in selected:
+                data.badges.append('Best')
+                write_frame(data, frame)
+        pending.clear()
+
+    with _jpeg_writer(jpeg_quality) as put:
+        for frame_number, frame in stream_frames(video_path, fps, new_width):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            image_data = measure_frame(f'frame_{frame_number:06d}.jpg', gray, metrics, settings)
+            frames.append(image_data)
+
+            if write_all:
+                write_frame(image_data, frame)
+            else:
+                pending.append((image_data, frame))
+                if len(pending) >= batch_size:
+                    flush_batch()
+
+            if progress_queue is not None:
+                progress_queue.put(frame_number)
+
+        if pending:
+            flush_batch()
+
+    logger.info(f"Streamed extraction wrote {written} of {len(frames)} frames to {output_dir}")
+    return frames
+
+def estimate_motion(previous: np.ndarray, current: np.ndarray, window: np.ndarray = None) -> Tuple[float, float]:
+    """Translation between two small float32 grayscale frames as a fraction of the frame width.
+
+    Returns (motion, response); a low phase correlation response means the
+    estimate is unreliable (e.g. motion blur or little texture).
+    """
+    (dx, dy), response = cv2.phaseCorrelate(previous, current, window)
+    return float(np.hypot(dx, dy)) / previous.shape[1], response
+
+def extract_frames_adaptive(video_path, output_dir, motion_threshold=0.08, analysis_fps=15,
+                            new_width=None, progress_queue=None, max_interval=2.0,
+                            analysis_width=160, min_response=0.1, jpeg_quality=95,
+                            settings: ScoreSettings = DEFAULT_SCORE_SETTINGS, metrics=('laplacian',)) -> List[ImageData]:
+    """Sample frames by accumulated camera motion instead of at a fixed rate.
+
+    Candidate frames are decoded at analysis_fps (None for every frame). Motion
+    between consecutive candidates is estimated with phase correlation on
+    analysis_width-wide grayscale copies. Once the accumulated motion reaches
+    motion_threshold (a fraction of the frame width), or max_interval seconds
+    pass without a pick, the sharpest candidate seen since the previous pick is
+    written. Slow pans therefore produce fewer frames and fast moves more.
+    Matches with a correlation response below min_response reuse the previous
+    motion estimate.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    video_info = get_video_info(video_path)
+    candidate_fps = analysis_fps or video_info['frame_rate']
+    max_candidates = max(1, int(round(max_interval * candidate_fps))) if max_interval else None
+
+    kept_frames = []
+
+    previous = None
+    window = None
+    last_motion = 0.0
+    accumulated = 0.0
+    candidates_since_pick = 0
+    best = None  # (ImageData, frame) of the sharpest candidate since the last pick
+
+    def emit():
+        image_data, frame = best
+        put(os.path.join(output_dir, image_data.relative_path), frame)
+        kept_frames.append(image_data)
+
+    with _jpeg_writer(jpeg_quality) as put:
+        for frame_number, frame in stream_frames(video_path, analysis_fps, new_width, video_info):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            small_height = max(8, int(round(gray.shape[0] * analysis_width / gray.shape[1])))
+            small = cv2.resize(gray, (analysis_width, small_height), interpolation=cv2.INTER_AREA).astype(np.float32)
+            if window is None:
+                window = cv2.createHanningWindow((analysis_width, small_height), cv2.CV_32F)
+
+            if previous is not None:
+                motion, response = estimate_motion(previous, small, window)
+                # Carry the last trustworthy estimate over unreliable matches
+                if response >= min_response:
+                    last_motion = motion
+                accumulated += last_motion
+            previous = small
+            candidates_since_pick += 1
+
+            image_data = measure_frame(f'frame_{frame_number:06d}.jpg', gray, metrics, settings)
+            if best is None or image_data.blurriness_score > best[0].blurriness_score:
+                best = (image_data, frame)
+
+            if accumulated >= motion_threshold or (max_candidates and candidates_since_pick >= max_candidates):
+                emit()
+                best = None
+                accumulated = 0.0
+                candidates_since_pick = 0
+
+            if progress_queue is not None:
+                progress_queue.put(frame_number)
+
+        # Always keep a frame from the tail so the end of the clip is covered
+        if best is not None:
+            emit()
+
+    logger.info(f"Adaptive sampling kept {len(kept_frames)} frames in {output_dir}")
+    return kept_frames
+
+_video_info_cache = {}
+_video_info_lock = threading.Lock()
+
+def _parse_rational(value) -> float:
+    """Parse an ffprobe rational such as '30000/1001'; returns None when undefined"""
+    if value in (None, '', 'N/A'):
+        return None
+    try:
+        if '/' in str(value):
+            num, den = str(value).split('/', 1)
+            num, den = float(num), float(den)
+            return num / den if den else None
+        return float(value)
+    except ValueError:
+        return None
+
+def _count_video_packets(video_path: str) -> int:
+    """Slow path: demux the whole file to count video packets"""
+    logger.info(f"Container does not report a frame count, counting packets in {video_path}")
+    result = subprocess.run([
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-count_packets',
+        '-show_entries', 'stream=nb_read_packets',
+        '-of', 'csv=p=0',
+        video_path
+    ], capture_output=True, text=True, check=True)
+    return int(result.stdout.strip().split(',')[0])
+
+def get_video_info(video_path: str) -> dict:
+    """Probe resolution, frame rate, frame count and duration from container metadata.
+
+    Results are cached per file (path, size and mtime) so repeated lookups are free.
+    """
+    try:
+        stat = os.stat(video_path)
+        cache_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        cache_key = None
+
+    with _video_info_lock:
+        if cache_key in _video_info_cache:
+            return dict(_video_info_cache[cache_key])
+
+    try:
+        result = subprocess.run([
+            'ffprobe',
+            '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries',
+            'stream=width,height,r_frame_rate,avg_frame_rate,nb_frames,duration'
+            ':stream_tags=rotate:stream_side_data=rotation:format=duration',
+            '-of', 'json',
+            video_path
+        ], capture_output=True, text=True, check=True)
+
+        probe = json.loads(result.stdout or '{}')
+        streams = probe.get('streams') or []
+        if not streams:
+            raise RuntimeError(f"No video stream found in {video_path}")
+        stream = streams[0]
+
+        width, height = int(stream['width']), int(stream['height'])
+        frame_rate = _parse_rational(stream.get('r_frame_rate')) or _parse_rational(stream.get('avg_frame_rate'))
+        if not frame_rate:
+            raise ValueError(f"Unknown frame rate: {stream.get('r_frame_rate')}")
+
+        # ffmpeg auto-rotates on decode, so report the displayed orientation
+        rotation = stream.get('tags', {}).get('rotate')
+        for side_data in stream.get('side_data_list', []):
+            rotation = side_data.get('rotation', rotation)
+        if rotation is not None and abs(int(float(rotation))) % 180 == 90:
+            width, height = height, width
+
+        duration = _parse_rational(stream.get('duration')) or _parse_rational(probe.get('format', {}).get('duration'))
+        nb_frames = stream.get('nb_frames')
+        if nb_frames not in (None, '', 'N/A') and int(nb_frames) > 0:
+            total_frames = int(nb_frames)
+        elif duration:
+            total_frames = int(round(duration * frame_rate))
+        else:
+            total_frames = _count_video_packets(video_path)
+        if not duration:
+            duration = total_frames / frame_rate
+
+        info = {
             'resolution': f"{width}x{height}",
             'frame_rate': frame_rate,
-            'total_frames': int(total_frames),
-            'duration': int(total_frames) / frame_rate
+            'total_frames': total_frames,
+            'duration': duration
         }
     except subprocess.CalledProcessError as e:
         logger.error(f"Error getting video info: {e}")
         logger.error(f"ffprobe stderr: {e.stderr}")
         raise RuntimeError(f"Failed to get video info: {e}")
-    except ValueError as e:
+    except (ValueError, KeyError) as e:
         logger.error(f"Error parsing video info values: {e}")
         raise RuntimeError(f"Failed to parse video info: {e}")
+
+    if cache_key is not None:
+        with _video_info_lock:
+            _video_info_cache[cache_key] = info
+    return dict(info)
@@ -0,0 +1,262 @@
+"""Per-stage resource usage for the run report.
+
+A RunRecorder subscribes to the start/finish events of a ProgressBus and
+samples wall time, CPU time, process I/O and resident memory around every
+stage. Counters are process wide: when several jobs run at once (the batch
+queue) each job's report also includes the work done by the others, and
+stages that overlapped another recorder's stage are marked 'shared'. The
+peak RSS fields are the highest so far in the process, not per stage. CPU
+time and peak RSS of child processes (ffmpeg, RealityCapture, darktable) are
+only available on POSIX systems and only once the child has been waited for.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from progress import ProgressBus, STAGE_STARTED, STAGE_FINISHED
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_VERSION = 2
+
+def _maxrss_bytes(who) -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+def _io_counters():
+    """Bytes read and written by this process, including reads served from the page cache"""
+    if psutil is not None:
+        try:
+            io = psutil.Process().io_counters()
+            return getattr(io, 'read_chars', io.read_bytes), getattr(io, 'write_chars', io.write_bytes)
+        except (psutil.Error, AttributeError):
+            pass
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields['rchar']), int(fields['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def _rss() -> Optional[int]:
+    """Current resident set size of this process"""
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_info().rss
+        except psutil.Error:
+            pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError, AttributeError):
+        return None
+
+def _peak_rss() -> Optional[int]:
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        # peak_wset only exists on Windows
+        peak = getattr(memory, 'peak_wset', None)
+        if peak is not None:
+            return peak
+    return _maxrss_bytes(resource.RUSAGE_SELF) if resource is not None else None
+
+def _sample() -> dict:
+    times = os.times()
+    bytes_read, bytes_written = _io_counters()
+    return {
+        'wall': time.perf_counter(),
+        'cpu': times.user + times.system,
+        'child_cpu': times.children_user + times.children_system,
+        'bytes_read': bytes_read,
+        'bytes_written': bytes_written,
+        'rss': _rss()
+    }
+
+def _delta(start, end):
+    return None if start is None or end is None else end - start
+
+class RunRecorder:
+    # Stages currently running per recorder, to spot runs sharing the process counters
+    _open_stages: Dict['RunRecorder', int] = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, bus: ProgressBus = None):
+        self._lock = threading.Lock()
+        self._started: Dict[str, dict] = {}
+        self.stages: Dict[str, dict] = {}
+        self.created = time.time()
+        if bus is not None:
+            self.attach(bus)
+
+    def attach(self, bus: ProgressBus) -> None:
+        bus.subscribe(self._on_event, kinds=(STAGE_STARTED, STAGE_FINISHED))
+
+    def _on_event(self, event) -> None:
+        sample = _sample()
+        if event.kind == STAGE_STARTED:
+            sample['shared'] = False
+            with self._lock:
+                self._started[event.stage] = sample
+            if self._open_stage():
+                sample['shared'] = True
+            return
+        with self._lock:
+            start = self._started.pop(event.stage, None)
+        if start is None:
+            return
+        self._close_stage()
+
+        wall = sample['wall'] - start['wall']
+        usage = {
+            'label': event.label,
+            'items': event.done,
+            'items_per_second': event.done / wall if wall > 0 else 0.0,
+            'wall': wall,
+            'cpu': sample['cpu'] - start['cpu'],
+            'child_cpu': sample['child_cpu'] - start['child_cpu'],
+            'bytes_read': _delta(start['bytes_read'], sample['bytes_read']),
+            'bytes_written': _delta(start['bytes_written'], sample['bytes_written']),
+            'rss_before': start['rss'],
+            'rss_after': sample['rss'],
+            'process_peak_rss': _peak_rss(),
+            'child_peak_rss': _maxrss_bytes(resource.RUSAGE_CHILDREN) if resource is not None else None,
+            'shared': start['shared']
+        }
+        with self._lock:
+            self.stages[event.stage] = usage
+
+    def _open_stage(self) -> bool:
+        """Count a started stage; True if another recorder has a stage running"""
+        with RunRecorder._open_lock:
+            others = [recorder for recorder, count in RunRecorder._open_stages.items() if recorder is not self and count]
+            for recorder in others:
+                recorder._mark_shared()
+            RunRecorder._open_stages[self] = RunRecorder._open_stages.get(self, 0) + 1
+        return bool(others)
+
+    def _close_stage(self) -> None:
+        with RunRecorder._open_lock:
+            count = RunRecorder._open_stages.get(self, 0) - 1
+            if count > 0:
+                RunRecorder._open_stages[self] = count
+            else:
+                RunRecorder._open_stages.pop(self, None)
+
+    def _mark_shared(self) -> None:
+        with self._lock:
+            for start in self._started.values():
+                start['shared'] = True
+
+    def annotate(self, stage: str, **fields) -> None:
+        """Attach extra fields (e.g. output_bytes for files written by ffmpeg) to a finished stage"""
+        with self._lock:
+            if stage in self.stages:
+                self.stages[stage].update(fields)
+
+    def report(self, **extra) -> dict:
+        with self._lock:
+            stages = {name: dict(usage) for name, usage in self.stages.items()}
+        report = {
+            'version': REPORT_VERSION,
+            'created': self.created,
+            'platform': sys.platform,
+            'cpu_count': os.cpu_count(),
+            'stages': stages,
+            'totals': {
+                'wall': sum(usage['wall'] for usage in stages.values()),
+                'cpu': sum(usage['cpu'] for usage in stages.values()),
+                'child_cpu': sum(usage['child_cpu'] for usage in stages.values()),
+                'process_peak_rss': max((usage['process_peak_rss'] or 0 for usage in stages.values()), default=0),
+                'shared': any(usage['shared'] for usage in stages.values())
+            }
+        }
+        report.update(extra)
+        return report
+
+    def write(self, path: str, **extra) -> dict:
+        report = self.report(**extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        return report
+
+def _megabytes(value) -> str:
+    return "n/a" if value is None else f"{value / (1024 * 1024):.1f} MB"
+
+def format_report(report: dict) -> str:
+    """One line per stage, for the GUI results step and logs"""
+    lines = []
+    for name, usage in report['stages'].items():
+        line = (
+            f"{name}: {usage['wall']:.2f}s wall, {usage['cpu']:.2f}s CPU"
+            f" ({usage['child_cpu']:.2f}s in subprocesses)"
+        )
+        if usage['items']:
+            line += f", {usage['items_per_second']:.1f} items/s"
+        line += f", read {_megabytes(usage['bytes_read'])}, wrote {_megabytes(usage['bytes_written'])}"
+        if usage.get('output_bytes') is not None:
+            line += f" ({_megabytes(usage['output_bytes'])} of output files)"
+        line += f", memory {_megabytes(usage['rss_before'])} -> {_megabytes(usage['rss_after'])}"
+        if usage['shared']:
+            line += " (shared with another run)"
+        lines.append(line)
+    lines.append(f"Process peak memory: {_megabytes(report['totals']['process_peak_rss'])}")
+    return "\n".join(lines)
+
+class StartupProfile:
+    """Import and initialization phases of application start-up, for --profile-startup.
+
+    Phases may run on other threads (background preloading, tool discovery);
+    each is recorded with its offset from started and the thread it ran on.
+    """
+
+    def __init__(self, started: float = None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float) -> None:
+        with self._lock:
+            self.phases.append({
+                'name': name,
+                'offset': start - self.started,
+                'seconds': end - start,
+                'thread': threading.current_thread().name
+            })
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter())
+
+    def mark(self, name: str) -> None:
+        """Record a milestone, e.g. the first rendered frame"""
+        now = time.perf_counter()
+        self.add(name, now, now)
+
+    def format(self) -> str:
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase['offset'])
+        lines = [f"{'phase':<32} {'start':>9} {'took':>9}  thread"]
+        for phase in phases:
+            lines.append(
+                f"{phase['name']:<32} {phase['offset'] * 1000:>7.1f}ms {phase['seconds'] * 1000:>7.1f}ms  {phase['thread']}"
+            )
+        return "\n".join(lines)
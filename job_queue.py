@@ -0,0 +1,173 @@
+"""Queue of videos processed concurrently with bounded decoders and scorers."""
+import os
+import threading
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List
+
+from config import (
+    AUTOMATIC_OUTPUT_DIR, SCORING_WORKERS, VIDEO_EXTENSIONS,
+    MAX_CONCURRENT_JOBS, MAX_CONCURRENT_DECODERS, MAX_CONCURRENT_SCORERS
+)
+from pipeline import run_pipeline
+from progress import ProgressBus, STAGE_STARTED
+
+logger = logging.getLogger(__name__)
+
+class _Slot:
+    """Semaphore that records on the job while it is waiting for the slot.
+
+    Once acquired, the stage started event sets the job status.
+    """
+
+    def __init__(self, semaphore: threading.Semaphore, job: 'Job', status: str):
+        self.semaphore = semaphore
+        self.job = job
+        self.status = status
+
+    def __enter__(self):
+        self.job.status = f"waiting ({self.status})"
+        self.semaphore.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+        return False
+
+class Job:
+    def __init__(self, video_path: str, project_name: str = None):
+        self.video_path = video_path
+        self.project_name = project_name or os.path.splitext(os.path.basename(video_path))[0]
+        self.status = "queued"
+        self.progress = ProgressBus()
+        self.progress.subscribe(self._on_stage, kinds=(STAGE_STARTED,))
+        self.summary = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def _on_stage(self, event):
+        self.status = event.stage
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def frames_processed(self) -> int:
+        # Streaming and adaptive extraction score while decoding and have no 'score' stage
+        for stage in ('score', 'extract'):
+            snapshot = self.progress.snapshot(stage)
+            if snapshot is not None:
+                return snapshot.done
+        return 0
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames_processed / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'video': self.video_path,
+            'project_name': self.project_name,
+            'status': self.status,
+            'frames_processed': self.frames_processed,
+            'elapsed': self.elapsed,
+            'frames_per_second': self.frames_per_second,
+            'stages': self.progress.summary(),
+            'error': self.error,
+            'summary': self.summary
+        }
+
+class JobQueue:
+    """Runs many videos through run_pipeline, each in its own project folder.
+
+    At most max_jobs pipelines run at once, and of those at most max_decoders
+    may run ffmpeg and at most max_scorers may score frames at the same time.
+    Scoring threads are split between the scorer slots so the pool as a whole
+    stays at SCORING_WORKERS threads.
+    """
+
+    def __init__(self, output_dir: str = AUTOMATIC_OUTPUT_DIR, max_jobs: int = MAX_CONCURRENT_JOBS,
+                 max_decoders: int = MAX_CONCURRENT_DECODERS, max_scorers: int = MAX_CONCURRENT_SCORERS,
+                 **pipeline_options):
+        self.output_dir = output_dir
+        self.max_jobs = max(1, max_jobs)
+        self.decoders = threading.Semaphore(max(1, max_decoders))
+        self.scorers = threading.Semaphore(max(1, max_scorers))
+        pipeline_options.setdefault('workers', max(1, SCORING_WORKERS // max(1, max_scorers)))
+        self.pipeline_options = pipeline_options
+        self.jobs: List[Job] = []
+        self.started_at = None
+        self.finished_at = None
+
+    def add(self, video_path: str, project_name: str = None) -> Job:
+        job = Job(video_path, project_name)
+        # Project folders are timestamped to the second, keep names unique
+        names = {existing.project_name for existing in self.jobs}
+        base_name, suffix = job.project_name, 2
+        while job.project_name in names:
+            job.project_name = f"{base_name}-{suffix}"
+            suffix += 1
+        self.jobs.append(job)
+        return job
+
+    def add_folder(self, folder: str) -> List[Job]:
+        videos = sorted(
+            f for f in os.listdir(folder)
+            if f.lower().endswith(VIDEO_EXTENSIONS)
+        )
+        return [self.add(os.path.join(folder, f)) for f in videos]
+
+    def _run_job(self, job: Job) -> None:
+        job.started_at = time.perf_counter()
+        job.status = "starting"
+        try:
+            job.summary = run_pipeline(
+                job.video_path,
+                output_dir=self.output_dir,
+                project_name=job.project_name,
+                progress=job.progress,
+                decode_slot=_Slot(self.decoders, job, "extract"),
+                score_slot=_Slot(self.scorers, job, "score"),
+                **self.pipeline_options
+            )
+            job.status = "done"
+        except Exception as e:
+            logger.exception(f"Job failed: {job.video_path}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.perf_counter()
+
+    def run(self, on_update=None, update_interval: float = 1.0) -> List[Job]:
+        """Process every queued job, calling on_update(status) periodically"""
+        self.started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            pending = {executor.submit(self._run_job, job) for job in self.jobs if job.status == "queued"}
+            while pending:
+                if on_update is not None:
+                    on_update(self.status())
+                # Wake early when a job finishes so the last one doesn't cost a full interval
+                _, pending = wait(pending, timeout=update_interval, return_when=FIRST_COMPLETED)
+        self.finished_at = time.perf_counter()
+        if on_update is not None:
+            on_update(self.status())
+        return self.jobs
+
+    def status(self) -> Dict:
+        elapsed = ((self.finished_at or time.perf_counter()) - self.started_at) if self.started_at else 0.0
+        frames_processed = sum(job.frames_processed for job in self.jobs)
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            'jobs': [job.to_dict() for job in self.jobs],
+            'counts': counts,
+            'elapsed': elapsed,
+            'frames_processed': frames_processed,
+            'frames_per_second': frames_processed / elapsed if elapsed else 0.0
+        }
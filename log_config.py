@@ -0,0 +1,86 @@
+"""Logging set up in one place for the GUI, the CLI and scripts.
+
+configure_logging() gives the root logger a single QueueHandler. A
+QueueListener thread does the console and file I/O, so ffmpeg readers,
+scoring workers and the GUI loop never wait on it. Hot paths log with
+%-style arguments, which are only formatted once a record passes the level
+check, and per-frame messages go through a SampledLogger that only emits
+every LOG_SAMPLE_EVERY-th call. With the default INFO level, debug calls
+on the hot paths cost one level check.
+"""
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+from config import LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_SAMPLE_EVERY
+
+_LOG_FILE_BYTES = 10 * 1024 * 1024
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+def _stop_listener() -> None:
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        # Flushes the records still queued before the handlers close
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = _queue_handler = None
+
+def configure_logging(level=LOG_LEVEL, log_file: str = LOG_FILE, stream=sys.stderr) -> None:
+    """Send all logging through one queue to stream and/or a rotating log_file.
+
+    level is a level number or name. Calling it again replaces the previous
+    configuration, e.g. to apply --verbose.
+    """
+    global _listener, _queue_handler
+    _stop_listener()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=_LOG_FILE_BYTES, backupCount=3, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    with _lock:
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers)
+        _listener.start()
+
+atexit.register(_stop_listener)
+
+class SampledLogger:
+    """Logs only the first and then every every-th message, for per-frame output.
+
+    Calls below the logger's level return before counting or formatting.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = LOG_SAMPLE_EVERY):
+        self.logger = logger
+        self.every = max(1, every)
+        self._calls = itertools.count()
+
+    def log(self, level: int, msg: str, *args) -> None:
+        if self.logger.isEnabledFor(level) and next(self._calls) % self.every == 0:
+            self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args) -> None:
+        self.log(logging.DEBUG, msg, *args)
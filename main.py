@@ -1,25 +1,34 @@
-import cv2
+import time
+_STARTED = time.perf_counter()
+
 import dearpygui.dearpygui as dpg
 import os
+import sys
+import argparse
 import subprocess
 from config import (
     AUTOMATIC_OUTPUT_DIR, SOURCE_IMAGES_DIR, BEST_IMAGES_DIR,
-    DEFAULT_FPS, BATCH_SIZE, THRESHOLD,
-    RC_EXECUTABLE, DARKTABLE_EXECUTABLE
+    DEFAULT_FPS, BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES,
+    DARKTABLE_EXECUTABLE, SCORING_WORKERS, SCORE_CACHE_FILE, RUN_REPORT_FILE
 )
-from image_analyzer import extract_frames, get_video_info, analyze_best_images, ImageData, calculate_blurriness
+from utils.file_operations import create_project_folder as utils_create_project_folder, total_file_size
+from manifest import ProjectManifest
+from progress import ProgressBus
+from instrumentation import RunRecorder, StartupProfile, format_report
+from log_config import configure_logging
+from tools import discover_tools, missing_tools
 import logging
 import threading
-import shutil
 import textwrap
-import statistics
-from datetime import datetime
-import queue
-import time
 import re
 
-logging.basicConfig(level=logging.DEBUG)
+# OpenCV, NumPy and the pipeline modules are imported where they are first
+# used, and preloaded on a background thread once the window is up
+PRELOADED_MODULES = ("image_analyzer", "frame_table", "pipeline", "preview", "ui.components", "utils.score_cache")
+
 logger = logging.getLogger(__name__)
+startup = StartupProfile(_STARTED)
+startup.add("import main", _STARTED, time.perf_counter())
 
 # Update these constants for styling
 FONT_SIZE = 16
@@ -28,11 +37,15 @@ ITEM_SPACING = 10
 BUTTON_WIDTH = 200
 INPUT_WIDTH = 200
 
-# Add at the top of the file with other global variables
-default_font = None
-bold_font = None
-light_font = None
-italic_font = None
+# Font handles by style; bold, light and italic are loaded after the first frame
+fonts = {}
+FONT_FILES = {
+    "default": "Inter_18pt-Medium.ttf",
+    "bold": "Inter_18pt-Bold.ttf",
+    "light": "Inter_18pt-ExtraLight.ttf",
+    "italic": "Inter_18pt-Italic.ttf"
+}
+_pending_fonts = []
 
 class AppState:
     def __init__(self):
@@ -41,31 +54,83 @@ class AppState:
         self.fps = DEFAULT_FPS
         self.new_width = None
         self.video_info = {}
-        self.extracted_frames = []
+        self.extracted_frames = None
         self.current_step = 0
-        self.batch_size = 10
-        self.threshold = 1.5
+        self.batch_size = BATCH_SIZE
+        self.threshold = THRESHOLD
         self.project_name = ""
         self.project_folder = ""
-        self.min_images = 2  # Updated default value
-        self.max_images = 7  # Updated default value
+        self.min_images = MIN_IMAGES
+        self.max_images = MAX_IMAGES
+        self.score_cache = None
+        self.manifest = None
+        self.preview = None
+        self.align_cancel = None  # Set while RealityCapture runs; setting the event cancels it
+        self.tools_checked = False
+        self.tools_missing = []
+        self.progress = ProgressBus()
+        self.shown_progress_version = 0
+        self.recorder = RunRecorder(self.progress)
 
 app_state = AppState()
 
+# Paged tables; rows are created once and reused for every page. Created on first use.
+image_table = None
+results_table = None
+
+def add_font(style: str):
+    font_dir = os.path.join(os.path.dirname(__file__), "fonts")
+    fonts[style] = dpg.add_font(os.path.join(font_dir, FONT_FILES[style]), size=18, parent="font_registry")
+    return fonts[style]
+
 def setup_font():
-    """Setup and return font handles"""
-    global default_font, bold_font, light_font, italic_font
-    
-    with dpg.font_registry():
-        font_dir = os.path.join(os.path.dirname(__file__), "fonts")
-        default_font = dpg.add_font(os.path.join(font_dir, "Inter_18pt-Medium.ttf"), size=18)
-        bold_font = dpg.add_font(os.path.join(font_dir, "Inter_18pt-Bold.ttf"), size=18)
-        light_font = dpg.add_font(os.path.join(font_dir, "Inter_18pt-ExtraLight.ttf"), size=18)
-        italic_font = dpg.add_font(os.path.join(font_dir, "Inter_18pt-Italic.ttf"), size=18)
-        
-        dpg.bind_font(default_font)
-    
-    return default_font, bold_font, light_font, italic_font
+    """Load the default font; the styled ones follow in load_styled_fonts"""
+    dpg.add_font_registry(tag="font_registry")
+    dpg.bind_font(add_font("default"))
+
+def load_styled_fonts():
+    """Load the bold, light and italic fonts and bind them to the items waiting for them"""
+    for style in ("bold", "light", "italic"):
+        add_font(style)
+    for item, style in _pending_fonts:
+        if dpg.does_item_exist(item):
+            dpg.bind_item_font(item, fonts[style])
+    _pending_fonts.clear()
+
+def bind_font(item, style: str) -> None:
+    """Bind a styled font to item now, or once it has been loaded"""
+    if style in fonts:
+        dpg.bind_item_font(item, fonts[style])
+    else:
+        _pending_fonts.append((item, style))
+
+def preload_modules() -> None:
+    """Import the heavy modules in the background so the first click does not wait for them"""
+    import importlib
+
+    for name in PRELOADED_MODULES:
+        with startup.phase(f"import {name}"):
+            importlib.import_module(name)
+
+def check_tools() -> None:
+    """Show missing tools once background discovery finished; called once per rendered frame"""
+    future = discover_tools()
+    if app_state.tools_checked or not future.done():
+        return
+    app_state.tools_checked = True
+    try:
+        app_state.tools_missing = missing_tools()
+    except Exception as e:
+        logger.error(f"Tool discovery failed: {e}")
+        return
+    if 'ffmpeg' in app_state.tools_missing or 'ffprobe' in app_state.tools_missing:
+        error_msg = (
+            "Error: FFmpeg is not installed or not in the system PATH.\n"
+            "Please install FFmpeg and make sure it's accessible from the command line."
+        )
+        logger.error(error_msg)
+        dpg.set_value("open_project_status", error_msg)
+        dpg.configure_item("next_button_0", enabled=False)
 
 def setup_theme():
     with dpg.theme() as global_theme:
@@ -97,20 +162,89 @@ def wrap_text(text, width=50):
     return textwrap.fill(text, width=width)
 
 def create_project_folder():
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    app_state.project_folder = os.path.join(app_state.output_dir, f"{app_state.project_name}-{timestamp}")
-    os.makedirs(app_state.project_folder, exist_ok=True)
-    logger.info(f"Created project folder: {app_state.project_folder}")
+    app_state.project_folder = utils_create_project_folder(app_state.output_dir, app_state.project_name)
+    app_state.manifest = ProjectManifest(app_state.project_folder)
+
+def current_settings():
+    """Settings of the GUI session, as recorded in the project manifest"""
+    from pipeline import run_settings
+
+    return run_settings(
+        app_state.fps,
+        app_state.new_width if app_state.new_width and app_state.new_width > 0 else None,
+        app_state.batch_size,
+        app_state.threshold,
+        app_state.min_images,
+        app_state.max_images
+    )
+
+def open_project(sender, app_data, user_data):
+    """Reopen a project folder; extraction and scoring are reused if the video and settings are unchanged"""
+    try:
+        folder = subprocess.check_output([
+            'powershell', '-command',
+            "Add-Type -AssemblyName System.Windows.Forms;"
+            "$f = New-Object System.Windows.Forms.FolderBrowserDialog;"
+            f"$f.SelectedPath = '{app_state.output_dir}';"
+            "if ($f.ShowDialog() -eq [System.Windows.Forms.DialogResult]::OK) { $f.SelectedPath } else { 'CANCELLED' }"
+        ]).decode('utf-8').strip()
+        if not folder or folder == 'CANCELLED':
+            return
+
+        from image_analyzer import get_video_info
+
+        manifest = ProjectManifest.load(folder)
+        if not manifest.video_path or not os.path.exists(manifest.video_path):
+            raise FileNotFoundError(f"Video not found: {manifest.video_path}")
+
+        settings = manifest.settings
+        app_state.project_folder = folder
+        app_state.project_name = os.path.basename(folder)
+        app_state.manifest = manifest
+        app_state.video_path = manifest.video_path
+        app_state.video_info = get_video_info(manifest.video_path)
+        app_state.fps = settings.get('fps', app_state.fps)
+        app_state.new_width = settings.get('new_width')
+        app_state.batch_size = settings.get('batch_size', app_state.batch_size)
+        app_state.threshold = settings.get('threshold', app_state.threshold)
+        app_state.min_images = settings.get('min_images', app_state.min_images)
+        app_state.max_images = settings.get('max_images', app_state.max_images)
+        for tag, value in (("fps_input", app_state.fps), ("new_width_input", app_state.new_width or 0),
+                           ("batch_size_input", app_state.batch_size), ("min_images_input", app_state.min_images),
+                           ("max_images_input", app_state.max_images)):
+            dpg.set_value(tag, value)
+        dpg.set_value("project_name_input", app_state.project_name)
+        dpg.set_value("selected_video", f"Selected video:\n{wrap_text(os.path.basename(manifest.video_path))}")
+        update_video_info()
+        logger.info(f"Opened project {folder} (completed stages: {', '.join(manifest.reused()) or 'none'})")
+
+        # Straight to extraction, which finishes at once when the manifest is current
+        app_state.current_step = 2
+        advance_to_next_step()
+    except Exception as e:
+        error_msg = f"Error opening project:\n{wrap_text(str(e))}"
+        dpg.set_value("open_project_status", error_msg)
+        logger.error(error_msg)
+
+def get_score_cache():
+    """Open (or reuse) the score cache stored in the current project folder"""
+    cache_path = os.path.join(app_state.project_folder, SCORE_CACHE_FILE)
+    if app_state.score_cache is None or app_state.score_cache.db_path != cache_path:
+        if app_state.score_cache is not None:
+            app_state.score_cache.close()
+        from utils.score_cache import ScoreCache
+        app_state.score_cache = ScoreCache(cache_path)
+    return app_state.score_cache
 
 def update_project_name(sender, app_data, user_data):
     app_state.project_name = app_data
-    if app_state.project_name:
+    if app_state.project_name and not app_state.tools_missing:
         dpg.configure_item("next_button_0", enabled=True)
     else:
         dpg.configure_item("next_button_0", enabled=False)
 
 def confirm_project_name():
-    if app_state.project_name:  # Only proceed if there's a project name
+    if app_state.project_name and not app_state.tools_missing:  # Only proceed if there's a project name and FFmpeg
         advance_to_next_step()
 
 def select_video(sender, app_data, user_data):
@@ -124,8 +258,12 @@ def select_video(sender, app_data, user_data):
         ]).decode('utf-8').strip()
 
         if file_path and file_path != 'CANCELLED':
+            from image_analyzer import get_video_info
+
             app_state.video_path = file_path
             app_state.video_info = get_video_info(file_path)
+            app_state.preview = None
+            dpg.set_value("preview_status", "")
             update_video_info()
             status_msg = f"Selected video:\n{wrap_text(os.path.basename(file_path))}"
             dpg.set_value("selected_video", status_msg)
@@ -157,6 +295,46 @@ def update_video_info():
 def calculate_estimated_images(duration, fps):
     return int(duration * fps)
 
+def show_preview():
+    """Show the preview with the yield estimated for the current settings"""
+    if app_state.preview is None:
+        return
+    from preview import estimate_yield, format_preview
+
+    estimate = estimate_yield(
+        app_state.preview,
+        app_state.fps,
+        batch_size=app_state.batch_size,
+        threshold=app_state.threshold,
+        min_images=app_state.min_images,
+        max_images=app_state.max_images
+    )
+    dpg.set_value("preview_status", format_preview(app_state.preview, estimate))
+
+def preview_callback():
+    """Score keyframes in the background to estimate the sharpness distribution and yield"""
+    if not app_state.video_path:
+        return
+
+    def preview_thread():
+        from preview import preview_video
+
+        try:
+            dpg.set_value("preview_status", "Scoring keyframes...")
+            with app_state.progress.stage('preview', "Previewing keyframes") as stage:
+                app_state.preview = preview_video(
+                    app_state.video_path,
+                    video_info=app_state.video_info,
+                    progress_queue=stage
+                )
+            show_preview()
+        except Exception as e:
+            error_msg = f"Error previewing video:\n{wrap_text(str(e))}"
+            dpg.set_value("preview_status", error_msg)
+            logger.error(error_msg)
+
+    threading.Thread(target=preview_thread).start()
+
 def extract_frames_callback():
     if not app_state.video_path:
         status_msg = "Please select a video first."
@@ -177,107 +355,41 @@ def extract_frames_callback():
     dpg.set_value("extract_status", f"Extraction started... (0/{total_frames} frames)")
     dpg.configure_item("extraction_progress", show=True)
 
+    def finish_extraction():
+        app_state.recorder.annotate('extract', output_bytes=total_file_size(
+            output_dir, app_state.extracted_frames.paths
+        ))
+        status_msg = (
+            f"Complete! Processed {len(app_state.extracted_frames)} images:\n"
+            f"{wrap_text(output_dir)}"
+        )
+        dpg.set_value("extract_status", status_msg)
+        logger.info(status_msg)
+        dpg.configure_item("next_button_3", enabled=True)
+        dpg.configure_item("extraction_progress", show=False)
+        advance_to_next_step()
+
     def extraction_thread():
+        from pipeline import extract_and_score
+
         try:
-            # Create a queue to receive progress updates
-            progress_queue = queue.Queue()
-            
-            # Start a separate thread to update the UI
-            def update_progress():
-                last_update = 0
-                while True:
-                    try:
-                        # Get all available updates
-                        while True:
-                            try:
-                                frames_processed = progress_queue.get_nowait()
-                                last_update = frames_processed
-                            except queue.Empty:
-                                break
-                        
-                        # Update UI with the latest count
-                        if last_update > 0:
-                            dpg.set_value("extract_status", 
-                                f"Extracting frames... ({last_update}/{total_frames} frames)")
-                            logger.debug(f"Updated UI with frame count: {last_update}")
-                        
-                        # Check if extraction is complete
-                        if not extraction_running[0] and progress_queue.empty():
-                            break
-                            
-                        time.sleep(0.1)  # Short sleep to prevent UI freezing
-                        
-                    except Exception as e:
-                        logger.error(f"Error updating progress: {e}")
-                        break
-
-            extraction_running = [True]
-            progress_thread = threading.Thread(target=update_progress, daemon=True)
-            progress_thread.start()
-
-            # Run the extraction
-            extracted_frames = extract_frames(
-                app_state.video_path, 
-                output_dir, 
-                app_state.fps, 
+            app_state.manifest.set_run(app_state.video_path, current_settings())
+            app_state.extracted_frames = extract_and_score(
+                app_state.video_path,
+                output_dir,
+                app_state.fps,
                 new_width=current_width,
-                progress_queue=progress_queue
-            )
-
-            # Signal that extraction is complete
-            extraction_running[0] = False
-            progress_thread.join()
-
-            # Start sharpness calculation
-            total_images = len(extracted_frames)
-            app_state.extracted_frames = []
-            
-            def update_sharpness_progress():
-                while True:
-                    try:
-                        frames_processed = sharpness_queue.get(timeout=0.5)
-                        dpg.set_value("extract_status", 
-                            f"Calculating image sharpness... ({frames_processed}/{total_images} images)")
-                        logger.debug(f"Updated sharpness progress: {frames_processed}/{total_images}")
-                        
-                        if frames_processed >= total_images:
-                            break
-                    except queue.Empty:
-                        if not sharpness_running[0]:
-                            break
-                    except Exception as e:
-                        logger.error(f"Error updating sharpness progress: {e}")
-                        break
-
-            # Create new queue and thread for sharpness calculation
-            sharpness_queue = queue.Queue()
-            sharpness_running = [True]
-            sharpness_thread = threading.Thread(target=update_sharpness_progress, daemon=True)
-            sharpness_thread.start()
-
-            # Process frames and update progress
-            for i, frame in enumerate(extracted_frames):
-                frame_path = os.path.join(output_dir, frame)
-                sharpness_score = calculate_blurriness(frame_path)
-                app_state.extracted_frames.append(
-                    ImageData(frame, sharpness_score)
-                )
-                sharpness_queue.put(i + 1)
-                logger.debug(f"Processed sharpness for frame {i+1}: {sharpness_score}")
-
-            # Signal sharpness calculation is complete
-            sharpness_running[0] = False
-            sharpness_thread.join()
-            
-            status_msg = (
-                f"Complete! Processed {len(app_state.extracted_frames)} images:\n"
-                f"{wrap_text(output_dir)}"
+                video_info=app_state.video_info,
+                batch_size=app_state.batch_size,
+                threshold=app_state.threshold,
+                min_images=app_state.min_images,
+                max_images=app_state.max_images,
+                workers=SCORING_WORKERS,
+                cache=get_score_cache(),
+                progress=app_state.progress,
+                manifest=app_state.manifest
             )
-            dpg.set_value("extract_status", status_msg)
-            logger.info(status_msg)
-            dpg.configure_item("next_button_3", enabled=True)
-            dpg.configure_item("extraction_progress", show=False)
-            advance_to_next_step()
+            finish_extraction()
 
         except Exception as e:
             error_msg = f"Error processing frames:\n{wrap_text(str(e))}"
@@ -288,11 +400,28 @@ def extract_frames_callback():
     extraction_thread = threading.Thread(target=extraction_thread)
     extraction_thread.start()
 
+def show_progress():
+    """Show the latest extraction, scoring, alignment or grading progress; called once per rendered frame"""
+    progress = app_state.progress
+    if progress.version == app_state.shown_progress_version:
+        return
+    app_state.shown_progress_version = progress.version
+    snapshot = progress.snapshot()
+    if snapshot is None or snapshot.finished:
+        return
+    if snapshot.stage in ('extract', 'score'):
+        dpg.set_value("extract_status", snapshot.format())
+    elif snapshot.stage == 'align':
+        dpg.set_value("reality_capture_status", snapshot.format())
+    elif snapshot.stage == 'grade':
+        dpg.set_value("grading_status", snapshot.format())
+
 def update_fps(sender, app_data, user_data):
     app_state.fps = app_data
     logger.info(f"Updated frames per second to: {app_state.fps}")
     if app_state.video_info:
         update_video_info()
+        show_preview()
     else:
         dpg.set_value("video_info", f"Current FPS Setting: {app_state.fps}")
 
@@ -308,26 +437,17 @@ def update_new_width(sender, app_data, user_data):
         app_state.new_width = None
         logger.warning(f"Invalid width value: {app_data}")
 
+def get_table(name: str, parent: str):
+    from ui.components import VirtualTable
+
+    return VirtualTable(name, parent=parent)
+
 def update_image_table():
-    if not dpg.does_item_exist("image_table"):
-        with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp,
-                       borders_innerH=True, borders_outerH=True, borders_innerV=True,
-                       borders_outerV=True, tag="image_table", parent="step_4_group"):
-            # Add table columns with white text for header
-            for label in ["Image", "Sharpness Score", "Badges"]:
-                dpg.add_table_column(label=label)
-                with dpg.theme() as header_theme:
-                    with dpg.theme_component(dpg.mvTableColumn):
-                        dpg.add_theme_color(dpg.mvThemeCol_Text, (255, 255, 255))
-                dpg.bind_item_theme(dpg.last_item(), header_theme)
-    else:
-        dpg.delete_item("image_table", children_only=True)
-    
-    for frame in app_state.extracted_frames:
-        with dpg.table_row(parent="image_table"):
-            dpg.add_text(frame.relative_path)
-            dpg.add_text(f"{frame.blurriness_score:.2f}")
-            dpg.add_text(", ".join(frame.badges) if frame.badges else "")
+    global image_table
+    if image_table is None:
+        image_table = get_table("image_table", "step_4_group")
+    image_table.build()
+    image_table.set_frames(app_state.extracted_frames)
 
 def update_batch_size(sender, app_data, user_data):
     app_state.batch_size = app_data
@@ -348,29 +468,46 @@ def select_best_images(sender, app_data, user_data):
         logger.warning(status_msg)
         return
 
+    from pipeline import select_stage, copy_stage
+    from frame_table import BADGE_BEST
+
     logger.info("Analyzing best images...")
-    best_image_paths = analyze_best_images(
+    app_state.manifest.set_run(app_state.video_path, current_settings())
+    source_dir = os.path.join(app_state.project_folder, SOURCE_IMAGES_DIR)
+    best_image_paths = select_stage(
         app_state.extracted_frames,
+        app_state.progress,
+        app_state.manifest,
         batch_size=app_state.batch_size,
         threshold=app_state.threshold,
         min_images=app_state.min_images,
-        max_images=app_state.max_images
+        max_images=app_state.max_images,
+        source_dir=source_dir,
+        cache=get_score_cache()
     )
     best_output_dir = os.path.join(app_state.project_folder, BEST_IMAGES_DIR)
-    os.makedirs(best_output_dir, exist_ok=True)
-
-    logger.info(f"Copying best images to: {best_output_dir}")
-    for path in best_image_paths:
-        src_path = os.path.join(app_state.project_folder, SOURCE_IMAGES_DIR, path)
-        dst_path = os.path.join(best_output_dir, os.path.basename(path))
-        shutil.copy2(src_path, dst_path)
+    sync_result = copy_stage(
+        source_dir,
+        best_output_dir,
+        best_image_paths,
+        app_state.progress,
+        app_state.manifest
+    )
+    if sync_result is not None:
+        app_state.recorder.annotate('copy', methods=sync_result['methods'])
+        changes = f"{len(sync_result['added'])} added, {len(sync_result['removed'])} removed"
+    else:
+        changes = "unchanged"
 
-    # Update imageData with 'Best' badge for selected images
-    for frame in app_state.extracted_frames:
-        if frame.relative_path in best_image_paths:
-            frame.badges = frame.badges + ['Best'] if hasattr(frame, 'badges') else ['Best']
+    # Mark the selected frames 'Best'; reselection replaces the previous badges
+    frames = app_state.extracted_frames
+    frames.clear_badge(BADGE_BEST)
+    frames.set_badge(BADGE_BEST, frames.positions(best_image_paths))
 
-    status_msg = f"Copied {len(best_image_paths)} best images to:\n{wrap_text(best_output_dir)}"
+    status_msg = (
+        f"Selected {len(best_image_paths)} best images ({changes}) in:\n"
+        f"{wrap_text(best_output_dir)}"
+    )
     dpg.set_value("best_images_status", status_msg)
     logger.info(status_msg)
     logger.info(f"You can find the best images in:\n{wrap_text(os.path.abspath(best_output_dir))}")
@@ -380,25 +517,23 @@ def select_best_images(sender, app_data, user_data):
     dpg.configure_item("next_button_4", enabled=True)
 
 def update_results_table():
-    dpg.delete_item("results_table", children_only=True)
-    for frame in app_state.extracted_frames:
-        with dpg.table_row(parent="results_table"):
-            dpg.add_text(frame.relative_path)
-            dpg.add_text(f"{frame.blurriness_score:.2f}")
-            dpg.add_text(", ".join(frame.badges) if frame.badges else "")
+    global results_table
+    if results_table is None:
+        results_table = get_table("results_table", "step_5_group")
+    results_table.build()
+    results_table.set_frames(app_state.extracted_frames)
 
 def calculate_statistics():
-    blurriness_scores = [frame.blurriness_score for frame in app_state.extracted_frames]
-    best_images = [frame for frame in app_state.extracted_frames if 'Best' in frame.badges]
-    
-    stats = {
-        "total_frames": len(app_state.extracted_frames),
-        "best_images": len(best_images),
-        "avg_blurriness": statistics.mean(blurriness_scores),
-        "min_blurriness": min(blurriness_scores),
-        "max_blurriness": max(blurriness_scores)
-    }
-    return stats
+    return app_state.extracted_frames.statistics()
+
+def write_run_report():
+    """Write the run report to the project folder and show its summary in the results step"""
+    report = app_state.recorder.write(
+        os.path.join(app_state.project_folder, RUN_REPORT_FILE),
+        video=app_state.video_path,
+        statistics=calculate_statistics()
+    )
+    dpg.set_value("results_performance", format_report(report))
 
 def update_results():
     update_results_table()
@@ -410,104 +545,53 @@ def update_results():
         f"Average blurriness score: {stats['avg_blurriness']:.2f}\n"
         f"Min blurriness score: {stats['min_blurriness']:.2f}\n"
         f"Max blurriness score: {stats['max_blurriness']:.2f}\n"
+        + "".join(f"Average {name}: {value:.4g}\n" for name, value in stats['metric_means'].items()) +
         f"\nProject folder:\n{wrap_text(app_state.project_folder)}\n"
         f"\nSource images directory:\n{wrap_text(os.path.join(app_state.project_folder, SOURCE_IMAGES_DIR))}\n"
         f"\nBest images directory:\n{wrap_text(os.path.join(app_state.project_folder, BEST_IMAGES_DIR))}"
     )
     dpg.set_value("results_stats", stats_text)
-
-    # Add the new button for Reality Capture alignment
-    if not dpg.does_item_exist("reality_capture_button"):
-        dpg.add_button(
-            label="Align images with Reality Capture",
-            callback=run_reality_capture_alignment,
-            width=BUTTON_WIDTH,
-            parent="step_5_group"
-        )
-        dpg.add_text("", tag="reality_capture_status", wrap=550, parent="step_5_group")
-        dpg.bind_item_font(dpg.last_item(), italic_font)
+    write_run_report()
 
 def run_reality_capture_alignment():
+    """Start the alignment in the background, or cancel the one that is running"""
+    if app_state.align_cancel is not None:
+        app_state.align_cancel.set()
+        dpg.set_value("reality_capture_status", "Cancelling alignment...")
+        return
+    app_state.align_cancel = threading.Event()
+    dpg.configure_item("reality_capture_button", label="Cancel alignment")
+    threading.Thread(target=alignment_thread, args=(app_state.align_cancel,), daemon=True).start()
+
+def alignment_thread(cancel_event: threading.Event):
+    from pipeline import align_with_reality_capture
+
     try:
-        # Define paths
-        parent_dir = app_state.project_folder
-        project_file = os.path.join(parent_dir, "rc_project.rcproj")
-        images_folder = os.path.join(parent_dir, BEST_IMAGES_DIR)
-        export_folder = os.path.join(parent_dir, "RC_Export")
-        sparse_point_cloud_file = os.path.join(export_folder, "sparsePointCloud.ply")
-
-        # Print debug information
-        logger.info(f"Parent directory: {parent_dir}")
-        logger.info(f"Project file: {project_file}")
-        logger.info(f"Images folder: {images_folder}")
-        logger.info(f"Export folder: {export_folder}")
-
-        # Ensure export folder exists
-        os.makedirs(export_folder, exist_ok=True)
-
-        # Check if RealityCapture executable exists
-        if not os.path.exists(RC_EXECUTABLE):
-            raise FileNotFoundError(f"RealityCapture.exe not found at path: {RC_EXECUTABLE}")
-
-        # Check if images folder exists and contains images
-        if not os.path.exists(images_folder):
-            raise FileNotFoundError(f"Images folder not found: {images_folder}")
-
-        images = [f for f in os.listdir(images_folder) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-        if not images:
-            raise ValueError(f"No images found in folder: {images_folder}")
-
-        logger.info(f"Found {len(images)} images in folder: {images_folder}")
-        logger.info(f"First few images: {images[:5]}")
-
-        # Construct RealityCapture command
-        rc_command = [
-            RC_EXECUTABLE,
-            "-newScene",
-            "-addFolder", images_folder,  # Remove quotes around the path
-            "-align",
-            "-save", project_file,  # Remove quotes around the path
-            "-exportSparsePointCloud", sparse_point_cloud_file,  # Remove quotes around the path
-            "-exportRegistration", os.path.join(export_folder, "camera_params.csv"),  # Remove quotes around the path
-        ]
-
-        # Print the command for debugging
-        logger.info(f"RealityCapture command: {' '.join(rc_command)}")
-
-        # Run RealityCapture command using Popen
-        logger.info("Launching RealityCapture CLI to align images, save project, and export sparse point cloud and camera parameters...")
-        process = subprocess.Popen(rc_command)
-        
-        # Wait for the process to complete
-        process.wait()
+        result = align_with_reality_capture(
+            app_state.project_folder, progress=app_state.progress, cancel_event=cancel_event
+        )
+        write_run_report()
 
-        # Check if the process completed successfully
-        if process.returncode == 0:
-            logger.info("Reality Capture alignment completed successfully")
-            
-            # Move crmeta.db file
-            crmeta_src = os.path.join(images_folder, "crmeta.db")
-            crmeta_dst = os.path.join(export_folder, "crmeta.db")
-            
-            if os.path.exists(crmeta_src):
-                shutil.move(crmeta_src, crmeta_dst)
-                logger.info(f"Moved crmeta.db from {crmeta_src} to {crmeta_dst}")
+        if result['success']:
+            if result['crmeta_path']:
                 status_msg = (
                     "Alignment completed successfully!\n"
-                    f"Project saved to: {project_file}\n"
-                    f"Exports saved to: {export_folder}\n"
-                    f"crmeta.db moved to: {crmeta_dst}"
+                    f"Project saved to: {result['project_file']}\n"
+                    f"Exports saved to: {result['export_folder']}\n"
+                    f"crmeta.db moved to: {result['crmeta_path']}"
                 )
             else:
-                logger.warning(f"crmeta.db not found in {images_folder}")
                 status_msg = (
                     "Alignment completed successfully!\n"
-                    f"Project saved to: {project_file}\n"
-                    f"Exports saved to: {export_folder}\n"
+                    f"Project saved to: {result['project_file']}\n"
+                    f"Exports saved to: {result['export_folder']}\n"
                     "Note: crmeta.db was not found in the best images folder."
                 )
+        elif result['status'] == "cancelled":
+            status_msg = "Reality Capture alignment cancelled."
+        elif result['status'] == "timed out":
+            status_msg = f"Reality Capture alignment timed out after {result['elapsed']:.0f}s."
         else:
-            logger.error("Reality Capture alignment failed")
             status_msg = "Reality Capture alignment failed. Check the logs for more information."
 
         dpg.set_value("reality_capture_status", status_msg)
@@ -520,6 +604,9 @@ def run_reality_capture_alignment():
         error_msg = f"Unexpected error: {str(e)}"
         logger.error(error_msg)
         dpg.set_value("reality_capture_status", error_msg)
+    finally:
+        app_state.align_cancel = None
+        dpg.configure_item("reality_capture_button", label="Align images")
 
 def open_darktable():
     def run_darktable():
@@ -548,9 +635,12 @@ def open_darktable():
 
             # Run Darktable command using Popen
             logger.info("Launching Darktable with best images directory...")
-            subprocess.Popen(darktable_command)
-
-            logger.info("Darktable opened successfully")
+            # Waited for in this thread so the session shows up in the run report
+            with app_state.progress.stage('darktable', "Editing in Darktable"):
+                process = subprocess.Popen(darktable_command)
+                logger.info("Darktable opened successfully")
+                process.wait()
+            write_run_report()
         except FileNotFoundError as e:
             error_msg = f"Error: {str(e)}"
             logger.error(error_msg)
@@ -563,6 +653,31 @@ def open_darktable():
     # Run the Darktable command in a separate thread
     threading.Thread(target=run_darktable).start()
 
+def grade_best_images():
+    """Grade the best images in the background (darktable-cli with GRADING_STYLE, or the OpenCV fallback)"""
+    def grading_thread():
+        from pipeline import grade_stage
+
+        try:
+            result = grade_stage(app_state.project_folder, progress=app_state.progress)
+            write_run_report()
+            status_msg = (
+                f"Graded {len(result['graded'])} images with {result['method']} "
+                f"({result['skipped']} unchanged) in:\n{wrap_text(result['output_dir'])}"
+            )
+            if result['failed']:
+                status_msg += f"\n{len(result['failed'])} images failed. Check the logs for more information."
+            dpg.set_value("grading_status", status_msg)
+        except Exception as e:
+            error_msg = f"Error grading images: {str(e)}"
+            logger.error(error_msg)
+            dpg.set_value("grading_status", error_msg)
+        finally:
+            dpg.configure_item("grade_button", enabled=True)
+
+    dpg.configure_item("grade_button", enabled=False)
+    threading.Thread(target=grading_thread, daemon=True).start()
+
 def advance_to_next_step():
     if app_state.current_step == 0:
         create_project_folder()
@@ -584,7 +699,7 @@ def create_step_3_group():
     with dpg.group(tag="step_3_group", show=False):
         create_step_title(4, "Extract Frames", "step_3_group")
         dpg.add_text("Status:", tag="extract_status", wrap=550)
-        dpg.bind_item_font(dpg.last_item(), italic_font)
+        bind_font(dpg.last_item(), "italic")
         
         # Add a progress indicator (hidden by default)
         with dpg.group(horizontal=True, tag="extraction_progress", show=False):
@@ -608,22 +723,26 @@ def create_step_title(step_num: int, title: str, parent: str) -> None:
     with dpg.group(horizontal=True, parent=parent):
         # Step number in blue
         dpg.add_text(f"Step {step_num}:", color=(52, 140, 215))
-        dpg.bind_item_font(dpg.last_item(), bold_font)
+        bind_font(dpg.last_item(), "bold")
         # Title text
         dpg.add_text(title)
-        dpg.bind_item_font(dpg.last_item(), bold_font)
+        bind_font(dpg.last_item(), "bold")
     dpg.add_spacer(height=8, parent=parent)
 
-def run_gui():
-    dpg.create_context()
+def run_gui(profile_startup: bool = False):
+    with startup.phase("create_context"):
+        dpg.create_context()
 
-    setup_font()
-    setup_theme()
+    with startup.phase("setup_font"):
+        setup_font()
+    with startup.phase("setup_theme"):
+        setup_theme()
 
     # Add key handler for the entire window
     with dpg.handler_registry():
         dpg.add_key_press_handler(dpg.mvKey_Return, callback=lambda: confirm_project_name())
 
+    window_started = time.perf_counter()
     with dpg.window(label="Video Frame Extractor", width=600, height=400, pos=(10, 10), tag="main_window"):
         # Step 1: Name Project
         with dpg.group(tag="step_0_group"):
@@ -643,20 +762,23 @@ def run_gui():
                 enabled=False, 
                 tag="next_button_0"
             )
+            dpg.add_button(label="Open Existing Project", callback=open_project, width=BUTTON_WIDTH)
+            dpg.add_text("", tag="open_project_status", wrap=550)
+            bind_font(dpg.last_item(), "italic")
 
         # Step 2: Select Video
         with dpg.group(tag="step_1_group", show=False):
             create_step_title(2, "Select Video and Output", "step_1_group")
             dpg.add_button(label="Select Video", callback=select_video, width=BUTTON_WIDTH)
             dpg.add_text("", tag="selected_video", wrap=550)
-            dpg.bind_item_font(dpg.last_item(), italic_font)
+            bind_font(dpg.last_item(), "italic")
             dpg.add_button(label="Next", callback=lambda: advance_to_next_step(), width=BUTTON_WIDTH, enabled=False, tag="next_button_1")
 
         # Step 3: Video Settings
         with dpg.group(tag="step_2_group", show=False):
             create_step_title(3, "Video Info and Settings", "step_2_group")
             dpg.add_text("Video Info:", tag="video_info", wrap=550)
-            dpg.bind_item_font(dpg.last_item(), light_font)
+            bind_font(dpg.last_item(), "light")
             dpg.add_input_int(
                 label="Frames per Second", 
                 default_value=DEFAULT_FPS, 
@@ -671,6 +793,9 @@ def run_gui():
                 width=INPUT_WIDTH,
                 default_value=0  # 0 means no resizing
             )
+            dpg.add_button(label="Preview Sharpness", callback=preview_callback, width=BUTTON_WIDTH)
+            dpg.add_text("", tag="preview_status", wrap=550)
+            bind_font(dpg.last_item(), "italic")
             dpg.add_button(
                 label="Apply Settings & Continue", 
                 callback=lambda: advance_to_next_step(),
@@ -684,29 +809,34 @@ def run_gui():
         # Step 5: Select Best Images
         with dpg.group(tag="step_4_group", show=False):
             create_step_title(5, "Select Best Images", "step_4_group")
-            dpg.add_input_int(label="Batch Size", default_value=app_state.batch_size, callback=update_batch_size, width=INPUT_WIDTH)
-            dpg.add_input_int(label="Minimum Images", default_value=app_state.min_images, callback=update_min_images, width=INPUT_WIDTH)
-            dpg.add_input_int(label="Maximum Images", default_value=app_state.max_images, callback=update_max_images, width=INPUT_WIDTH)
+            dpg.add_input_int(label="Batch Size", default_value=app_state.batch_size, callback=update_batch_size, width=INPUT_WIDTH, tag="batch_size_input")
+            dpg.add_input_int(label="Minimum Images", default_value=app_state.min_images, callback=update_min_images, width=INPUT_WIDTH, tag="min_images_input")
+            dpg.add_input_int(label="Maximum Images", default_value=app_state.max_images, callback=update_max_images, width=INPUT_WIDTH, tag="max_images_input")
             dpg.add_button(label="Select Best Images", callback=select_best_images, width=BUTTON_WIDTH)
             dpg.add_text("Status:", tag="best_images_status", wrap=550)
-            dpg.bind_item_font(dpg.last_item(), italic_font)
+            bind_font(dpg.last_item(), "italic")
             dpg.add_button(label="Next", callback=lambda: advance_to_next_step(), width=BUTTON_WIDTH, enabled=False, tag="next_button_4")
 
         # Step 6: Results
         with dpg.group(tag="step_5_group", show=False):
             create_step_title(6, "Results", "step_5_group")
             dpg.add_text("Statistics:", color=(10, 10, 10))
-            dpg.bind_item_font(dpg.last_item(), bold_font)
+            bind_font(dpg.last_item(), "bold")
             dpg.add_text("", tag="results_stats", wrap=550)
-            dpg.bind_item_font(dpg.last_item(), light_font)
+            bind_font(dpg.last_item(), "light")
+            dpg.add_text("Performance:", color=(10, 10, 10))
+            bind_font(dpg.last_item(), "bold")
+            dpg.add_text("", tag="results_performance", wrap=550)
+            bind_font(dpg.last_item(), "light")
 
             dpg.add_button(
                 label="Align images",
+                tag="reality_capture_button",
                 callback=run_reality_capture_alignment,
                 width=BUTTON_WIDTH
             )
             dpg.add_text("", tag="reality_capture_status", wrap=550)
-            dpg.bind_item_font(dpg.last_item(), italic_font)
+            bind_font(dpg.last_item(), "italic")
 
             dpg.add_button(
                 label="Open in Darktable",
@@ -714,33 +844,64 @@ def run_gui():
                 width=BUTTON_WIDTH
             )
             dpg.add_text("", tag="darktable_status", wrap=550)
-            dpg.bind_item_font(dpg.last_item(), italic_font)
+            bind_font(dpg.last_item(), "italic")
+
+            dpg.add_button(
+                label="Grade best images",
+                tag="grade_button",
+                callback=grade_best_images,
+                width=BUTTON_WIDTH
+            )
+            dpg.add_text("", tag="grading_status", wrap=550)
+            bind_font(dpg.last_item(), "italic")
+
+    startup.add("build window", window_started, time.perf_counter())
 
-    dpg.create_viewport(title="Video Frame Extractor", width=620, height=440)
-    dpg.setup_dearpygui()
-    dpg.show_viewport()
+    with startup.phase("create_viewport"):
+        dpg.create_viewport(title="Video Frame Extractor", width=620, height=440)
+        dpg.setup_dearpygui()
+        dpg.show_viewport()
 
     dpg.set_primary_window("main_window", True)
     
     # Set focus to the project name input field
     dpg.focus_item(project_name_input)
     
+    with startup.phase("first frame"):
+        dpg.render_dearpygui_frame()
+    startup.mark("window shown")
+    with startup.phase("load_styled_fonts"):
+        load_styled_fonts()
+    preloader = threading.Thread(target=preload_modules, name="preload", daemon=True)
+    preloader.start()
+    if profile_startup:
+        def report():
+            preloader.join()
+            discover_tools().exception()
+            print(startup.format(), file=sys.stderr)
+        threading.Thread(target=report, daemon=True).start()
+
     while dpg.is_dearpygui_running():
+        show_progress()
+        check_tools()
         dpg.render_dearpygui_frame()
 
     dpg.destroy_context()
 
 
-def main():
-    # Check if FFmpeg is installed
-    try:
-        subprocess.run(["ffmpeg", "-version"], check=True, capture_output=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        logger.error("Error: FFmpeg is not installed or not in the system PATH.")
-        logger.error("Please install FFmpeg and make sure it's accessible from the command line.")
-        return
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Video Frame Extractor")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print how long each import and initialization phase took once the window is up")
+    args = parser.parse_args(argv)
+    configure_logging()
 
-    run_gui()
+    # FFmpeg is checked in the background; check_tools reports it once known
+    discovery_started = time.perf_counter()
+    discover_tools().add_done_callback(
+        lambda future: startup.add("tool discovery", discovery_started, time.perf_counter())
+    )
+    run_gui(profile_startup=args.profile_startup)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+"""Project manifest used to resume a project and re-run only what changed.
+
+MANIFEST_FILE in the project folder records the input video, the settings of
+the last run and, for every stage, the inputs it ran with and what it
+produced. A stage is skipped while it finished with the same inputs; starting
+a stage again discards it and every later stage, so e.g. a new max_images
+reruns selection and materialization but reuses the extracted and scored
+frames. The file is replaced atomically whenever a stage starts or finishes,
+so a crash leaves the last completed stage on disk.
+
+Per-frame results (frame lists, score columns) go to one .npz sidecar per
+stage next to the manifest, which only keeps its file name and hash. The
+manifest stays a few KB however long the clip, so saving it is cheap.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import MANIFEST_FILE
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+STAGES = ('extract', 'score', 'select', 'copy')
+_FINGERPRINT_BYTES = 1024 * 1024
+
+def video_fingerprint(path: str) -> dict:
+    """Size and a hash of the first and last MiB of a video.
+
+    Content based, so copying or moving the video does not count as a change,
+    and cheap enough for multi-gigabyte files.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_BYTES))
+        if size > 2 * _FINGERPRINT_BYTES:
+            f.seek(-_FINGERPRINT_BYTES, os.SEEK_END)
+            digest.update(f.read())
+    return {'size': size, 'sha1': digest.hexdigest()}
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_FINGERPRINT_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _normalise(value):
+    """value as it reads back from JSON (tuples become lists), so inputs compare equal"""
+    return json.loads(json.dumps(value, default=str))
+
+class ProjectManifest:
+    def __init__(self, project_folder: str):
+        self.project_folder = project_folder
+        self.path = os.path.join(project_folder, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._finished_here = set()
+        self.data = {'version': MANIFEST_VERSION, 'video': None, 'settings': {}, 'stages': {}}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.data = data
+            else:
+                logger.warning(f"Ignoring manifest with unsupported version {data.get('version')}: {self.path}")
+
+    @classmethod
+    def load(cls, project_folder: str) -> 'ProjectManifest':
+        """Manifest of an existing project; raises FileNotFoundError when there is none"""
+        if not os.path.exists(os.path.join(project_folder, MANIFEST_FILE)):
+            raise FileNotFoundError(f"No {MANIFEST_FILE} in project folder: {project_folder}")
+        return cls(project_folder)
+
+    @property
+    def video_path(self) -> Optional[str]:
+        return (self.data['video'] or {}).get('path')
+
+    @property
+    def settings(self) -> dict:
+        return self.data['settings']
+
+    def set_run(self, video_path: str, settings: dict) -> None:
+        """Record the video and the settings a resume should default to"""
+        video = {'path': os.path.abspath(video_path)}
+        settings = _normalise(settings)
+        with self._lock:
+            if self.data['video'] == video and self.data['settings'] == settings and os.path.exists(self.path):
+                return
+            self.data['video'] = video
+            self.data['settings'] = settings
+            self._save()
+
+    def is_current(self, stage: str, inputs: dict) -> bool:
+        """True when stage finished with exactly these inputs and its sidecar is still there"""
+        record = self.data['stages'].get(stage)
+        if record is None or record['status'] != 'done' or record['inputs'] != _normalise(inputs):
+            return False
+        sidecar = record.get('arrays')
+        return sidecar is None or os.path.exists(os.path.join(self.project_folder, sidecar['file']))
+
+    def results(self, stage: str) -> Optional[dict]:
+        record = self.data['stages'].get(stage)
+        return record['results'] if record is not None and record['status'] == 'done' else None
+
+    def arrays(self, stage: str) -> Optional[dict]:
+        """Sidecar arrays of a finished stage; None when it has none or the file changed since"""
+        import numpy as np
+
+        record = self.data['stages'].get(stage)
+        sidecar = record.get('arrays') if record is not None and record['status'] == 'done' else None
+        if sidecar is None:
+            return None
+        path = os.path.join(self.project_folder, sidecar['file'])
+        try:
+            if _file_sha1(path) != sidecar['sha1']:
+                logger.warning(f"Ignoring {path}, it changed since the {stage} stage wrote it")
+                return None
+            with np.load(path, allow_pickle=False) as data:
+                return {name: data[name] for name in data.files}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read {path}: {e}")
+            return None
+
+    def sidecar_path(self, stage: str) -> str:
+        return f"{os.path.splitext(self.path)[0]}.{stage}.npz"
+
+    def begin(self, stage: str, inputs: dict) -> None:
+        """Mark stage as running with inputs, discarding it and every later stage"""
+        with self._lock:
+            for name in STAGES[STAGES.index(stage):]:
+                record = self.data['stages'].pop(name, None)
+                if record is not None and record.get('arrays'):
+                    try:
+                        os.remove(os.path.join(self.project_folder, record['arrays']['file']))
+                    except OSError:
+                        pass
+            self.data['stages'][stage] = {
+                'status': 'running',
+                'inputs': _normalise(inputs),
+                'started': time.time(),
+                'results': None
+            }
+            self._save()
+
+    def complete(self, stage: str, arrays: Dict[str, object] = None, **results) -> None:
+        """Mark stage as done with results; arrays (e.g. per-frame columns) go to its .npz sidecar"""
+        sidecar = self._write_arrays(stage, arrays) if arrays is not None else None
+        with self._lock:
+            record = self.data['stages'][stage]
+            record['status'] = 'done'
+            record['finished'] = time.time()
+            record['results'] = _normalise(results)
+            record['arrays'] = sidecar
+            self._finished_here.add(stage)
+            self._save()
+
+    def reused(self) -> List[str]:
+        """Finished stages that were not run by this process"""
+        return [
+            stage for stage in STAGES
+            if self.results(stage) is not None and stage not in self._finished_here
+        ]
+
+    def _write_arrays(self, stage: str, arrays: Dict[str, object]) -> dict:
+        import numpy as np
+
+        os.makedirs(self.project_folder, exist_ok=True)
+        path = self.sidecar_path(stage)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+        return {'file': os.path.basename(path), 'sha1': _file_sha1(path)}
+
+    def _save(self) -> None:
+        os.makedirs(self.project_folder, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,591 @@
+"""Headless extract -> score -> select -> copy (-> align) pipeline.
+
+Nothing in here imports the GUI, so it can run on render nodes without a display.
+"""
+import os
+import shutil
+import sys
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, Optional
+
+from config import (
+    AUTOMATIC_OUTPUT_DIR, SOURCE_IMAGES_DIR, BEST_IMAGES_DIR, GRADED_IMAGES_DIR,
+    GRADING_METHOD, GRADING_STYLE, GRADING_WORKERS,
+    DEFAULT_FPS, BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES,
+    RC_EXECUTABLE, RC_TIMEOUT, STREAMING_EXTRACTION, STREAMING_WRITE_ALL, JPEG_QUALITY,
+    SCORING_WORKERS, SCORE_CACHE_FILE, RUN_REPORT_FILE, EXTRACTION_SEGMENTS,
+    SELECTION_MODE, GLOBAL_MIN_GAP, GLOBAL_MAX_GAP, DEDUP_MAX_DISTANCE, DEDUP_WINDOW,
+    SAMPLING_MODE, ADAPTIVE_MOTION_THRESHOLD, ADAPTIVE_ANALYSIS_FPS, ADAPTIVE_MAX_INTERVAL,
+    MATERIALIZE_MODE, SCORE_ANALYSIS_WIDTH, SCORE_DTYPE, SCORE_TILES, SCORE_TILE_PERCENTILE,
+    QUALITY_METRICS, METRIC_WEIGHTS,
+    COVERAGE_MIN_SHARPNESS, COVERAGE_MIN_OVERLAP, COVERAGE_NEIGHBOURS
+)
+from image_analyzer import (
+    extract_frames, extract_frames_streaming, extract_frames_segmented, extract_frames_adaptive, get_video_info,
+    measure_frames, with_laplacian, ScoreSettings
+)
+from utils.file_operations import (
+    create_project_folder, sync_best_images, total_file_size, files_present, clear_images, IMAGE_EXTENSIONS
+)
+from utils.score_cache import ScoreCache
+from progress import ProgressBus
+from frame_table import FrameTable, BADGE_BEST
+from instrumentation import RunRecorder
+from manifest import ProjectManifest, video_fingerprint
+from coverage_selection import select_coverage, feature_params
+from tool_runner import ToolRunner, default_runner
+from grading import grade_images
+
+logger = logging.getLogger(__name__)
+
+SCORE_SETTINGS = ScoreSettings(SCORE_ANALYSIS_WIDTH, SCORE_DTYPE, SCORE_TILES, SCORE_TILE_PERCENTILE)
+
+def streaming_selects() -> bool:
+    """True when streaming extraction writes only the frames its own batch selection keeps"""
+    return SAMPLING_MODE != "adaptive" and STREAMING_EXTRACTION and not STREAMING_WRITE_ALL
+
+def written_frames(frames: FrameTable) -> List[str]:
+    """Paths of the frames extraction wrote to disk; streaming selection marks them 'Best'"""
+    if streaming_selects():
+        return frames.paths_with_badge(BADGE_BEST)
+    return frames.paths
+
+def extraction_inputs(video_path: str, fps, new_width: int = None, selection: dict = None) -> dict:
+    """Manifest inputs of the extract stage for the configured extraction mode.
+
+    selection (see selection_inputs) only matters when streaming extraction
+    writes just the selected frames.
+    """
+    inputs = {'video': video_fingerprint(video_path), 'new_width': new_width, 'sampling': SAMPLING_MODE}
+    if SAMPLING_MODE == "adaptive":
+        inputs.update(
+            motion_threshold=ADAPTIVE_MOTION_THRESHOLD,
+            analysis_fps=ADAPTIVE_ANALYSIS_FPS,
+            max_interval=ADAPTIVE_MAX_INTERVAL,
+            jpeg_quality=JPEG_QUALITY
+        )
+        return inputs
+    inputs['fps'] = fps
+    if STREAMING_EXTRACTION:
+        inputs.update(streaming=True, jpeg_quality=JPEG_QUALITY)
+        if streaming_selects():
+            inputs['selection'] = selection
+    else:
+        inputs['segments'] = EXTRACTION_SEGMENTS
+    return inputs
+
+def selection_inputs(batch_size: int = BATCH_SIZE, threshold: float = THRESHOLD,
+                     min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES,
+                     weights: dict = METRIC_WEIGHTS) -> dict:
+    """Manifest inputs of the select stage"""
+    inputs = {
+        'mode': SELECTION_MODE,
+        'batch_size': batch_size,
+        'dedup_max_distance': DEDUP_MAX_DISTANCE,
+        'dedup_window': DEDUP_WINDOW,
+        'weights': weights
+    }
+    if SELECTION_MODE == "global":
+        inputs.update(min_gap=GLOBAL_MIN_GAP, max_gap=GLOBAL_MAX_GAP)
+    elif SELECTION_MODE == "coverage":
+        inputs.update(
+            min_sharpness=COVERAGE_MIN_SHARPNESS,
+            min_overlap=COVERAGE_MIN_OVERLAP,
+            neighbours=COVERAGE_NEIGHBOURS,
+            features=feature_params()
+        )
+    else:
+        inputs.update(threshold=threshold, min_images=min_images, max_images=max_images)
+    return inputs
+
+def run_settings(fps=DEFAULT_FPS, new_width: int = None, batch_size: int = BATCH_SIZE,
+                 threshold: float = THRESHOLD, min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES,
+                 score_settings: ScoreSettings = SCORE_SETTINGS, metrics=QUALITY_METRICS,
+                 weights: dict = METRIC_WEIGHTS) -> dict:
+    """Settings as shown in the summary and recorded in the manifest"""
+    return {
+        'fps': fps,
+        'new_width': new_width,
+        'batch_size': batch_size,
+        'threshold': threshold,
+        'min_images': min_images,
+        'max_images': max_images,
+        'scoring': score_settings.params(),
+        'metrics': list(with_laplacian(tuple(metrics) + tuple(weights or ()))),
+        'weights': weights
+    }
+
+def extract_and_score(video_path: str, source_dir: str, fps, new_width: int = None, video_info: dict = None,
+                      batch_size: int = BATCH_SIZE, threshold: float = THRESHOLD,
+                      min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES,
+                      workers: int = SCORING_WORKERS, cache: ScoreCache = None,
+                      progress: ProgressBus = None, decode_slot=None, score_slot=None,
+                      score_settings: ScoreSettings = SCORE_SETTINGS,
+                      metrics=QUALITY_METRICS, weights: dict = METRIC_WEIGHTS,
+                      manifest: ProjectManifest = None) -> FrameTable:
+    """Extract frames with the configured extraction mode and score them into a FrameTable.
+
+    Every metric in metrics or weights is computed from a single decode of
+    each frame. Progress is reported on the 'extract' and 'score' stages of progress.
+    decode_slot and score_slot are optional context managers (e.g. semaphores)
+    held while ffmpeg decodes and while frames are scored, so a scheduler can
+    bound how many of each run at once.
+
+    With a manifest, an extraction that finished with the same inputs (and
+    whose frames are still on disk) is reused, and so are its scores when the
+    scoring inputs match too. Streaming and adaptive extraction score while
+    decoding, so for them a scoring change reruns the extraction. An
+    interrupted scoring pass resumes from cache.
+    """
+    progress = progress or ProgressBus()
+    decode_slot = decode_slot or nullcontext()
+    score_slot = score_slot or nullcontext()
+    if video_info is None:
+        video_info = get_video_info(video_path)
+    expected_frames = int(video_info['duration'] * fps)
+    metric_names = with_laplacian(tuple(metrics) + tuple(weights or ()))
+    scoring_inputs = {'scoring': score_settings.params(), 'metrics': list(metric_names)}
+    scores_while_decoding = SAMPLING_MODE == "adaptive" or STREAMING_EXTRACTION
+
+    extracted = None  # Paths of the frames on disk when the extraction is reused
+    if manifest is not None:
+        extract_inputs = extraction_inputs(
+            video_path, fps, new_width,
+            selection_inputs(batch_size, threshold, min_images, max_images, weights)
+        )
+        if scores_while_decoding:
+            extract_inputs.update(scoring_inputs)
+        if manifest.is_current('extract', extract_inputs):
+            arrays = manifest.arrays('extract')
+            extracted = arrays['frames'].tolist() if arrays is not None else None
+            if extracted is None or not files_present(source_dir, extracted):
+                logger.warning(f"Extracted frames are missing from {source_dir}, extracting again")
+                extracted = None
+        if extracted is not None and manifest.is_current('score', scoring_inputs):
+            arrays = manifest.arrays('score')
+            if arrays is not None:
+                logger.info(f"Reusing {len(extracted)} extracted and scored frames from {manifest.path}")
+                return FrameTable.from_arrays(arrays)
+        if extracted is None or scores_while_decoding:
+            extracted = None
+            manifest.begin('extract', extract_inputs)
+            # Frames left by an interrupted or outdated extraction would be listed with the new ones
+            clear_images(source_dir)
+
+    def record(frames: FrameTable) -> FrameTable:
+        if manifest is not None:
+            if extracted is None:
+                written = written_frames(frames)
+                manifest.complete('extract', arrays={'frames': written}, count=len(written))
+            manifest.begin('score', scoring_inputs)
+            manifest.complete('score', arrays=frames.to_arrays(), count=len(frames))
+        return frames
+
+    if SAMPLING_MODE == "adaptive":
+        # Frames are scored while sampling; fps is replaced by the motion threshold
+        with decode_slot, progress.stage('extract', "Sampling and scoring frames",
+                                         int(video_info['duration'] * ADAPTIVE_ANALYSIS_FPS)) as stage:
+            frames = extract_frames_adaptive(
+                video_path, source_dir,
+                motion_threshold=ADAPTIVE_MOTION_THRESHOLD,
+                analysis_fps=ADAPTIVE_ANALYSIS_FPS,
+                new_width=new_width,
+                progress_queue=stage,
+                max_interval=ADAPTIVE_MAX_INTERVAL,
+                jpeg_quality=JPEG_QUALITY,
+                settings=score_settings,
+                metrics=metric_names
+            )
+        # Frame numbers count candidates at the analysis rate
+        return record(FrameTable.from_image_data(frames, fps=ADAPTIVE_ANALYSIS_FPS or video_info['frame_rate']))
+
+    if STREAMING_EXTRACTION:
+        with decode_slot, progress.stage('extract', "Extracting and scoring frames", expected_frames) as stage:
+            frames = extract_frames_streaming(
+                video_path, source_dir, fps,
+                new_width=new_width,
+                progress_queue=stage,
+                write_all=STREAMING_WRITE_ALL,
+                batch_size=batch_size,
+                threshold=threshold,
+                min_images=min_images,
+                max_images=max_images,
+                jpeg_quality=JPEG_QUALITY,
+                settings=score_settings,
+                metrics=metric_names,
+                weights=weights
+            )
+        return record(FrameTable.from_image_data(frames, fps=fps))
+
+    if extracted is not None:
+        frames = extracted
+        logger.info(f"Reusing {len(frames)} extracted frames from {manifest.path}")
+    else:
+        with decode_slot, progress.stage('extract', "Extracting frames", expected_frames) as stage:
+            if EXTRACTION_SEGMENTS > 1:
+                frames = extract_frames_segmented(
+                    video_path, source_dir, fps,
+                    new_width=new_width,
+                    progress_queue=stage,
+                    segments=EXTRACTION_SEGMENTS,
+                    video_info=video_info
+                )
+            else:
+                frames = extract_frames(video_path, source_dir, fps, new_width=new_width, progress_queue=stage)
+        if manifest is not None:
+            # Recorded before scoring so an interrupted scoring pass keeps the frames
+            manifest.complete('extract', arrays={'frames': frames}, count=len(frames))
+            extracted = frames
+
+    with score_slot, progress.stage('score', "Calculating image sharpness", len(frames)) as stage:
+        values, hashes = measure_frames(
+            [os.path.join(source_dir, frame) for frame in frames],
+            metric_names,
+            workers=workers,
+            progress_queue=stage,
+            cache=cache,
+            with_hashes=True,
+            settings=score_settings
+        )
+    return record(FrameTable(frames, values['laplacian'], hashes, values, fps=fps))
+
+def select_best_frames(frames: FrameTable, batch_size: int = BATCH_SIZE, threshold: float = THRESHOLD,
+                       min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES,
+                       mode: str = SELECTION_MODE, dedup_max_distance: int = DEDUP_MAX_DISTANCE,
+                       weights: dict = METRIC_WEIGHTS, source_dir: str = None, cache: ScoreCache = None,
+                       workers: int = SCORING_WORKERS, progress_queue=None) -> List[str]:
+    """Select the best frames with the configured selection mode, then drop near duplicates.
+
+    Frames are ranked by their quality metrics combined with weights. Returns
+    relative paths; use frames.positions() for their rows.
+
+    "coverage" reads the frames from source_dir and keeps their features in
+    cache. Its picks are already far apart, and dropping one by dHash could
+    break the chain, so near-duplicate removal is skipped for it.
+    """
+    if mode == "coverage":
+        if source_dir is None:
+            raise ValueError("Coverage selection needs the source_dir of the frames")
+        rows = select_coverage(
+            frames, source_dir,
+            batch_size=batch_size,
+            weights=weights,
+            workers=workers,
+            cache=cache,
+            progress_queue=progress_queue
+        )
+        logger.info(f"Total best image paths: {len(rows)}")
+        return frames.paths_at(rows)
+    if mode == "global":
+        rows = frames.select_global(
+            min_gap=GLOBAL_MIN_GAP,
+            max_gap=GLOBAL_MAX_GAP,
+            window=batch_size,
+            weights=weights
+        )
+    elif mode == "batch":
+        rows = frames.select_batches(batch_size, threshold, min_images, max_images, weights=weights)
+    else:
+        raise ValueError(f"Unknown selection mode: {mode}")
+    logger.info(f"Total best image paths: {len(rows)}")
+
+    if dedup_max_distance is not None:
+        selected = len(rows)
+        if mode == "batch":
+            rows = frames.remove_near_duplicates(rows, dedup_max_distance, batch_size=batch_size, min_images=min_images)
+        else:
+            rows = frames.remove_near_duplicates(rows, dedup_max_distance)
+        logger.info(f"Near-duplicate removal kept {len(rows)} of {selected} frames")
+    return frames.paths_at(rows)
+
+def select_stage(frames: FrameTable, progress: ProgressBus = None, manifest: ProjectManifest = None,
+                 batch_size: int = BATCH_SIZE, threshold: float = THRESHOLD,
+                 min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES,
+                 weights: dict = METRIC_WEIGHTS, source_dir: str = None, cache: ScoreCache = None) -> List[str]:
+    """select_best_frames as the 'select' stage, reused from the manifest while its inputs are unchanged.
+
+    When streaming extraction only wrote the frames of its own batch
+    selection, those frames are the selection; selecting again would cut
+    the subset down further. Selection settings then apply on extraction.
+    """
+    progress = progress or ProgressBus()
+    inputs = selection_inputs(batch_size, threshold, min_images, max_images, weights)
+    if manifest is not None:
+        arrays = manifest.arrays('select') if manifest.is_current('select', inputs) else None
+        if arrays is not None:
+            best_image_paths = arrays['best_images'].tolist()
+            logger.info(f"Reusing the selection of {len(best_image_paths)} frames from {manifest.path}")
+            return best_image_paths
+        manifest.begin('select', inputs)
+
+    with progress.stage('select', "Selecting best frames", len(frames)) as stage:
+        if streaming_selects():
+            best_image_paths = written_frames(frames)
+            logger.info(f"Using the {len(best_image_paths)} frames streaming extraction selected")
+        else:
+            best_image_paths = select_best_frames(
+                frames,
+                batch_size=batch_size,
+                threshold=threshold,
+                min_images=min_images,
+                max_images=max_images,
+                weights=weights,
+                source_dir=source_dir,
+                cache=cache,
+                progress_queue=stage
+            )
+        stage.put(len(frames))
+    if manifest is not None:
+        manifest.complete('select', arrays={'best_images': best_image_paths}, count=len(best_image_paths))
+    return best_image_paths
+
+def copy_stage(source_dir: str, best_dir: str, best_image_paths: List[str], progress: ProgressBus = None,
+               manifest: ProjectManifest = None) -> Optional[dict]:
+    """sync_best_images as the 'copy' stage.
+
+    Returns None without touching best_dir when the manifest shows the
+    current selection was already materialized and the files are still there.
+    """
+    progress = progress or ProgressBus()
+    inputs = {'mode': MATERIALIZE_MODE}
+    if manifest is not None:
+        names = [os.path.basename(path) for path in best_image_paths]
+        if manifest.is_current('copy', inputs) and files_present(best_dir, names):
+            logger.info(f"{best_dir} already holds the {len(names)} selected frames")
+            return None
+        manifest.begin('copy', inputs)
+
+    with progress.stage('copy', "Materializing best images", len(best_image_paths)) as stage:
+        sync_result = sync_best_images(source_dir, best_dir, best_image_paths, MATERIALIZE_MODE)
+        stage.put(len(best_image_paths))
+    if manifest is not None:
+        manifest.complete('copy', added=len(sync_result['added']), removed=len(sync_result['removed']))
+    return sync_result
+
+def grade_stage(project_folder: str, names: List[str] = None, progress: ProgressBus = None,
+                method: str = GRADING_METHOD, style: str = GRADING_STYLE, workers: int = GRADING_WORKERS,
+                cancel_event: threading.Event = None) -> dict:
+    """grade_images from the best images into GRADED_IMAGES_DIR as the 'grade' stage.
+
+    names defaults to every image in the best images folder.
+    """
+    progress = progress or ProgressBus()
+    best_dir = os.path.join(project_folder, BEST_IMAGES_DIR)
+    if not os.path.isdir(best_dir):
+        raise FileNotFoundError(f"Best images folder not found: {best_dir}")
+    if names is None:
+        names = sorted(f for f in os.listdir(best_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    with progress.stage('grade', "Grading best images", len(names)) as stage:
+        return grade_images(
+            best_dir, os.path.join(project_folder, GRADED_IMAGES_DIR), names,
+            method=method, style=style, workers=workers, progress_queue=stage, cancel_event=cancel_event
+        )
+
+def build_rc_command(images_folder: str, project_file: str, export_folder: str,
+                     rc_executable: str = RC_EXECUTABLE) -> List[str]:
+    # A Python stand-in such as fake_realitycapture.py runs with this interpreter
+    launcher = [sys.executable, rc_executable] if rc_executable.endswith('.py') else [rc_executable]
+    return launcher + [
+        "-newScene",
+        "-addFolder", images_folder,
+        "-align",
+        "-save", project_file,
+        "-exportSparsePointCloud", os.path.join(export_folder, "sparsePointCloud.ply"),
+        "-exportRegistration", os.path.join(export_folder, "camera_params.csv"),
+    ]
+
+def align_with_reality_capture(project_folder: str, rc_executable: str = RC_EXECUTABLE,
+                               progress: ProgressBus = None, runner: ToolRunner = None,
+                               timeout: float = RC_TIMEOUT, cancel_event: threading.Event = None) -> dict:
+    """Align the best images with the RealityCapture CLI and export the results.
+
+    RealityCapture runs through runner (default: the process-wide one, which
+    bounds how many alignments run at once) and reports on the 'align' stage
+    of progress. Setting cancel_event stops it. Raises FileNotFoundError when
+    RealityCapture or the images are missing and ValueError when the images
+    folder is empty.
+    """
+    project_file = os.path.join(project_folder, "rc_project.rcproj")
+    images_folder = os.path.join(project_folder, BEST_IMAGES_DIR)
+    export_folder = os.path.join(project_folder, "RC_Export")
+
+    logger.info(f"Parent directory: {project_folder}")
+    logger.info(f"Project file: {project_file}")
+    logger.info(f"Images folder: {images_folder}")
+    logger.info(f"Export folder: {export_folder}")
+
+    os.makedirs(export_folder, exist_ok=True)
+
+    if not os.path.exists(rc_executable):
+        raise FileNotFoundError(f"RealityCapture.exe not found at path: {rc_executable}")
+
+    if not os.path.exists(images_folder):
+        raise FileNotFoundError(f"Images folder not found: {images_folder}")
+
+    images = [f for f in os.listdir(images_folder) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    if not images:
+        raise ValueError(f"No images found in folder: {images_folder}")
+
+    logger.info(f"Found {len(images)} images in folder: {images_folder}")
+    logger.info(f"First few images: {images[:5]}")
+
+    rc_command = build_rc_command(images_folder, project_file, export_folder, rc_executable)
+    logger.info(f"RealityCapture command: {' '.join(rc_command)}")
+    logger.info("Launching RealityCapture CLI to align images, save project, and export sparse point cloud and camera parameters...")
+    run = (runner or default_runner()).run(
+        rc_command, name="RealityCapture", progress=progress, stage='align',
+        timeout=timeout, cancel_event=cancel_event
+    )
+
+    result = {
+        'success': run['success'],
+        'status': run['status'],
+        'returncode': run['returncode'],
+        'elapsed': run['elapsed'],
+        'project_file': project_file,
+        'export_folder': export_folder,
+        'crmeta_path': None
+    }
+    if not run['success']:
+        logger.error(f"Reality Capture alignment {run['status']}")
+        return result
+
+    logger.info("Reality Capture alignment completed successfully")
+    crmeta_src = os.path.join(images_folder, "crmeta.db")
+    crmeta_dst = os.path.join(export_folder, "crmeta.db")
+    if os.path.exists(crmeta_src):
+        shutil.move(crmeta_src, crmeta_dst)
+        logger.info(f"Moved crmeta.db from {crmeta_src} to {crmeta_dst}")
+        result['crmeta_path'] = crmeta_dst
+    else:
+        logger.warning(f"crmeta.db not found in {images_folder}")
+    return result
+
+def run_pipeline(video_path: str, output_dir: str = AUTOMATIC_OUTPUT_DIR, project_name: str = None,
+                 project_folder: str = None,
+                 fps=DEFAULT_FPS, new_width: int = None, batch_size: int = BATCH_SIZE,
+                 threshold: float = THRESHOLD, min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES,
+                 workers: int = SCORING_WORKERS, align: bool = False, grade: bool = False,
+                 progress: ProgressBus = None, decode_slot=None, score_slot=None,
+                 score_settings: ScoreSettings = SCORE_SETTINGS,
+                 metrics=QUALITY_METRICS, weights: dict = METRIC_WEIGHTS) -> dict:
+    """Run the whole pipeline for one video and return a JSON-serialisable summary.
+
+    With grade, the best images are graded (see grading.py) before the
+    optional alignment. Every stage is reported on progress; the slot arguments are passed
+    through to extract_and_score. Per-stage resource usage is written to
+    RUN_REPORT_FILE in the project folder.
+
+    A new timestamped folder is created in output_dir unless project_folder
+    is given; an existing project is then resumed from its manifest, skipping
+    every stage whose inputs did not change.
+    """
+    progress = progress or ProgressBus()
+    recorder = RunRecorder(progress)
+    started = time.perf_counter()
+
+    video_info = get_video_info(video_path)
+    if project_folder is None:
+        project_name = project_name or os.path.splitext(os.path.basename(video_path))[0]
+        project_folder = create_project_folder(output_dir, project_name)
+    settings = run_settings(fps, new_width, batch_size, threshold, min_images, max_images,
+                            score_settings, metrics, weights)
+    manifest = ProjectManifest(project_folder)
+    manifest.set_run(video_path, settings)
+    source_dir = os.path.join(project_folder, SOURCE_IMAGES_DIR)
+    best_dir = os.path.join(project_folder, BEST_IMAGES_DIR)
+
+    cache = ScoreCache(os.path.join(project_folder, SCORE_CACHE_FILE))
+    try:
+        frames = extract_and_score(
+            video_path, source_dir, fps,
+            new_width=new_width, video_info=video_info,
+            batch_size=batch_size, threshold=threshold,
+            min_images=min_images, max_images=max_images,
+            workers=workers, cache=cache, progress=progress,
+            decode_slot=decode_slot, score_slot=score_slot,
+            score_settings=score_settings, metrics=metrics, weights=weights,
+            manifest=manifest
+        )
+        # ffmpeg writes the frames; its I/O only shows up in the process counters on some platforms
+        recorder.annotate('extract', output_bytes=total_file_size(source_dir, frames.paths))
+
+        best_image_paths = select_stage(
+            frames, progress, manifest,
+            batch_size=batch_size,
+            threshold=threshold,
+            min_images=min_images,
+            max_images=max_images,
+            weights=weights,
+            source_dir=source_dir,
+            cache=cache
+        )
+    finally:
+        cache.close()
+
+    frames.set_badge(BADGE_BEST, frames.positions(best_image_paths))
+
+    sync_result = copy_stage(source_dir, best_dir, best_image_paths, progress, manifest)
+    if sync_result is not None:
+        recorder.annotate('copy', methods=sync_result['methods'])
+
+    grading = None
+    if grade:
+        grading = grade_stage(project_folder, [os.path.basename(path) for path in best_image_paths], progress)
+
+    alignment = None
+    if align:
+        alignment = align_with_reality_capture(project_folder, progress=progress)
+
+    timings = {name: stage['elapsed'] for name, stage in progress.summary().items()}
+    timings['total'] = time.perf_counter() - started
+    statistics = frames.statistics()
+    report_path = os.path.join(project_folder, RUN_REPORT_FILE)
+    recorder.write(report_path, video=os.path.abspath(video_path), statistics=statistics)
+    return {
+        'video': os.path.abspath(video_path),
+        'video_info': video_info,
+        'project_folder': project_folder,
+        'source_images_dir': source_dir,
+        'best_images_dir': best_dir,
+        'settings': settings,
+        'statistics': statistics,
+        'best_images': sorted(best_image_paths),
+        'grading': grading,
+        'alignment': alignment,
+        'timings': timings,
+        'run_report': report_path,
+        'manifest': manifest.path,
+        'reused_stages': manifest.reused()
+    }
+
+def align_projects(project_folders: List[str], rc_executable: str = RC_EXECUTABLE, runner: ToolRunner = None,
+                   timeout: float = RC_TIMEOUT, progress_for=None) -> List[dict]:
+    """align_with_reality_capture for many projects, queued on runner's concurrency limit.
+
+    progress_for(project_folder) may return the ProgressBus of a project.
+    Returns one result per folder, in order; a project that could not be
+    aligned gets {'success': False, 'error': ...}.
+    """
+    runner = runner or default_runner()
+
+    def align(project_folder):
+        try:
+            result = align_with_reality_capture(
+                project_folder, rc_executable, progress=progress_for(project_folder) if progress_for else None,
+                runner=runner, timeout=timeout
+            )
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"Cannot align {project_folder}: {e}")
+            result = {'success': False, 'status': 'failed', 'error': str(e)}
+        return dict(result, project_folder=project_folder)
+
+    if not project_folders:
+        return []
+    # Threads only wait on the runner, which limits how many RealityCapture processes run
+    with ThreadPoolExecutor(max_workers=len(project_folders)) as executor:
+        return list(executor.map(align, project_folders))
@@ -0,0 +1,175 @@
+"""Quick look at a clip before the full extraction.
+
+Only keyframes (or a few frames reached by seeking) are decoded, at a reduced
+width, and scored as they arrive without writing any files. The sharpness
+distribution and the estimated number of best frames are then available in
+seconds, so fps and the selection settings can be chosen before extracting.
+Scores are taken at the preview width, so their magnitude differs from the
+full extraction; the distribution's shape, which is what selection depends on,
+carries over.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import (
+    PREVIEW_METHOD, PREVIEW_SAMPLES, PREVIEW_WIDTH, SCORING_WORKERS, SELECTION_MODE,
+    GLOBAL_MIN_GAP, GLOBAL_MAX_GAP, BATCH_SIZE, THRESHOLD, MIN_IMAGES, MAX_IMAGES
+)
+from image_analyzer import (
+    decode_keyframes, estimate_keyframes, seek_frame, get_video_info, score_image, ScoreSettings,
+    DEFAULT_SCORE_SETTINGS
+)
+from frame_table import FrameTable
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_METHODS = ('auto', 'keyframes', 'seek')
+_SIMULATED_FRAMES = 20000
+
+def _seek_samples(video_path: str, samples: int, width: int, video_info: dict, settings: ScoreSettings,
+                  progress_queue=None):
+    # Sample the middle of each of samples equal slices, never the very end of the clip
+    timestamps = (np.arange(samples) + 0.5) * video_info['duration'] / samples
+
+    def score(timestamp):
+        frame = seek_frame(video_path, timestamp, width, video_info)
+        return None if frame is None else score_image(frame, settings)
+
+    sampled, scores = [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(4, SCORING_WORKERS))) as executor:
+        for done, (timestamp, value) in enumerate(zip(timestamps.tolist(), executor.map(score, timestamps)), start=1):
+            if value is not None:
+                sampled.append(timestamp)
+                scores.append(value)
+            if progress_queue is not None:
+                progress_queue.put(done)
+    return sampled, scores
+
+def _keyframe_samples(video_path: str, samples: int, width: int, video_info: dict, settings: ScoreSettings,
+                      progress_queue=None):
+    # Each keyframe is scored as ffmpeg emits it and then dropped
+    timestamps, scores = [], []
+    for frame in decode_keyframes(video_path, width, video_info, max_frames=samples, timestamps=timestamps):
+        scores.append(score_image(frame, settings))
+        if progress_queue is not None:
+            progress_queue.put(len(scores))
+    return timestamps, scores
+
+def _prefer_seeking(keyframes: int, samples: int, video_info: dict) -> bool:
+    """True when the clip has too few keyframes, or seeking to samples frames decodes less than reading them all.
+
+    A seek decodes from the previous keyframe, half a GOP on average; the
+    keyframe pass decodes every keyframe even when most are thinned out.
+    """
+    gop = video_info['total_frames'] / keyframes
+    return keyframes < samples // 2 or keyframes > samples * (1 + gop / 2)
+
+def preview_video(video_path: str, method: str = PREVIEW_METHOD, samples: int = PREVIEW_SAMPLES,
+                  width: int = PREVIEW_WIDTH, settings: ScoreSettings = DEFAULT_SCORE_SETTINGS,
+                  video_info: dict = None, progress_queue=None) -> dict:
+    """Score about samples frames and return their timestamps, scores and distribution.
+
+    'keyframes' thins the keyframes to about samples. 'auto' estimates the
+    keyframe count from the packet flags first and seeks instead when the
+    clip has too few keyframes, or so many (e.g. all-intra ProRes or MJPEG)
+    that decoding them all would cost more than seeking. Pass the result to
+    estimate_yield for the number of frames a full extraction would select.
+    """
+    if method not in PREVIEW_METHODS:
+        raise ValueError(f"Unknown preview method: {method}")
+    started = time.perf_counter()
+    if video_info is None:
+        video_info = get_video_info(video_path)
+    source_width = int(video_info['resolution'].split('x')[0])
+    width = width if width and width < source_width else None
+
+    timestamps, scores, used = [], [], method
+    keyframes = estimate_keyframes(video_path, video_info) if method == 'auto' else None
+    if method == 'auto' and keyframes is not None and _prefer_seeking(keyframes, samples, video_info):
+        logger.info(f"About {keyframes} keyframes, seeking to {samples} evenly spaced frames instead")
+        method = 'seek'
+    if method in ('auto', 'keyframes'):
+        timestamps, scores = _keyframe_samples(video_path, samples, width, video_info, settings, progress_queue)
+        logger.info(f"Scored {len(scores)} keyframes of {video_path}")
+    if method == 'seek' or (method == 'auto' and len(scores) < samples // 2):
+        if method == 'auto':
+            logger.info(f"Only {len(scores)} keyframes, seeking to {samples} evenly spaced frames instead")
+        timestamps, scores = _seek_samples(video_path, samples, width, video_info, settings, progress_queue)
+        used = 'seek'
+    if not scores:
+        raise RuntimeError(f"No frames decoded from {video_path}")
+
+    scores = np.array(scores)
+    counts, edges = np.histogram(scores, bins=min(20, len(scores)))
+    median = float(np.median(scores))
+    return {
+        'video': video_path,
+        'video_info': video_info,
+        'method': 'keyframes' if used == 'auto' else used,
+        'width': width or source_width,
+        'samples': len(scores),
+        'timestamps': timestamps,
+        'scores': scores.tolist(),
+        'distribution': {
+            'mean': float(scores.mean()),
+            'min': float(scores.min()),
+            'p10': float(np.percentile(scores, 10)),
+            'p25': float(np.percentile(scores, 25)),
+            'median': median,
+            'p75': float(np.percentile(scores, 75)),
+            'p90': float(np.percentile(scores, 90)),
+            'max': float(scores.max())
+        },
+        'histogram': {'edges': edges.tolist(), 'counts': counts.tolist()},
+        # Frames far below the typical sharpness are most likely motion blurred
+        'blurry_share': float(np.mean(scores < 0.5 * median)),
+        'elapsed': time.perf_counter() - started
+    }
+
+def estimate_yield(preview: dict, fps, batch_size: int = BATCH_SIZE, threshold: float = THRESHOLD,
+                   min_images: int = MIN_IMAGES, max_images: int = MAX_IMAGES, mode: str = SELECTION_MODE,
+                   seed: int = 0) -> dict:
+    """Expected frame count of an extraction at fps and how many of them selection keeps.
+
+    A sequence of frames is drawn at random from the preview scores and run
+    through the configured selection (near-duplicate removal is not
+    simulated). Neighbouring frames of a real clip are more alike than random
+    draws, so treat the result as an estimate. Cheap, so it can be recomputed
+    whenever fps or the selection settings change. Coverage selection depends
+    on image content rather than scores, so it is estimated as batch selection.
+    """
+    expected_frames = int(preview['video_info']['duration'] * fps)
+    simulated = max(1, min(expected_frames, _SIMULATED_FRAMES))
+    scores = np.random.default_rng(seed).choice(np.asarray(preview['scores']), simulated)
+    frames = FrameTable([f'frame_{i:06d}.jpg' for i in range(1, simulated + 1)], scores)
+    if mode == "global":
+        rows = frames.select_global(min_gap=GLOBAL_MIN_GAP, max_gap=GLOBAL_MAX_GAP, window=batch_size)
+    elif mode in ("batch", "coverage"):
+        rows = frames.select_batches(batch_size, threshold, min_images, max_images)
+    else:
+        raise ValueError(f"Unknown selection mode: {mode}")
+    selected_share = len(rows) / simulated
+    return {
+        'fps': fps,
+        'expected_frames': expected_frames,
+        'estimated_best_images': int(round(selected_share * expected_frames)),
+        'selected_share': selected_share
+    }
+
+def format_preview(preview: dict, estimate: dict = None) -> str:
+    """Short text summary for the GUI and logs"""
+    distribution = preview['distribution']
+    lines = [
+        f"Scored {preview['samples']} frames ({preview['method']}) at {preview['width']}px in {preview['elapsed']:.1f}s",
+        f"Sharpness median {distribution['median']:.1f} (p10 {distribution['p10']:.1f}, p90 {distribution['p90']:.1f})",
+        f"Likely blurry: {preview['blurry_share']:.0%} of samples"
+    ]
+    if estimate is not None:
+        lines.append(
+            f"At {estimate['fps']} fps: ~{estimate['expected_frames']} frames, "
+            f"~{estimate['estimated_best_images']} best images ({estimate['selected_share']:.0%})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+"""Progress reporting shared by the GUI, the CLI and the job queue.
+
+Producers get a StageReporter per pipeline stage. Reporters have a put(count)
+method, so they can be passed wherever a progress_queue is accepted, but an
+update only stores the latest count instead of queueing an item. Consumers
+either poll ProgressBus.snapshot() (the GUI does so from its render loop) or
+subscribe with a minimum interval, which coalesces updates.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+STAGE_STARTED = "stage_started"
+STAGE_PROGRESS = "progress"
+STAGE_FINISHED = "stage_finished"
+
+class ProgressEvent:
+    def __init__(self, kind: str, stage: str, label: str, done: int, total: Optional[int],
+                 elapsed: float, finished: bool, message: str = None):
+        self.kind = kind
+        self.stage = stage
+        self.label = label
+        self.done = done
+        self.total = total
+        self.elapsed = elapsed
+        self.finished = finished
+        # Latest status line, e.g. the last output line of an external tool
+        self.message = message
+
+    @property
+    def rate(self) -> float:
+        """Items per second since the stage started"""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left, when the total is known and progress has been made"""
+        if self.finished:
+            return 0.0
+        if not self.total or not self.rate:
+            return None
+        return max(0.0, (self.total - self.done) / self.rate)
+
+    def format(self) -> str:
+        count = f"{self.done}/{self.total}" if self.total else f"{self.done}"
+        if self.finished:
+            return f"{self.label}: {count} done in {self.elapsed:.1f}s"
+        text = f"{self.label}... ({count}, {self.rate:.1f}/s"
+        if self.eta is not None:
+            text += f", ETA {self.eta:.0f}s"
+        text += ")"
+        if self.message:
+            text += f"\n{self.message}"
+        return text
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'stage': self.stage,
+            'label': self.label,
+            'done': self.done,
+            'total': self.total,
+            'elapsed': self.elapsed,
+            'rate': self.rate,
+            'eta': self.eta,
+            'finished': self.finished,
+            'message': self.message
+        }
+
+class StageReporter:
+    def __init__(self, bus: 'ProgressBus', name: str, label: str, total: Optional[int]):
+        self.bus = bus
+        self.name = name
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.message = None
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def put(self, done: int) -> None:
+        """Set the absolute number of items processed"""
+        self.done = done
+        self.bus._changed(self, STAGE_PROGRESS)
+
+    def advance(self, count: int = 1) -> None:
+        self.put(self.done + count)
+
+    def note(self, message: str) -> None:
+        """Set the stage's status line without changing the count"""
+        self.message = message
+        self.bus._changed(self, STAGE_PROGRESS)
+
+    def finish(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+            self.bus._changed(self, STAGE_FINISHED)
+
+    def snapshot(self, kind: str = STAGE_PROGRESS) -> ProgressEvent:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return ProgressEvent(kind, self.name, self.label, self.done, self.total, elapsed, self.finished_at is not None,
+                             self.message)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+        return False
+
+class _Listener:
+    def __init__(self, callback: Callable[[ProgressEvent], None], min_interval: float, kinds):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.kinds = kinds
+        self.last_call = 0.0
+
+class ProgressBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[_Listener] = []
+        self.stages: Dict[str, StageReporter] = {}
+        self.current: Optional[StageReporter] = None
+        self.version = 0
+
+    def stage(self, name: str, label: str = None, total: int = None) -> StageReporter:
+        """Start a stage; use as a context manager to finish it automatically"""
+        reporter = StageReporter(self, name, label or name, total)
+        with self._lock:
+            self.stages[name] = reporter
+            self.current = reporter
+        self._changed(reporter, STAGE_STARTED)
+        return reporter
+
+    def subscribe(self, callback: Callable[[ProgressEvent], None], min_interval: float = 0.5,
+                  kinds=(STAGE_STARTED, STAGE_PROGRESS, STAGE_FINISHED)) -> None:
+        """Call callback for events of the given kinds.
+
+        Progress events are coalesced to at most one per min_interval seconds;
+        stage started/finished events are always delivered.
+        """
+        with self._lock:
+            self._listeners.append(_Listener(callback, min_interval, set(kinds)))
+
+    def snapshot(self, stage: str = None) -> Optional[ProgressEvent]:
+        reporter = self.stages.get(stage) if stage else self.current
+        return reporter.snapshot() if reporter is not None else None
+
+    def summary(self) -> Dict[str, dict]:
+        return {name: reporter.snapshot().to_dict() for name, reporter in self.stages.items()}
+
+    def _changed(self, reporter: StageReporter, kind: str) -> None:
+        now = time.perf_counter()
+        due = []
+        with self._lock:
+            self.version += 1
+            for listener in self._listeners:
+                if kind not in listener.kinds:
+                    continue
+                if kind == STAGE_PROGRESS and now - listener.last_call < listener.min_interval:
+                    continue
+                listener.last_call = now
+                due.append(listener)
+        if due:
+            event = reporter.snapshot(kind)
+            for listener in due:
+                listener.callback(event)
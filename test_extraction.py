@@ -2,8 +2,8 @@ import os
 import subprocess
 import logging
 from config import DEFAULT_FPS
+from log_config import configure_logging
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 def extract_frames(video_path: str, output_dir: str, fps: int, new_width: int = None):
@@ -43,6 +43,7 @@ def extract_frames(video_path: str, output_dir: str, fps: int, new_width: int =
     return extracted_frames
 
 def main():
+    configure_logging(logging.DEBUG)
     video_path = r"C:\Users\Admin\Documents\Splats\Training data\GoPro Videos\4k-48ss-24fps-iso200.MP4"
     output_dir = r"C:\Users\Admin\Documents\Splats\Training data\GoPro Videos\frame extractor testing"
     fps = DEFAULT_FPS
@@ -0,0 +1,78 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from coverage_selection import shortest_cover
+
+def test_empty_graph():
+    assert shortest_cover({}, np.empty(0)) == ([], 0)
+
+def test_single_candidate():
+    assert shortest_cover({}, np.array([3.0])) == ([0], 0)
+
+def test_one_frame_overlapping_both_ends():
+    graph = {0: {1: 0.5, 2: 0.4}, 1: {2: 0.6, 3: 0.5}, 2: {3: 0.5, 4: 0.4}, 3: {4: 0.7}}
+    assert shortest_cover(graph, np.ones(5)) == ([2], 0)
+
+def test_sharpest_of_equally_short_covers():
+    graph = {0: {1: 0.5, 2: 0.5}, 1: {3: 0.5}, 2: {3: 0.5}, 3: {4: 0.5}, 4: {5: 0.5}}
+    assert shortest_cover(graph, np.array([1.0, 2.0, 3.0, 1.0, 1.0, 1.0])) == ([2, 3, 4], 0)
+    assert shortest_cover(graph, np.array([1.0, 3.0, 2.0, 1.0, 1.0, 1.0])) == ([1, 3, 4], 0)
+
+def test_fewer_frames_beat_sharper_frames():
+    graph = {0: {1: 0.5, 2: 0.5}, 1: {3: 0.5}, 2: {4: 0.5}, 3: {4: 0.5}, 4: {5: 0.5}, 5: {6: 0.5}}
+    sharpness = np.array([1.0, 9.0, 1.0, 9.0, 1.0, 1.0, 1.0])
+    assert shortest_cover(graph, sharpness) == ([2, 4, 5], 0)
+
+def test_disconnected_graph_steps_across_the_gap():
+    # Two separate chains, 0-1 and 2-3, bridged by one break
+    graph = {0: {1: 0.5}, 2: {3: 0.5}}
+    assert shortest_cover(graph, np.ones(4)) == ([1, 2], 1)
+
+def test_graph_without_edges():
+    assert shortest_cover({}, np.ones(3)) == ([0, 1, 2], 2)
+
+def test_breaks_are_minimised_before_frames():
+    # 0-1-2-3-4 links the clip; jumping 0 -> 4 in time would need breaks
+    graph = {0: {1: 0.5}, 1: {2: 0.5}, 2: {3: 0.5}, 3: {4: 0.5}, 4: {5: 0.5}}
+    path, breaks = shortest_cover(graph, np.ones(6))
+    assert breaks == 0
+    assert path == [1, 2, 3, 4]
+
+def brute_force(graph, sharpness):
+    """Best (breaks, frames, -sharpness) over every increasing path"""
+    count = len(sharpness)
+    starts = {0} | set(graph.get(0, {}))
+    ends = {count - 1} | {i for i in range(count) if count - 1 in graph.get(i, {})}
+    best = None
+    for size in range(1, count + 1):
+        for path in itertools.combinations(range(count), size):
+            if path[0] not in starts or path[-1] not in ends:
+                continue
+            breaks = 0
+            for a, b in zip(path, path[1:]):
+                if b in graph.get(a, {}):
+                    continue
+                if b != a + 1:
+                    break
+                breaks += 1
+            else:
+                cost = (breaks, size, -sum(sharpness[i] for i in path))
+                best = cost if best is None or cost < best else best
+    return best
+
+@pytest.mark.parametrize("seed", range(30))
+def test_matches_brute_force_on_random_graphs(seed):
+    rng = np.random.default_rng(seed)
+    count = int(rng.integers(2, 9))
+    graph = {}
+    for i in range(count):
+        for j in range(i + 1, min(count, i + 4)):
+            if rng.random() < 0.4:
+                graph.setdefault(i, {})[j] = 0.5
+    sharpness = rng.random(count)
+    path, breaks = shortest_cover(graph, sharpness)
+    assert path == sorted(path)
+    assert (breaks, len(path)) == brute_force(graph, sharpness)[:2]
+    assert -sum(sharpness[i] for i in path) == pytest.approx(brute_force(graph, sharpness)[2])
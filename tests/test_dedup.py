@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from frame_table import FrameTable
+from image_analyzer import HashIndex, ImageData, remove_near_duplicates
+
+A = 0x0000_0000_0000_0000
+A_NEAR = 0x0000_0000_0000_0007  # 3 bits from A
+B = 0xFFFF_FFFF_0000_0000
+B_NEAR = 0xFFFF_FFFF_0000_0003  # 2 bits from B
+C = 0x0F0F_0F0F_0F0F_0F0F
+
+def image_data(hashes):
+    return [ImageData(f"frame_{i + 1:06d}.jpg", 1.0, value) for i, value in enumerate(hashes)]
+
+def table(hashes):
+    return FrameTable.from_image_data(image_data(hashes))
+
+def both(hashes, rows, **options):
+    """Kept rows from the image_analyzer and FrameTable implementations, checked to agree"""
+    frames = image_data(hashes)
+    kept_paths = remove_near_duplicates(frames, [frames[row].relative_path for row in rows], **options)
+    kept_rows = table(hashes).remove_near_duplicates(rows, **options).tolist()
+    assert kept_paths == [frames[row].relative_path for row in kept_rows]
+    return kept_rows
+
+def test_hash_index_capacity_evicts_oldest():
+    index = HashIndex(3, capacity=2)
+    index.add(A)
+    index.add(B)
+    assert index.find_within(A_NEAR) == [0]
+    index.add(C)
+    assert len(index) == 2
+    assert index.find_within(A_NEAR) == []
+    assert index.find_within(B_NEAR) == [1]
+
+def test_drops_near_duplicates_of_kept_frames():
+    hashes = [A, A_NEAR, B, B_NEAR, C, None, None]
+    assert both(hashes, range(7), max_distance=5) == [0, 2, 4, 5, 6]
+    # Within 5 bits but not within 2
+    assert both(hashes, range(7), max_distance=2) == [0, 1, 2, 4, 5, 6]
+
+def test_zero_distance_drops_exact_duplicates_only():
+    assert both([A, A, A_NEAR], range(3), max_distance=0) == [0, 2]
+
+def test_window_keeps_returning_views():
+    # The camera looks at A, pans over B and C, then comes back to A
+    hashes = [A, B, C, A_NEAR]
+    assert both(hashes, range(4), max_distance=5, window=None) == [0, 1, 2]
+    assert both(hashes, range(4), max_distance=5, window=2) == [0, 1, 2, 3]
+    assert both(hashes, range(4), max_distance=5, window=3) == [0, 1, 2]
+
+def test_batches_keep_min_images():
+    hashes = [A, A_NEAR, A, A_NEAR, B, B_NEAR, B, C]
+    rows = [0, 1, 2, 3, 4, 5, 6, 7]
+    assert both(hashes, rows, max_distance=5) == [0, 4, 7]
+    # Batches of four may each drop two picks; the first keeps its last
+    # near duplicate of A once that allowance is used up
+    assert both(hashes, rows, max_distance=5, batch_size=4, min_images=2) == [0, 3, 4, 7]
+    # A batch with fewer picks than min_images keeps all of them
+    assert both(hashes, [0, 1, 4], max_distance=5, batch_size=4, min_images=3) == [0, 1, 4]
+
+@pytest.mark.parametrize("window", [None, 1, 30])
+def test_random_hashes_agree(window):
+    rng = np.random.default_rng(7)
+    base = rng.integers(0, 2 ** 63, size=40, dtype=np.int64)
+    hashes = [int(base[i // 5]) ^ (1 << int(rng.integers(0, 64))) for i in range(200)]
+    rows = np.sort(rng.choice(200, size=120, replace=False))
+    kept = both(hashes, rows, max_distance=3, window=window, batch_size=10, min_images=2)
+    assert set(kept) <= set(rows.tolist())
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import image_analyzer
+from frame_table import BADGE_BEST, FrameTable
+from image_analyzer import ImageData, analyze_best_images
+
+@pytest.fixture(autouse=True)
+def no_rescoring(monkeypatch):
+    # analyze_best_images rescores frames without a score; these have no file
+    monkeypatch.setattr(image_analyzer, 'calculate_blurriness', lambda *args, **kwargs: None)
+
+def image_data(scores):
+    return [
+        ImageData(f"frame_{i + 1:06d}.jpg", None if np.isnan(score) else float(score), i)
+        for i, score in enumerate(scores)
+    ]
+
+def both(scores, batch_size=10, threshold=1.5, min_images=2, max_images=7):
+    """Paths selected by analyze_best_images and FrameTable.select_batches, checked to agree"""
+    frames = image_data(scores)
+    expected = analyze_best_images(frames, batch_size, threshold, min_images, max_images)
+    table = FrameTable.from_image_data(frames)
+    rows = table.select_batches(batch_size, threshold, min_images, max_images)
+    assert [table.paths[row] for row in rows] == expected
+    return expected
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("length", [1, 9, 10, 57, 200])
+def test_select_batches_matches_analyze_best_images(seed, length):
+    scores = np.random.default_rng(seed).gamma(2.0, 50.0, size=length)
+    both(scores)
+    both(scores, batch_size=7, threshold=0.2, min_images=1, max_images=3)
+
+def test_partial_last_batch():
+    # The last batch's mean is 20 over its three frames, not over four slots
+    scores = [1.0, 2.0, 3.0, 4.0, 10.0, 20.0, 30.0]
+    assert both(scores, batch_size=4, min_images=1, max_images=4) == [
+        "frame_000004.jpg", "frame_000003.jpg", "frame_000007.jpg"
+    ]
+
+def test_nan_scores_are_never_selected():
+    rng = np.random.default_rng(3)
+    scores = rng.random(95) * 100
+    scores[rng.choice(95, size=30, replace=False)] = np.nan
+    scores[10:20] = np.nan  # A batch without a single score
+    selected = both(scores, min_images=4)
+    nan_paths = {f"frame_{i + 1:06d}.jpg" for i in np.flatnonzero(np.isnan(scores))}
+    assert selected and not nan_paths & set(selected)
+
+def test_min_images_fills_flat_batches():
+    # Equal scores leave no frame above the mean, so min_images decides
+    scores = [5.0] * 6 + [1.0, 2.0, 3.0, 9.0]
+    assert both(scores, batch_size=5, threshold=10.0, min_images=3) == [
+        "frame_000001.jpg", "frame_000002.jpg", "frame_000003.jpg",
+        "frame_000010.jpg", "frame_000006.jpg", "frame_000009.jpg"
+    ]
+
+def test_max_images_caps_batches():
+    scores = [1.0, 1.0, 8.0, 9.0, 10.0, 11.0, 12.0, 1.0]
+    assert both(scores, batch_size=8, threshold=10.0, min_images=1, max_images=2) == [
+        "frame_000007.jpg", "frame_000006.jpg"
+    ]
+
+def test_arrays_round_trip():
+    frames = [
+        ImageData(f"frame_{i + 1:06d}.jpg", score, dhash, {'contrast': contrast})
+        for i, (score, dhash, contrast) in enumerate([
+            (12.5, 0xFFFF_FFFF_FFFF_FFFF, 0.4), (None, None, None), (3.0, 7, 0.9)
+        ])
+    ]
+    table = FrameTable.from_image_data(frames, fps=29.97)
+    table.set_badge(BADGE_BEST, [0, 2])
+    restored = FrameTable.from_arrays(table.to_arrays())
+
+    assert restored.paths == table.paths
+    assert restored.fps == table.fps
+    np.testing.assert_array_equal(restored.index, table.index)
+    np.testing.assert_array_equal(restored.timestamp, table.timestamp)
+    np.testing.assert_array_equal(restored.score, table.score)
+    np.testing.assert_array_equal(restored.dhash, table.dhash)
+    np.testing.assert_array_equal(restored.has_hash, table.has_hash)
+    np.testing.assert_array_equal(restored.badges, table.badges)
+    assert restored.metrics.keys() == table.metrics.keys()
+    np.testing.assert_array_equal(restored.metrics['contrast'], table.metrics['contrast'])
+    assert restored.paths_with_badge(BADGE_BEST) == ["frame_000001.jpg", "frame_000003.jpg"]
+
+def test_arrays_round_trip_without_fps(tmp_path):
+    table = FrameTable.from_image_data(image_data([1.0, 2.0]))
+    path = tmp_path / "frames.npz"
+    np.savez(path, **table.to_arrays())
+    with np.load(path) as arrays:
+        restored = FrameTable.from_arrays(dict(arrays))
+    assert restored.fps is None
+    assert restored.paths == table.paths
+    np.testing.assert_array_equal(restored.score, table.score)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from image_analyzer import select_best_frames_global
+
+def test_empty_input():
+    selected = select_best_frames_global([])
+    assert selected.dtype == np.int64
+    assert len(selected) == 0
+
+def test_min_gap_suppresses_neighbours():
+    scores = [1.0, 5.0, 4.0, 1.0, 1.0, 1.0, 6.0, 1.0, 1.0, 1.0]
+    # Frame 2 is above the local mean but within min_gap of the sharper frame 1
+    assert select_best_frames_global(scores, min_gap=2).tolist() == [1, 6]
+    assert select_best_frames_global(scores, min_gap=0).tolist() == [1, 2, 6]
+
+def test_ties_keep_earliest_frame():
+    scores = [1.0, 5.0, 5.0, 1.0, 1.0, 1.0]
+    assert select_best_frames_global(scores, min_gap=2).tolist() == [1]
+
+@pytest.mark.parametrize("min_gap", [0, 1, 3, 5])
+def test_picks_are_more_than_min_gap_apart(min_gap):
+    scores = np.random.default_rng(min_gap).random(500)
+    selected = select_best_frames_global(scores, min_gap=min_gap)
+    assert len(selected)
+    assert np.all(np.diff(selected) > min_gap)
+
+def test_max_gap_fills_holes():
+    scores = np.ones(30)
+    scores[0] = 10.0
+    scores[17] = 1.5
+    # A flat sequence only yields its peaks without max_gap
+    assert select_best_frames_global(scores, min_gap=2).tolist() == [0, 17]
+    selected = select_best_frames_global(scores, min_gap=2, max_gap=10)
+    assert {0, 17} <= set(selected.tolist())
+    gaps = np.diff(np.concatenate([[-1], selected, [len(scores)]]))
+    assert np.all(gaps <= 10)
+
+def test_max_images_keeps_highest_scores():
+    scores = [1.0, 9.0, 1.0, 1.0, 3.0, 1.0, 1.0, 7.0, 1.0, 1.0, 5.0, 1.0]
+    assert select_best_frames_global(scores, min_gap=1).tolist() == [1, 4, 7, 10]
+    assert select_best_frames_global(scores, min_gap=1, max_images=2).tolist() == [1, 7]
+    assert select_best_frames_global(scores, min_gap=1, max_images=0).tolist() == []
+
+@pytest.mark.parametrize("missing", [np.nan, None])
+def test_missing_scores_are_never_picked(missing):
+    scores = [1.0, missing, 1.0, missing, missing, missing, missing, 2.0, missing]
+    selected = select_best_frames_global(scores, min_gap=1, max_gap=2)
+    assert selected.tolist()
+    assert all(scores[i] is not None and np.isfinite(scores[i]) for i in selected)
+
+def test_all_missing_scores():
+    scores = np.full(20, np.nan)
+    assert select_best_frames_global(scores, min_gap=2, max_gap=3).tolist() == []
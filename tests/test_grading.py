@@ -0,0 +1,87 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import grading
+from grading import grade_images, normalize_image
+
+def cast_image(bgr, size=(48, 64), seed=0):
+    noise = np.random.default_rng(seed).integers(-20, 21, size=size + (3,))
+    return np.clip(np.array(bgr)[None, None, :] + noise, 0, 255).astype(np.uint8)
+
+def test_normalize_image_removes_colour_cast():
+    graded = normalize_image(cast_image((60, 90, 140)), target=0.45)
+    assert graded.shape == (48, 64, 3) and graded.dtype == np.uint8
+    means = np.array(cv2.mean(graded)[:3])
+    assert means.max() - means.min() < 6
+    assert means.mean() / 255.0 == pytest.approx(0.45, abs=0.03)
+
+@pytest.mark.parametrize("level", [70, 160])
+def test_normalize_image_brings_exposure_to_target(level):
+    graded = normalize_image(cast_image((level, level, level)), target=0.45)
+    assert np.mean(graded) / 255.0 == pytest.approx(0.45, abs=0.03)
+
+@pytest.mark.parametrize("level", [20, 230])
+def test_normalize_image_limits_gamma(level):
+    # Gamma stays within 0.5-2, so extreme exposures only move part of the way
+    image = cast_image((level, level, level))
+    graded = normalize_image(image, target=0.45)
+    assert abs(np.mean(graded) - 0.45 * 255) < abs(np.mean(image) - 0.45 * 255)
+    assert abs(np.mean(graded) / 255.0 - 0.45) > 0.1
+
+def test_normalize_image_limits_gain():
+    # Without blue, gray-world would need a huge gain for the blue channel
+    image = cast_image((0, 100, 100))
+    image[..., 0] = 2
+    limited = normalize_image(image, target=0.45, max_gain=2.0)
+    unlimited = normalize_image(image, target=0.45, max_gain=1000.0)
+    assert cv2.mean(limited)[0] < 30 < cv2.mean(unlimited)[0]
+
+@pytest.fixture
+def frames(tmp_path, monkeypatch):
+    """Source folder with three cast frames; darktable is never found"""
+    monkeypatch.setattr(grading, 'darktable_cli', lambda: None)
+    source = tmp_path / "Best Images"
+    source.mkdir()
+    for i, bgr in enumerate([(60, 90, 140), (140, 90, 60), (40, 40, 40)]):
+        cv2.imwrite(str(source / f"frame_{i + 1:06d}.jpg"), cast_image(bgr, seed=i))
+    return str(source), str(tmp_path / "Graded Images")
+
+def test_opencv_fallback_writes_graded_images(frames):
+    source, output = frames
+    result = grade_images(source, output, method='auto', workers=2)
+    names = sorted(os.listdir(source))
+    assert result['method'] == 'opencv' and result['style'] is None
+    assert result['graded'] == names
+    assert result['skipped'] == 0 and result['failed'] == [] and not result['cancelled']
+    for name in names:
+        graded = cv2.imread(os.path.join(output, name))
+        expected = normalize_image(cv2.imread(os.path.join(source, name)))
+        assert graded.shape == expected.shape
+        # Only the JPEG encoding separates them
+        assert np.abs(graded.astype(int) - expected).mean() < 3
+
+def test_up_to_date_cache_skips_work(frames, monkeypatch):
+    source, output = frames
+    grade_images(source, output, method='opencv')
+    graded_at = {name: os.path.getmtime(os.path.join(output, name)) for name in os.listdir(source)}
+
+    def fail(*args):
+        raise AssertionError("graded again")
+
+    monkeypatch.setattr(grading, '_grade_opencv', fail)
+    result = grade_images(source, output, method='opencv')
+    assert result['graded'] == [] and result['skipped'] == 3
+    assert {name: os.path.getmtime(os.path.join(output, name)) for name in graded_at} == graded_at
+
+def test_changed_source_and_dropped_names(frames):
+    source, output = frames
+    grade_images(source, output, method='opencv')
+    cv2.imwrite(os.path.join(source, "frame_000002.jpg"), cast_image((10, 200, 10)))
+    result = grade_images(source, output, names=["frame_000001.jpg", "frame_000002.jpg"], method='opencv')
+    assert result['graded'] == ["frame_000002.jpg"]
+    assert result['skipped'] == 1
+    assert result['removed'] == ["frame_000003.jpg"]
+    assert sorted(f for f in os.listdir(output) if f.endswith(".jpg")) == ["frame_000001.jpg", "frame_000002.jpg"]
@@ -0,0 +1,26 @@
+from instrumentation import RunRecorder, format_report
+from progress import ProgressBus
+
+def test_stage_records_memory_before_and_after():
+    bus = ProgressBus()
+    recorder = RunRecorder(bus)
+    with bus.stage('score'):
+        pass
+    usage = recorder.report()['stages']['score']
+    assert usage['rss_before'] is None or usage['rss_before'] > 0
+    assert usage['rss_after'] is None or usage['rss_after'] > 0
+    assert not usage['shared']
+    assert "Process peak memory" in format_report(recorder.report())
+
+def test_overlapping_runs_are_marked_shared():
+    first, second = ProgressBus(), ProgressBus()
+    first_recorder, second_recorder = RunRecorder(first), RunRecorder(second)
+    with first.stage('extract'):
+        with second.stage('extract'):
+            pass
+    with first.stage('select'):
+        pass
+    assert first_recorder.report()['stages']['extract']['shared']
+    assert second_recorder.report()['stages']['extract']['shared']
+    assert not first_recorder.report()['stages']['select']['shared']
+    assert RunRecorder._open_stages == {}
@@ -0,0 +1,39 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+import image_analyzer
+from image_analyzer import decode_keyframes
+
+@pytest.fixture
+def ffmpeg_help(monkeypatch):
+    """Replaces the output of ffmpeg -h long"""
+    image_analyzer._passthrough_sync.cache_clear()
+    yield lambda text: monkeypatch.setattr(
+        subprocess, 'run', lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, stdout=text, stderr="")
+    )
+    image_analyzer._passthrough_sync.cache_clear()
+
+def test_fps_mode_on_current_ffmpeg(ffmpeg_help):
+    ffmpeg_help("-fps_mode[:<stream_spec>]  set framerate mode for matching video streams; overrides vsync\n")
+    assert image_analyzer._passthrough_sync() == ('-fps_mode', 'passthrough')
+
+def test_vsync_on_old_ffmpeg(ffmpeg_help):
+    ffmpeg_help("-vsync <>           video sync method\n")
+    assert image_analyzer._passthrough_sync() == ('-vsync', 'passthrough')
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="needs ffmpeg")
+def test_decode_keyframes(tmp_path):
+    video = str(tmp_path / "gop.mp4")
+    subprocess.run([
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'lavfi', '-i', 'testsrc=size=160x90:rate=10:duration=4',
+        '-c:v', 'libx264', '-g', '10', '-pix_fmt', 'yuv420p', video
+    ], check=True)
+    video_info = {'resolution': '160x90', 'duration': 4.0, 'frame_rate': 10.0}
+    timestamps = []
+    frames = list(decode_keyframes(video, video_info=video_info, timestamps=timestamps))
+    assert len(frames) == 4
+    assert all(frame.shape == (90, 160) and frame.dtype == np.uint8 for frame in frames)
+    assert timestamps == pytest.approx([0.0, 1.0, 2.0, 3.0])
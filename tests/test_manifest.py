@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+import pipeline
+from frame_table import FrameTable
+from image_analyzer import ImageData
+from manifest import ProjectManifest
+
+def frame_table(length=30):
+    scores = np.random.default_rng(0).random(length) * 100
+    return FrameTable.from_image_data([
+        ImageData(f"frame_{i + 1:06d}.jpg", float(score), i) for i, score in enumerate(scores)
+    ])
+
+@pytest.fixture
+def selections(monkeypatch):
+    """Counts select_best_frames calls made by select_stage"""
+    calls = []
+    select_best_frames = pipeline.select_best_frames
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs)
+        return select_best_frames(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline, 'select_best_frames', counting)
+    return calls
+
+def run_select(project, frames, **options):
+    # A fresh manifest per run, as when the project is resumed by a new process
+    manifest = ProjectManifest(str(project))
+    return pipeline.select_stage(frames, manifest=manifest, **options), manifest
+
+def test_matching_sidecar_is_reused(tmp_path, selections):
+    frames = frame_table()
+    first, _ = run_select(tmp_path, frames)
+    second, manifest = run_select(tmp_path, frames)
+    assert second == first
+    assert len(selections) == 1
+    assert manifest.reused() == ['select']
+
+def test_corrupted_sidecar_reruns_stage(tmp_path, selections):
+    frames = frame_table()
+    first, manifest = run_select(tmp_path, frames)
+    with open(manifest.sidecar_path('select'), "r+b") as f:
+        f.seek(10)
+        f.write(b"corrupted")
+    second, manifest = run_select(tmp_path, frames)
+    assert second == first
+    assert len(selections) == 2
+    assert manifest.reused() == []
+    # The rerun wrote a fresh sidecar that is reused again
+    run_select(tmp_path, frames)
+    assert len(selections) == 2
+
+def test_missing_sidecar_reruns_stage(tmp_path, selections):
+    frames = frame_table()
+    first, manifest = run_select(tmp_path, frames)
+    os.remove(manifest.sidecar_path('select'))
+    assert not ProjectManifest(str(tmp_path)).is_current('select', pipeline.selection_inputs())
+    second, _ = run_select(tmp_path, frames)
+    assert second == first
+    assert len(selections) == 2
+
+def test_changed_params_rerun_stage(tmp_path, selections):
+    frames = frame_table()
+    run_select(tmp_path, frames, max_images=7)
+    fewer, manifest = run_select(tmp_path, frames, max_images=1)
+    assert len(selections) == 2
+    assert len(fewer) == 3  # One per batch of ten
+    assert manifest.reused() == []
+    assert manifest.data['stages']['select']['inputs']['max_images'] == 1
+
+def test_begin_discards_later_stages_and_sidecars(tmp_path):
+    manifest = ProjectManifest(str(tmp_path))
+    for stage in ('extract', 'score', 'select'):
+        manifest.begin(stage, {'stage': stage})
+        manifest.complete(stage, arrays={'values': np.arange(3)}, count=3)
+    manifest.begin('score', {'stage': 'score', 'changed': True})
+
+    reloaded = ProjectManifest(str(tmp_path))
+    assert reloaded.is_current('extract', {'stage': 'extract'})
+    np.testing.assert_array_equal(reloaded.arrays('extract')['values'], np.arange(3))
+    assert reloaded.results('score') is None
+    assert 'select' not in reloaded.data['stages']
+    assert not os.path.exists(manifest.sidecar_path('score'))
+    assert not os.path.exists(manifest.sidecar_path('select'))
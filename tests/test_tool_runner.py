@@ -0,0 +1,134 @@
+"""ToolRunner and align_projects against fake_realitycapture.py"""
+import os
+import threading
+import time
+
+import pytest
+
+from pipeline import align_projects, align_with_reality_capture, build_rc_command
+from progress import ProgressBus
+from tool_runner import ToolRunner, parse_progress
+
+FAKE_RC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fake_realitycapture.py")
+
+def make_project(root, name: str, images: int) -> str:
+    project = root / name
+    best = project / "Best Images"
+    best.mkdir(parents=True)
+    (project / "RC_Export").mkdir()
+    for i in range(1, images + 1):
+        (best / f"frame_{i:06d}.jpg").write_bytes(b"")
+    return str(project)
+
+def fake_command(project: str):
+    return build_rc_command(
+        os.path.join(project, "Best Images"), os.path.join(project, "rc_project.rcproj"),
+        os.path.join(project, "RC_Export"), FAKE_RC
+    )
+
+def wait_until(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+@pytest.mark.parametrize("line, expected", [
+    ("Aligning images 12/40", (12, 40)),
+    ("Progress: 35%", (35, 100)),
+    ("Progress: 12.5 %", (12, 100)),
+    ("Saved 0/0", None),
+    ("Project saved", None),
+])
+def test_parse_progress(line, expected):
+    assert parse_progress(line) == expected
+
+def test_run_done_reports_progress(tmp_path):
+    project = make_project(tmp_path, "project", 5)
+    progress = ProgressBus()
+    result = ToolRunner().run(fake_command(project), name="RealityCapture", progress=progress, stage='align')
+
+    assert result['status'] == "done"
+    assert result['success'] and result['returncode'] == 0
+    assert "Aligning images 5/5" in result['output']
+    align = progress.summary()['align']
+    assert (align['done'], align['total'], align['finished']) == (5, 5, True)
+
+def test_nonzero_exit_fails(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_RC_EXIT_CODE', '3')
+    result = ToolRunner().run(fake_command(make_project(tmp_path, "project", 1)))
+    assert result['status'] == "failed"
+    assert result['returncode'] == 3
+
+def test_missing_executable_fails():
+    result = ToolRunner().run([os.path.join("does", "not", "exist")])
+    assert result['status'] == "failed"
+    assert not result['success']
+    assert result['error']
+
+def test_timeout(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_RC_DELAY', '1')
+    result = ToolRunner().run(fake_command(make_project(tmp_path, "project", 20)), timeout=0.5)
+    assert result['status'] == "timed out"
+    assert result['timed_out']
+    assert result['elapsed'] < 10
+
+def test_cancel_running(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_RC_DELAY', '1')
+    run = ToolRunner().start(fake_command(make_project(tmp_path, "project", 20)))
+    wait_until(lambda: run.status == "running")
+    run.cancel()
+    result = run.wait(timeout=10)
+    assert result['status'] == "cancelled"
+    assert result['cancelled'] and not result['timed_out']
+
+def test_cancel_while_queued(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_RC_DELAY', '1')
+    runner = ToolRunner(max_concurrent=1)
+    first = runner.start(fake_command(make_project(tmp_path, "first", 20)))
+    wait_until(lambda: first.status == "running")
+    queued = runner.start(fake_command(make_project(tmp_path, "second", 20)))
+    time.sleep(0.3)
+    assert queued.status == "queued"
+
+    queued.cancel()
+    assert queued.wait(timeout=10)['status'] == "cancelled"
+    assert queued.started_at is None
+    first.cancel()
+    assert first.wait(timeout=10)['status'] == "cancelled"
+
+def test_concurrency_limit(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_RC_DELAY', '0.05')
+    runner = ToolRunner(max_concurrent=2)
+    runs = [runner.start(fake_command(make_project(tmp_path, f"project_{i}", 6))) for i in range(4)]
+    most_running = 0
+    while not all(run.done() for run in runs):
+        most_running = max(most_running, sum(run.status == "running" for run in runs))
+        time.sleep(0.01)
+    assert most_running == 2
+    assert [run.result()['status'] for run in runs] == ["done"] * 4
+
+def test_align_projects(tmp_path):
+    aligned = make_project(tmp_path, "aligned", 3)
+    empty = make_project(tmp_path, "empty", 0)
+    missing = str(tmp_path / "missing")
+    results = align_projects([aligned, empty, missing], rc_executable=FAKE_RC, runner=ToolRunner(2))
+
+    assert [result['project_folder'] for result in results] == [aligned, empty, missing]
+    assert [result['status'] for result in results] == ["done", "failed", "failed"]
+    export = os.path.join(aligned, "RC_Export")
+    for name in ("sparsePointCloud.ply", "camera_params.csv", "crmeta.db"):
+        assert os.path.exists(os.path.join(export, name))
+    assert results[0]['crmeta_path'] == os.path.join(export, "crmeta.db")
+    assert not os.path.exists(os.path.join(aligned, "Best Images", "crmeta.db"))
+    assert "No images found" in results[1]['error']
+    assert "not found" in results[2]['error']
+
+def test_align_cancel_event(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_RC_DELAY', '1')
+    cancel_event = threading.Event()
+    cancel_event.set()
+    result = align_with_reality_capture(
+        make_project(tmp_path, "project", 20), FAKE_RC, runner=ToolRunner(), cancel_event=cancel_event
+    )
+    assert result['status'] == "cancelled"
+    assert not result['success']
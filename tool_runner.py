@@ -0,0 +1,228 @@
+"""Runs external tools (RealityCapture, darktable) as cancellable background processes.
+
+ToolRunner.start() returns a ToolRun at once. The process runs on a worker
+thread once one of the runner's max_concurrent slots is free, so many
+projects can queue alignments without starting more tool instances than the
+machine can take. stdout and stderr are read line by line into the log and
+into a progress stage: lines that look like progress ("12/40", "35%") set its
+count and every line becomes its status message. A run is stopped on
+cancel() or once its timeout expires; terminate is tried before kill.
+"""
+import collections
+import logging
+import re
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from config import MAX_CONCURRENT_TOOLS, TOOL_OUTPUT_LINES
+from progress import ProgressBus
+
+logger = logging.getLogger(__name__)
+
+_COUNT = re.compile(r'\b(\d+)\s*/\s*(\d+)\b')
+_PERCENT = re.compile(r'\b(\d+(?:\.\d+)?)\s*%')
+# Seconds a terminated process gets to exit before it is killed
+_TERMINATE_GRACE = 5.0
+
+def parse_progress(line: str) -> Optional[Tuple[int, int]]:
+    """(done, total) from a line such as 'Aligning 12/40' or 'Progress: 35%', else None"""
+    match = _COUNT.search(line)
+    if match and int(match.group(2)) > 0:
+        return int(match.group(1)), int(match.group(2))
+    match = _PERCENT.search(line)
+    if match:
+        return int(float(match.group(1))), 100
+    return None
+
+class ToolRun:
+    """One queued or running tool invocation; see ToolRunner.start"""
+
+    def __init__(self, command: List[str], name: str, timeout: Optional[float], cancel_event: threading.Event):
+        self.command = command
+        self.name = name
+        self.timeout = timeout
+        self.cancel_event = cancel_event
+        self.status = "queued"
+        self.returncode = None
+        self.timed_out = False
+        self.error = None
+        self.output = collections.deque(maxlen=TOOL_OUTPUT_LINES)
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def cancel(self) -> None:
+        """Stop the process, or drop the run if it has not started yet"""
+        self.cancel_event.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> dict:
+        """Block until the run finished and return result(); raises TimeoutError if it did not in time"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} still running after {timeout}s")
+        return self.result()
+
+    def result(self) -> dict:
+        return {
+            'command': self.command,
+            'status': self.status,
+            'success': self.status == "done",
+            'returncode': self.returncode,
+            'timed_out': self.timed_out,
+            'cancelled': self.status == "cancelled",
+            'error': self.error,
+            'elapsed': self.elapsed,
+            'output': list(self.output)
+        }
+
+class ToolRunner:
+    """Starts tool processes with at most max_concurrent running at once"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_TOOLS):
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = threading.Semaphore(self.max_concurrent)
+
+    def start(self, command: List[str], name: str = None, progress: ProgressBus = None, stage: str = None,
+              timeout: float = None, cwd: str = None, cancel_event: threading.Event = None,
+              on_line: Callable[[str], None] = None) -> ToolRun:
+        """Queue command and return its ToolRun without waiting.
+
+        Output is reported on the stage (default: name) of progress.
+        cancel_event can be shared with the caller, e.g. a GUI cancel button.
+        The timeout counts from the moment the process starts.
+        """
+        name = name or command[0]
+        run = ToolRun(command, name, timeout, cancel_event or threading.Event())
+        threading.Thread(
+            target=self._run, args=(run, progress, stage or name, cwd, on_line),
+            name=f"tool-{name}", daemon=True
+        ).start()
+        return run
+
+    def run(self, command: List[str], **options) -> dict:
+        """start() and wait for the result"""
+        return self.start(command, **options).wait()
+
+    def _acquire(self, run: ToolRun) -> bool:
+        # Poll so a run cancelled while queued never starts
+        while not self._slots.acquire(timeout=0.2):
+            if run.cancelled:
+                return False
+        return True
+
+    def _run(self, run: ToolRun, progress: Optional[ProgressBus], stage: str, cwd: Optional[str], on_line) -> None:
+        try:
+            if not self._acquire(run):
+                run.status = "cancelled"
+                return
+            try:
+                self._execute(run, progress or ProgressBus(), stage, cwd, on_line)
+            finally:
+                self._slots.release()
+        except Exception as e:
+            logger.error(f"{run.name} failed to run: {e}")
+            run.status = "failed"
+            run.error = str(e)
+        finally:
+            run.finished_at = run.finished_at or time.perf_counter()
+            run._done.set()
+
+    def _execute(self, run: ToolRun, progress: ProgressBus, stage_name: str, cwd: Optional[str], on_line) -> None:
+        if run.cancelled:
+            run.status = "cancelled"
+            return
+        logger.info(f"Starting {run.name}: {' '.join(run.command)}")
+        run.status = "running"
+        run.started_at = time.perf_counter()
+        process = subprocess.Popen(
+            run.command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, errors="replace", bufsize=1
+        )
+        with progress.stage(stage_name, f"Running {run.name}") as stage:
+            readers = [
+                threading.Thread(target=self._read, args=(run, pipe, stage, on_line, level), daemon=True)
+                for pipe, level in ((process.stdout, logging.INFO), (process.stderr, logging.WARNING))
+            ]
+            for reader in readers:
+                reader.start()
+
+            deadline = run.started_at + run.timeout if run.timeout else None
+            stopped = False
+            while True:
+                try:
+                    process.wait(timeout=0.2)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if run.cancelled or (deadline is not None and time.perf_counter() > deadline):
+                    run.timed_out = not run.cancelled
+                    self._stop(run, process)
+                    stopped = True
+                    break
+            for reader in readers:
+                reader.join()
+
+        run.returncode = process.returncode
+        run.finished_at = time.perf_counter()
+        if stopped and not run.timed_out:
+            run.status = "cancelled"
+        elif run.timed_out:
+            run.status = "timed out"
+        else:
+            run.status = "done" if process.returncode == 0 else "failed"
+        logger.info(f"{run.name} {run.status} after {run.elapsed:.1f}s (exit code {run.returncode})")
+
+    @staticmethod
+    def _stop(run: ToolRun, process: subprocess.Popen) -> None:
+        reason = "cancelled" if run.cancelled else f"timed out after {run.timeout}s"
+        logger.warning(f"Stopping {run.name}: {reason}")
+        process.terminate()
+        try:
+            process.wait(timeout=_TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    @staticmethod
+    def _read(run: ToolRun, pipe, stage, on_line, level: int) -> None:
+        with pipe:
+            for line in pipe:
+                line = line.rstrip()
+                if not line:
+                    continue
+                run.output.append(line)
+                counts = parse_progress(line)
+                if counts is not None:
+                    logger.debug("%s: %s", run.name, line)
+                    stage.total = counts[1]
+                    stage.put(counts[0])
+                else:
+                    logger.log(level, "%s: %s", run.name, line)
+                stage.note(line)
+                if on_line is not None:
+                    on_line(line)
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+def default_runner() -> ToolRunner:
+    """Process-wide runner, so every project shares the MAX_CONCURRENT_TOOLS limit"""
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = ToolRunner()
+        return _default_runner
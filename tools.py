@@ -0,0 +1,108 @@
+"""Discovery of the external tools: ffmpeg, ffprobe, RealityCapture and darktable.
+
+Finding the tools means searching PATH and starting ffmpeg and ffprobe once
+to check that they run, which takes a noticeable moment on Windows.
+discover_tools() does this once per process on a background thread, so
+start-up never waits for it. The version checks are also cached in
+TOOL_CACHE_FILE, keyed by executable path, size and mtime, so later starts
+skip them until a tool is replaced.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from config import RC_EXECUTABLE, DARKTABLE_EXECUTABLE, TOOL_CACHE_FILE
+
+logger = logging.getLogger(__name__)
+
+TOOLS = ('ffmpeg', 'ffprobe', 'realitycapture', 'darktable')
+REQUIRED_TOOLS = ('ffmpeg', 'ffprobe')
+# Started with -version to check they work; the others are GUI applications
+_VERSIONED_TOOLS = ('ffmpeg', 'ffprobe')
+
+_lock = threading.Lock()
+_discovery: Optional[Future] = None
+
+def _locate(name: str) -> Optional[str]:
+    if name == 'realitycapture':
+        return RC_EXECUTABLE if os.path.exists(RC_EXECUTABLE) else None
+    if name == 'darktable':
+        return DARKTABLE_EXECUTABLE if os.path.exists(DARKTABLE_EXECUTABLE) else None
+    return shutil.which(name)
+
+def _read_version(path: str) -> Optional[str]:
+    try:
+        result = subprocess.run([path, '-version'], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return result.stdout.splitlines()[0]
+
+def _load_cache() -> dict:
+    try:
+        with open(TOOL_CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache: dict) -> None:
+    try:
+        with open(TOOL_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=1)
+    except OSError as e:
+        logger.debug("Could not write tool cache %s: %s", TOOL_CACHE_FILE, e)
+
+def find_tools() -> Dict[str, dict]:
+    """{name: {'path', 'version', 'available'}} for every tool in TOOLS, looked up now"""
+    cache = _load_cache()
+    cache_changed = False
+    tools = {}
+    for name in TOOLS:
+        path = _locate(name)
+        info = {'path': path, 'version': None, 'available': path is not None}
+        if path is not None and name in _VERSIONED_TOOLS:
+            stat = os.stat(path)
+            key = [stat.st_size, stat.st_mtime_ns]
+            cached = cache.get(path)
+            if cached is not None and cached['key'] == key:
+                info['version'] = cached['version']
+            else:
+                info['version'] = _read_version(path)
+                cache[path] = {'key': key, 'version': info['version']}
+                cache_changed = True
+            info['available'] = info['version'] is not None
+        tools[name] = info
+    if cache_changed:
+        _save_cache(cache)
+    return tools
+
+def discover_tools() -> Future:
+    """Start find_tools on a background thread the first time; later calls return the same future"""
+    global _discovery
+    with _lock:
+        if _discovery is None:
+            _discovery = Future()
+            future = _discovery
+
+            def run():
+                try:
+                    future.set_result(find_tools())
+                except Exception as e:
+                    future.set_exception(e)
+
+            threading.Thread(target=run, name="tool-discovery", daemon=True).start()
+        return _discovery
+
+def tool_info(name: str, timeout: float = None) -> dict:
+    """Discovery result for one tool, waiting for discovery to finish"""
+    return discover_tools().result(timeout)[name]
+
+def missing_tools(names=REQUIRED_TOOLS, timeout: float = None) -> List[str]:
+    tools = discover_tools().result(timeout)
+    return [name for name in names if not tools[name]['available']]
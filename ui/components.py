@@ -0,0 +1,106 @@
+import dearpygui.dearpygui as dpg
+import numpy as np
+
+from frame_table import FrameTable, BADGE_BEST
+
+SORT_OPTIONS = ["Frame order", "Score (high to low)", "Score (low to high)"]
+FILTER_OPTIONS = ["All frames", "Best only", "Not best"]
+
+class VirtualTable:
+    """Paged Dear PyGui table over the columns of a FrameTable.
+
+    A fixed pool of page_size rows is created once; sorting, filtering and
+    paging only compute an index array and update the text of the visible
+    rows, so refreshing costs the same no matter how many frames there are.
+    """
+
+    def __init__(self, tag: str, parent: str, page_size: int = 20,
+                 columns=("Image", "Sharpness Score", "Badges")):
+        self.tag = tag
+        self.parent = parent
+        self.page_size = page_size
+        self.columns = columns
+        self.page = 0
+        self.sort_mode = SORT_OPTIONS[0]
+        self.filter_mode = FILTER_OPTIONS[0]
+        self._frames = FrameTable([])
+        self._best = np.empty(0, dtype=bool)
+        self._view = np.empty(0, dtype=np.int64)
+
+    def build(self) -> None:
+        """Create the controls and the row pool; call once inside the parent container"""
+        if dpg.does_item_exist(self.tag):
+            return
+        with dpg.group(horizontal=True, parent=self.parent):
+            dpg.add_combo(SORT_OPTIONS, default_value=self.sort_mode, width=170,
+                          callback=self._on_sort, tag=f"{self.tag}_sort")
+            dpg.add_combo(FILTER_OPTIONS, default_value=self.filter_mode, width=120,
+                          callback=self._on_filter, tag=f"{self.tag}_filter")
+        with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp,
+                       borders_innerH=True, borders_outerH=True, borders_innerV=True,
+                       borders_outerV=True, tag=self.tag, parent=self.parent):
+            for label in self.columns:
+                dpg.add_table_column(label=label)
+            for row in range(self.page_size):
+                with dpg.table_row(tag=f"{self.tag}_row_{row}", show=False):
+                    for column in range(len(self.columns)):
+                        dpg.add_text("", tag=f"{self.tag}_cell_{row}_{column}")
+        with dpg.group(horizontal=True, parent=self.parent):
+            dpg.add_button(label="<", width=30, callback=lambda: self.set_page(self.page - 1))
+            dpg.add_text("", tag=f"{self.tag}_page")
+            dpg.add_button(label=">", width=30, callback=lambda: self.set_page(self.page + 1))
+
+    def set_frames(self, frames: FrameTable) -> None:
+        """Show a FrameTable; its columns are used directly, only the view is recomputed"""
+        self._frames = frames
+        self._best = frames.has_badge(BADGE_BEST)
+        self._update_view()
+
+    def _update_view(self) -> None:
+        if self.filter_mode == "Best only":
+            view = np.flatnonzero(self._best)
+        elif self.filter_mode == "Not best":
+            view = np.flatnonzero(~self._best)
+        else:
+            view = np.arange(len(self._frames))
+
+        if self.sort_mode != "Frame order" and len(view):
+            # NaN scores sort last either way
+            keys = np.nan_to_num(self._frames.score[view], nan=-np.inf)
+            if self.sort_mode == "Score (high to low)":
+                keys = -keys
+            else:
+                keys = np.where(np.isneginf(keys), np.inf, keys)
+            view = view[np.argsort(keys, kind='stable')]
+
+        self._view = view
+        self.set_page(self.page)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self._view) // self.page_size))
+
+    def set_page(self, page: int) -> None:
+        self.page = min(max(0, page), self.page_count - 1)
+        if not dpg.does_item_exist(self.tag):
+            return
+        visible = self._view[self.page * self.page_size:(self.page + 1) * self.page_size]
+        for row in range(self.page_size):
+            show = row < len(visible)
+            if show:
+                i = visible[row]
+                score = self._frames.score[i]
+                dpg.set_value(f"{self.tag}_cell_{row}_0", self._frames.paths[i])
+                dpg.set_value(f"{self.tag}_cell_{row}_1", "" if np.isnan(score) else f"{score:.2f}")
+                dpg.set_value(f"{self.tag}_cell_{row}_2", ", ".join(self._frames.badge_names(i)))
+            dpg.configure_item(f"{self.tag}_row_{row}", show=show)
+        dpg.set_value(f"{self.tag}_page", f"Page {self.page + 1}/{self.page_count} ({len(self._view)} frames)")
+
+    def _on_sort(self, sender, app_data, user_data):
+        self.sort_mode = app_data
+        self._update_view()
+
+    def _on_filter(self, sender, app_data, user_data):
+        self.filter_mode = app_data
+        self.page = 0
+        self._update_view()
@@ -0,0 +1,140 @@
+import os
+import sys
+import shutil
+import logging
+from datetime import datetime
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+def create_project_folder(output_dir: str, project_name: str) -> str:
+    """Create a timestamped project folder and return its path"""
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    project_folder = os.path.join(output_dir, f"{project_name}-{timestamp}")
+    os.makedirs(project_folder, exist_ok=True)
+    logger.info(f"Created project folder: {project_folder}")
+    return project_folder
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def files_present(folder: str, paths: List[str]) -> bool:
+    """True when every path (relative to folder) exists"""
+    try:
+        existing = set(os.listdir(folder))
+    except OSError:
+        return False
+    return all(path in existing or os.path.exists(os.path.join(folder, path)) for path in paths)
+
+def clear_images(folder: str) -> int:
+    """Delete the images directly inside folder and return how many were removed"""
+    if not os.path.isdir(folder):
+        return 0
+    removed = 0
+    for name in os.listdir(folder):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            os.remove(os.path.join(folder, name))
+            removed += 1
+    if removed:
+        logger.info(f"Removed {removed} stale images from {folder}")
+    return removed
+
+def total_file_size(folder: str, paths: List[str]) -> int:
+    """Sum of the sizes of paths (relative to folder) that exist"""
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(os.path.join(folder, path))
+        except OSError:
+            pass
+    return total
+MATERIALIZE_MODES = ('auto', 'hardlink', 'reflink', 'copy')
+
+# Linux FICLONE ioctl, shares extents on btrfs/xfs/bcachefs
+_FICLONE = 0x40049409
+
+def _reflink(src: str, dst: str) -> bool:
+    """Create dst as a copy-on-write clone of src; False when the filesystem can't"""
+    try:
+        if sys.platform.startswith('linux'):
+            import fcntl
+            with open(src, 'rb') as s, open(dst, 'wb') as d:
+                fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+            shutil.copystat(src, dst)
+            return True
+        if sys.platform == 'darwin':
+            import ctypes
+            libc = ctypes.CDLL('libc.dylib', use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    except (OSError, AttributeError):
+        pass
+    if os.path.exists(dst):
+        os.remove(dst)
+    return False
+
+def materialize_file(src: str, dst: str, mode: str = 'auto') -> str:
+    """Make dst have the content of src, returning the method used.
+
+    'auto' tries a hardlink, then a reflink, then a plain copy. The other modes
+    only use the named method and raise OSError if it is not possible.
+    """
+    if mode not in MATERIALIZE_MODES:
+        raise ValueError(f"Unknown materialize mode: {mode}")
+    if mode in ('auto', 'hardlink'):
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            if mode == 'hardlink':
+                raise
+    if mode in ('auto', 'reflink'):
+        if _reflink(src, dst):
+            return 'reflink'
+        if mode == 'reflink':
+            raise OSError(f"Reflinks are not supported for {dst}")
+    shutil.copy2(src, dst)
+    return 'copy'
+
+def _is_current(src: str, dst: str) -> bool:
+    """True when dst already holds the current version of src"""
+    try:
+        if os.path.samefile(src, dst):
+            return True
+        src_stat, dst_stat = os.stat(src), os.stat(dst)
+    except OSError:
+        return False
+    # copy2 and reflinks preserve mtime, so a re-extracted source shows up here
+    return src_stat.st_size == dst_stat.st_size and int(src_stat.st_mtime) == int(dst_stat.st_mtime)
+
+def sync_best_images(source_dir: str, dest_dir: str, paths: List[str], mode: str = 'auto') -> dict:
+    """Make dest_dir contain exactly the selected frames, touching only what changed.
+
+    Images in dest_dir that are no longer selected are removed, newly selected
+    ones are materialized with materialize_file and up-to-date ones are left
+    alone. Non-image files (e.g. RealityCapture's crmeta.db) are never touched.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    wanted = {os.path.basename(path): path for path in paths}
+    existing = {f for f in os.listdir(dest_dir) if f.lower().endswith(IMAGE_EXTENSIONS)}
+
+    removed = sorted(existing - set(wanted))
+    for name in removed:
+        os.remove(os.path.join(dest_dir, name))
+
+    added, unchanged, methods = [], [], {}
+    for name, path in wanted.items():
+        src_path = os.path.join(source_dir, path)
+        dst_path = os.path.join(dest_dir, name)
+        if name in existing:
+            if _is_current(src_path, dst_path):
+                unchanged.append(name)
+                continue
+            os.remove(dst_path)
+        method = materialize_file(src_path, dst_path, mode)
+        methods[method] = methods.get(method, 0) + 1
+        added.append(name)
+
+    logger.info(
+        f"Synced best images in {dest_dir}: {len(added)} added, {len(removed)} removed, "
+        f"{len(unchanged)} unchanged ({methods or 'nothing materialized'})"
+    )
+    return {'added': added, 'removed': removed, 'unchanged': unchanged, 'methods': methods}
@@ -0,0 +1,101 @@
+import os
+import json
+import sqlite3
+import threading
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ScoreCache:
+    """SQLite-backed cache of per-image scores stored in the project folder.
+
+    Entries are keyed by path, metric name and metric parameters, and are only
+    returned while the file's size and mtime still match what was scored.
+    Paths are stored relative to the cache file so a project folder can be
+    moved or renamed without losing its scores.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.root = os.path.dirname(os.path.abspath(db_path))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                path TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                params TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                value,
+                PRIMARY KEY (path, metric, params)
+            )
+        """)
+        self._conn.commit()
+
+    def _key(self, path: str) -> str:
+        path = os.path.abspath(path)
+        try:
+            path = os.path.relpath(path, self.root)
+        except ValueError:
+            # Different drive on Windows, keep the absolute path
+            pass
+        return path.replace(os.sep, '/')
+
+    @staticmethod
+    def _params_key(params: Optional[dict]) -> str:
+        return json.dumps(params or {}, sort_keys=True)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def get_many(self, paths: Iterable[str], metric: str, params: dict = None) -> Dict[str, float]:
+        """Return {path: value} for every path with a valid cached entry"""
+        params_key = self._params_key(params)
+        hits = {}
+        with self._lock:
+            for path in paths:
+                stat = self._stat(path)
+                if stat is None:
+                    continue
+                row = self._conn.execute(
+                    "SELECT size, mtime_ns, value FROM scores WHERE path=? AND metric=? AND params=?",
+                    (self._key(path), metric, params_key)
+                ).fetchone()
+                if row is not None and (row[0], row[1]) == stat and row[2] is not None:
+                    hits[path] = row[2]
+        return hits
+
+    def get(self, path: str, metric: str, params: dict = None) -> Optional[float]:
+        return self.get_many([path], metric, params).get(path)
+
+    def put_many(self, entries: Iterable[Tuple[str, float]], metric: str, params: dict = None) -> None:
+        params_key = self._params_key(params)
+        rows = []
+        for path, value in entries:
+            stat = self._stat(path)
+            if stat is None or value is None:
+                continue
+            rows.append((self._key(path), metric, params_key, stat[0], stat[1], value))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (path, metric, params, size, mtime_ns, value) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        logger.debug("Cached %d %s values in %s", len(rows), metric, self.db_path)
+
+    def put(self, path: str, value: float, metric: str, params: dict = None) -> None:
+        self.put_many([(path, value)], metric, params)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,343 @@
+"""Command line entry point.
+
+    python -m videotosplat run video.mp4 --fps 5 --width 1920
+    python -m videotosplat batch clips/ other.mp4 --jobs 4
+    python -m videotosplat resume "project folder" --max-images 5
+    python -m videotosplat preview video.mp4 --fps 5
+    python -m videotosplat align "project 1" "project 2" --concurrent 1
+    python -m videotosplat grade "project 1" --style look.xmp --workers 4
+    python -m videotosplat calibrate "project/Source Images" --analysis-width 960 --score-dtype CV_32F
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+
+from config import (
+    AUTOMATIC_OUTPUT_DIR, DEFAULT_FPS, BATCH_SIZE, THRESHOLD,
+    MIN_IMAGES, MAX_IMAGES, SCORING_WORKERS,
+    MAX_CONCURRENT_JOBS, MAX_CONCURRENT_DECODERS, MAX_CONCURRENT_SCORERS,
+    SCORE_ANALYSIS_WIDTH, SCORE_DTYPE, SCORE_TILES, SCORE_TILE_PERCENTILE,
+    QUALITY_METRICS, METRIC_WEIGHTS, PREVIEW_METHOD, PREVIEW_SAMPLES, PREVIEW_WIDTH, LOG_LEVEL,
+    RC_EXECUTABLE, RC_TIMEOUT, MAX_CONCURRENT_TOOLS, GRADING_METHOD, GRADING_STYLE, GRADING_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+def parse_tiles(value: str):
+    """'4x3' -> (4, 3) columns by rows"""
+    try:
+        columns, rows = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected COLUMNSxROWS, got {value!r}")
+    if columns < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"Tile counts must be positive, got {value!r}")
+    return columns, rows
+
+def parse_weight(value: str):
+    """'clipping=0.5' -> ('clipping', 0.5)"""
+    name, _, weight = value.partition("=")
+    try:
+        return name.strip(), float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected METRIC=WEIGHT, got {value!r}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="videotosplat", description="Extract and select the sharpest frames of a video for 3DGS")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_scoring_arguments(subparser):
+        subparser.add_argument("--analysis-width", type=int, default=SCORE_ANALYSIS_WIDTH, help="Downscale frames to this width before scoring")
+        subparser.add_argument("--score-dtype", choices=("CV_64F", "CV_32F", "CV_16S"), default=SCORE_DTYPE, help="Laplacian output depth")
+        subparser.add_argument("--tiles", type=parse_tiles, default=SCORE_TILES, help="Score COLUMNSxROWS tiles separately, e.g. 4x4")
+        subparser.add_argument("--tile-percentile", type=float, default=SCORE_TILE_PERCENTILE, help="Percentile of the tile scores used as the frame score")
+
+    def add_pipeline_arguments(subparser, workers_default):
+        subparser.add_argument("--output-dir", default=AUTOMATIC_OUTPUT_DIR, help="Folder in which project folders are created")
+        subparser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="Frames per second to extract")
+        subparser.add_argument("--width", type=int, default=None, help="Resize frames to this width, keeping the aspect ratio")
+        subparser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        subparser.add_argument("--threshold", type=float, default=THRESHOLD)
+        subparser.add_argument("--min-images", type=int, default=MIN_IMAGES)
+        subparser.add_argument("--max-images", type=int, default=MAX_IMAGES)
+        subparser.add_argument("--workers", type=int, default=workers_default, help="Threads used for sharpness scoring (per job)")
+        subparser.add_argument("--align", action="store_true", help="Align the best images with RealityCapture")
+        subparser.add_argument("--grade", action="store_true", help="Grade the best images (method and style from config)")
+        subparser.add_argument("--summary", help="Also write the JSON summary to this file")
+        subparser.add_argument("--metric", dest="metrics", action="append", help="Quality metric to compute (repeatable, default from config)")
+        subparser.add_argument("--weight", dest="weights", action="append", type=parse_weight,
+                               help="METRIC=WEIGHT used to combine metrics for selection (repeatable, default from config)")
+        add_scoring_arguments(subparser)
+
+    run = subparsers.add_parser("run", help="Run extract, score, select and copy for one video")
+    run.add_argument("video", help="Input video file")
+    run.add_argument("--name", help="Project name (defaults to the video file name)")
+    add_pipeline_arguments(run, SCORING_WORKERS)
+
+    batch = subparsers.add_parser("batch", help="Run the pipeline for many videos or folders of videos")
+    batch.add_argument("inputs", nargs="+", help="Video files and/or folders containing videos")
+    batch.add_argument("--jobs", type=int, default=MAX_CONCURRENT_JOBS, help="Videos processed at once")
+    batch.add_argument("--decoders", type=int, default=MAX_CONCURRENT_DECODERS, help="ffmpeg extractions running at once")
+    batch.add_argument("--scorers", type=int, default=MAX_CONCURRENT_SCORERS, help="Scoring passes running at once")
+    add_pipeline_arguments(batch, None)
+
+    resume = subparsers.add_parser("resume", help="Resume a project, rerunning only the stages whose inputs changed")
+    resume.add_argument("project", help="Project folder containing a project manifest")
+    resume.add_argument("--video", help="Video to use instead of the one recorded in the manifest (e.g. after moving it)")
+    add_pipeline_arguments(resume, None)
+    # Options that are not given keep the values recorded in the manifest
+    for action in resume._actions:
+        if action.dest not in ("help", "project"):
+            action.default = argparse.SUPPRESS
+
+    preview = subparsers.add_parser("preview", help="Score keyframes only and estimate the sharpness distribution and yield")
+    preview.add_argument("video", help="Input video file")
+    preview.add_argument("--method", choices=("auto", "keyframes", "seek"), default=PREVIEW_METHOD,
+                         help="Decode keyframes only or seek to evenly spaced frames")
+    preview.add_argument("--samples", type=int, default=PREVIEW_SAMPLES, help="Frames decoded when seeking")
+    preview.add_argument("--preview-width", type=int, default=PREVIEW_WIDTH, help="Width the sampled frames are scored at")
+    preview.add_argument("--fps", type=float, action="append", help="Extraction rate to estimate the yield for (repeatable)")
+    preview.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    preview.add_argument("--threshold", type=float, default=THRESHOLD)
+    preview.add_argument("--min-images", type=int, default=MIN_IMAGES)
+    preview.add_argument("--max-images", type=int, default=MAX_IMAGES)
+    preview.add_argument("--summary", help="Also write the JSON summary to this file")
+
+    align = subparsers.add_parser("align", help="Align the best images of one or more projects with RealityCapture")
+    align.add_argument("projects", nargs="+", help="Project folders containing a best images folder")
+    align.add_argument("--concurrent", type=int, default=MAX_CONCURRENT_TOOLS, help="RealityCapture processes running at once")
+    align.add_argument("--timeout", type=float, default=RC_TIMEOUT, help="Seconds after which an alignment is stopped")
+    align.add_argument("--rc", default=RC_EXECUTABLE, help="RealityCapture executable (or fake_realitycapture.py)")
+    align.add_argument("--summary", help="Also write the JSON summary to this file")
+
+    grade = subparsers.add_parser("grade", help="Grade the best images of one or more projects")
+    grade.add_argument("projects", nargs="+", help="Project folders containing a best images folder")
+    grade.add_argument("--method", choices=("auto", "darktable", "opencv"), default=GRADING_METHOD,
+                       help="darktable-cli with --style, or the OpenCV exposure/white balance fallback")
+    grade.add_argument("--style", default=GRADING_STYLE, help="XMP sidecar applied by darktable-cli")
+    grade.add_argument("--workers", type=int, default=GRADING_WORKERS, help="darktable-cli processes (or threads) at once")
+    grade.add_argument("--summary", help="Also write the JSON summary to this file")
+
+    calibrate = subparsers.add_parser("calibrate", help="Compare a scoring mode's ranking with full-resolution scoring")
+    calibrate.add_argument("images", help="Folder of extracted frames")
+    calibrate.add_argument("--sample", type=int, default=200, help="Images scored (spread evenly over the folder)")
+    calibrate.add_argument("--top-fraction", type=float, default=0.25, help="Share of top-ranked images compared")
+    calibrate.add_argument("--summary", help="Also write the JSON summary to this file")
+    add_scoring_arguments(calibrate)
+
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable debug logging")
+    return parser
+
+def write_summary(summary: dict, path: str = None) -> None:
+    text = json.dumps(summary, indent=2, default=str)
+    print(text)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+def execute_pipeline(args, video_path: str, **location) -> int:
+    """Run one video with the options in args; location picks the project folder"""
+    # Imported here so --help works without OpenCV installed
+    from pipeline import run_pipeline
+    from progress import ProgressBus
+
+    progress = ProgressBus()
+    progress.subscribe(lambda event: print(event.format(), file=sys.stderr), min_interval=2.0)
+    summary = run_pipeline(video_path, progress=progress, **location, **pipeline_options(args))
+    summary['status'] = 'ok'
+    if summary['alignment'] is not None and not summary['alignment']['success']:
+        summary['status'] = 'alignment_failed'
+    write_summary(summary, args.summary)
+    return 0 if summary['status'] == 'ok' else 1
+
+def run_command(args) -> int:
+    return execute_pipeline(args, args.video, output_dir=args.output_dir, project_name=args.name)
+
+def manifest_arguments(settings: dict) -> dict:
+    """Command line values equivalent to the settings recorded in a project manifest"""
+    scoring = settings.get('scoring', {})
+    weights = settings.get('weights') or METRIC_WEIGHTS
+    return {
+        'video': None,
+        'summary': None,
+        'align': False,
+        'grade': False,
+        'workers': None,
+        'fps': settings.get('fps', DEFAULT_FPS),
+        'width': settings.get('new_width'),
+        'batch_size': settings.get('batch_size', BATCH_SIZE),
+        'threshold': settings.get('threshold', THRESHOLD),
+        'min_images': settings.get('min_images', MIN_IMAGES),
+        'max_images': settings.get('max_images', MAX_IMAGES),
+        'analysis_width': scoring.get('width'),
+        'score_dtype': scoring.get('ddepth', SCORE_DTYPE),
+        'tiles': scoring.get('tiles'),
+        'tile_percentile': scoring.get('percentile', SCORE_TILE_PERCENTILE),
+        'metrics': settings.get('metrics') or list(QUALITY_METRICS),
+        'weights': list(weights.items())
+    }
+
+def resume_command(args) -> int:
+    from manifest import ProjectManifest
+
+    manifest = ProjectManifest.load(args.project)
+    args = argparse.Namespace(**{**manifest_arguments(manifest.settings), **vars(args)})
+    video_path = args.video or manifest.video_path
+    if not video_path or not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video not found: {video_path}; pass --video with its new location")
+    return execute_pipeline(args, video_path, project_folder=args.project)
+
+def score_settings(args):
+    from image_analyzer import ScoreSettings
+
+    width = args.analysis_width if args.analysis_width and args.analysis_width > 0 else None
+    return ScoreSettings(width, args.score_dtype, args.tiles, args.tile_percentile)
+
+def pipeline_options(args) -> dict:
+    options = {
+        'fps': args.fps,
+        'new_width': args.width if args.width and args.width > 0 else None,
+        'batch_size': args.batch_size,
+        'threshold': args.threshold,
+        'min_images': args.min_images,
+        'max_images': args.max_images,
+        'align': args.align,
+        'grade': args.grade,
+        'score_settings': score_settings(args),
+        'metrics': tuple(args.metrics) if args.metrics else QUALITY_METRICS,
+        'weights': dict(args.weights) if args.weights else METRIC_WEIGHTS
+    }
+    if args.workers:
+        options['workers'] = args.workers
+    return options
+
+def batch_command(args) -> int:
+    from job_queue import JobQueue
+
+    job_queue = JobQueue(
+        output_dir=args.output_dir,
+        max_jobs=args.jobs,
+        max_decoders=args.decoders,
+        max_scorers=args.scorers,
+        **pipeline_options(args)
+    )
+    for path in args.inputs:
+        if os.path.isdir(path):
+            job_queue.add_folder(path)
+        else:
+            job_queue.add(path)
+    if not job_queue.jobs:
+        write_summary({'status': 'error', 'error': "No videos found"}, args.summary)
+        return 2
+
+    def report(status):
+        states = ", ".join(f"{count} {state}" for state, count in sorted(status['counts'].items()))
+        print(f"[{status['elapsed']:.0f}s] {states} | {status['frames_per_second']:.1f} frames/s", file=sys.stderr)
+
+    job_queue.run(on_update=report, update_interval=2.0)
+    status = job_queue.status()
+    failed = status['counts'].get('failed', 0)
+    status['status'] = 'ok' if not failed else 'failed'
+    write_summary(status, args.summary)
+    return 0 if not failed else 1
+
+def preview_command(args) -> int:
+    from preview import preview_video, estimate_yield, format_preview
+
+    summary = preview_video(args.video, method=args.method, samples=args.samples, width=args.preview_width)
+    summary['estimates'] = [
+        estimate_yield(summary, fps, args.batch_size, args.threshold, args.min_images, args.max_images)
+        for fps in (args.fps or [DEFAULT_FPS])
+    ]
+    for estimate in summary['estimates']:
+        logger.info(format_preview(summary, estimate))
+    summary['status'] = 'ok'
+    write_summary(summary, args.summary)
+    return 0
+
+def align_command(args) -> int:
+    from pipeline import align_projects
+    from progress import ProgressBus
+    from tool_runner import ToolRunner
+
+    def progress_for(project_folder):
+        progress = ProgressBus()
+        name = os.path.basename(os.path.normpath(project_folder))
+        progress.subscribe(lambda event: print(f"[{name}] {event.format()}", file=sys.stderr), min_interval=2.0)
+        return progress
+
+    results = align_projects(
+        args.projects, args.rc, runner=ToolRunner(args.concurrent),
+        timeout=args.timeout if args.timeout and args.timeout > 0 else None, progress_for=progress_for
+    )
+    failed = sum(not result['success'] for result in results)
+    write_summary({'status': 'ok' if not failed else 'failed', 'projects': results}, args.summary)
+    return 0 if not failed else 1
+
+def grade_command(args) -> int:
+    from pipeline import grade_stage
+    from progress import ProgressBus
+
+    projects = []
+    for project_folder in args.projects:
+        progress = ProgressBus()
+        name = os.path.basename(os.path.normpath(project_folder))
+        progress.subscribe(lambda event, name=name: print(f"[{name}] {event.format()}", file=sys.stderr), min_interval=2.0)
+        result = grade_stage(project_folder, progress=progress, method=args.method, style=args.style, workers=args.workers)
+        projects.append(dict(result, project_folder=project_folder))
+    failed = sum(bool(result['failed']) for result in projects)
+    write_summary({'status': 'ok' if not failed else 'failed', 'projects': projects}, args.summary)
+    return 0 if not failed else 1
+
+def calibrate_command(args) -> int:
+    from image_analyzer import calibrate_scoring
+    from utils.file_operations import IMAGE_EXTENSIONS
+
+    paths = sorted(
+        os.path.join(args.images, f) for f in os.listdir(args.images)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        write_summary({'status': 'error', 'error': f"No images found in {args.images}"}, args.summary)
+        return 2
+    summary = calibrate_scoring(paths, score_settings(args), sample=args.sample, top_fraction=args.top_fraction)
+    summary['status'] = 'ok'
+    write_summary(summary, args.summary)
+    return 0
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    # Logs go to stderr so stdout stays machine-readable
+    from log_config import configure_logging
+    configure_logging(logging.DEBUG if args.verbose else LOG_LEVEL, stream=sys.stderr)
+
+    needs_ffmpeg = args.command in ("run", "batch", "resume", "preview")
+    if needs_ffmpeg and (shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None):
+        write_summary({'status': 'error', 'error': "FFmpeg is not installed or not in the system PATH."})
+        return 2
+
+    try:
+        if args.command == "run":
+            return run_command(args)
+        if args.command == "batch":
+            return batch_command(args)
+        if args.command == "resume":
+            return resume_command(args)
+        if args.command == "preview":
+            return preview_command(args)
+        if args.command == "align":
+            return align_command(args)
+        if args.command == "grade":
+            return grade_command(args)
+        if args.command == "calibrate":
+            return calibrate_command(args)
+    except Exception as e:
+        logger.exception("Pipeline failed")
+        write_summary({'status': 'error', 'error': str(e)}, getattr(args, 'summary', None))
+        return 1
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())